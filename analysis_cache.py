@@ -0,0 +1,143 @@
+import hashlib  # For fingerprinting the inputs of an analysis.
+import json  # For a stable serialization of the inputs before hashing.
+import sqlite3  # SQLite keeps the cache across restarts in a single file.
+import threading  # A lock keeps the shared connection safe when agents run in threads.
+import time  # For expiry and least-recently-used bookkeeping.
+
+from storage import cache_path  # Resolves where locally persisted data lives.
+from tracing import cache_result  # Hits and misses show up in the query's spans and metrics.
+
+# How long a generated analysis is reused for the same inputs.
+DEFAULT_TTL_SECONDS = 30 * 60
+
+# Upper bound on stored analyses; the least recently used ones are evicted beyond it.
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def fingerprint(ticker, timeframe, price_change, news, prompt_version, technicals=None, intraday=None):
+    """
+    Returns a hash of everything an analysis depends on: the ticker, timeframe, price change,
+    the articles (by URL, or title when there is none), the prompt version, the technical
+    indicators and the intraday summary.
+    """
+    articles = [article.get("url") or article.get("title") for article in news]
+    payload = json.dumps([ticker.upper(), timeframe, price_change, articles, prompt_version, technicals, intraday])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    A persistent cache of generated analyses, keyed by the fingerprint of their inputs.
+
+    The same question with unchanged news and price data is answered from the cache instead of
+    another Gemini call. Entries expire after 'ttl_seconds', and the least recently used entries
+    are evicted once more than 'max_entries' are stored.
+
+    Args:
+        db_path (str, optional): Path of the SQLite file. Defaults to 'analyses.sqlite3' in the
+            local data directory.
+        ttl_seconds (float, optional): How long an analysis is reused.
+        max_entries (int, optional): Maximum number of stored analyses.
+    """
+
+    def __init__(self, db_path=None, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path or cache_path("analyses.sqlite3")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # check_same_thread=False because the connection is shared and guarded by self._lock.
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                ticker TEXT,
+                timeframe TEXT,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS analyses_by_use ON analyses (last_used);
+            """
+        )
+        self._conn.commit()
+        # Counters exposed through stats().
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the cached analysis for a fingerprint, or None if there is no current one.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT analysis, created_at FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] < self.ttl_seconds:
+                self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                cache_result("analysis", "hit")
+                return row[0]
+            if row is not None:
+                self._conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+            self.misses += 1
+        cache_result("analysis", "expired" if row is not None else "miss")
+        return None
+
+    def put(self, key, analysis, ticker=None, timeframe=None):
+        """
+        Stores an analysis under its fingerprint, evicting the least recently used entries if needed.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, ticker, timeframe, analysis, now, now))
+            excess = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM analyses WHERE key IN (SELECT key FROM analyses ORDER BY last_used LIMIT ?)",
+                    (excess,))
+                self.evictions += excess
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Returns the cache's counters: hits, misses, hit rate, expired and evicted entries, and
+        the number of stored analyses.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+# The shared cache used by tickeranalysis, created on first use.
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """
+    Returns the process-wide AnalysisCache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache()
+        return _cache
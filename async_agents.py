@@ -0,0 +1,158 @@
+import asyncio  # Import asyncio for the coroutine versions of the agents.
+import contextvars  # Each call runs in a copy of the caller's context (request priority, spans).
+import functools  # Binds keyword arguments for the executor.
+import os  # For the pool size setting.
+import threading  # Guards the shared pool and stops abandoned streams.
+from concurrent.futures import ThreadPoolExecutor  # The shared, bounded pool the blocking agents run in.
+
+from identify_ticker import ticker_identify  # Import the function to identify stock tickers from text.
+from ticker_news import ticker_news_agent  # Import the function to fetch news about a stock.
+from tickeranalysis import tickeranalysis  # Import the function to analyze stock price movements based on news.
+from tickeranalysis import tickeranalysis_stream  # Import the streaming version of the analysis.
+from tickerchange import tickerpricechange  # Import the function to get the price change of a stock over a period.
+from tickerprice import tickerprice  # Import the function to get the current price of a stock.
+
+# Async variants of the sub-agents.
+#
+# The Gemini SDK and the Alpha Vantage client are blocking, so each coroutine runs the sync agent
+# on a worker thread. That keeps the event loop free while a call is waiting on the network, lets
+# many calls overlap, and reuses the sync agents' caching, scheduling and error handling unchanged.
+# The I/O itself stays blocking: a call that is running holds a thread. The threads come from one
+# shared pool of at most MAX_THREADS, though, so any number of coroutines can await agents without
+# spawning more threads; the calls beyond the limit wait in the pool's queue, where cancelling the
+# awaiting task drops them before they start. Each call runs in a copy of the caller's context,
+# so the request priority set with av_scheduler.request_priority() still applies.
+
+# Worker threads shared by every async agent call ('STOCK_ASYNC_THREADS' to change).
+MAX_THREADS = int(os.environ.get("STOCK_ASYNC_THREADS", "16"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="async-agent")
+        return _executor
+
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Runs a blocking function on the shared agent pool, in a copy of the caller's context, and
+    returns its result.
+
+    At most MAX_THREADS calls run at once; later ones wait for a free thread. If the awaiting task
+    is cancelled while its call is still waiting, the call never starts. A call that has started
+    runs to completion in its thread; only its result is discarded.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, function, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+async def ticker_identify_async(user_query):
+    """
+    Async version of identify_ticker.ticker_identify.
+    """
+    return await run_blocking(ticker_identify, user_query)
+
+
+async def tickerprice_async(ticker):
+    """
+    Async version of tickerprice.tickerprice.
+    """
+    return await run_blocking(tickerprice, ticker)
+
+
+async def tickerpricechange_async(ticker, timeframe="today"):
+    """
+    Async version of tickerchange.tickerpricechange.
+    """
+    return await run_blocking(tickerpricechange, ticker, timeframe)
+
+
+async def ticker_news_agent_async(ticker, max_articles=5):
+    """
+    Async version of ticker_news.ticker_news_agent.
+    """
+    return await run_blocking(ticker_news_agent, ticker, max_articles)
+
+
+async def tickeranalysis_async(ticker, timeframe="today", news=None, price_change=None, technicals=None,
+                               intraday=None):
+    """
+    Async version of tickeranalysis.tickeranalysis.
+
+    If 'news' or 'price_change' is not supplied, both missing inputs are fetched concurrently
+    before the analysis is generated. 'technicals' and 'intraday' are passed through (None
+    fetches them, an empty string leaves them out).
+    """
+    if news is None or price_change is None:
+        news_task = ticker_news_agent_async(ticker, max_articles=5) if news is None else None
+        change_task = tickerpricechange_async(ticker, timeframe) if price_change is None else None
+        fetched = await asyncio.gather(*(task for task in (news_task, change_task) if task is not None))
+        if news_task is not None:
+            news = fetched.pop(0)
+        if change_task is not None:
+            price_change = fetched.pop(0)
+        # Mirror tickeranalysis' own check so a missing input doesn't trigger a second fetch there.
+        if news is None or price_change is None:
+            print(f"Insufficient data to analyze {ticker} for {timeframe}.")
+            return None
+    return await run_blocking(tickeranalysis, ticker, timeframe, news, price_change, technicals, intraday)
+
+
+async def tickeranalysis_stream_async(ticker, timeframe="today", news=None, price_change=None, technicals=None,
+                                      intraday=None):
+    """
+    Async iterator version of tickeranalysis.tickeranalysis_stream.
+
+    Example:
+        async for chunk in tickeranalysis_stream_async("TSLA"):
+            print(chunk, end="", flush=True)
+    """
+    async for chunk in stream_in_thread(tickeranalysis_stream, ticker, timeframe, news, price_change,
+                                        technicals, intraday):
+        yield chunk
+
+
+async def stream_in_thread(generator_function, *args, **kwargs):
+    """
+    Runs a blocking generator on the shared agent pool and yields its items on the event loop as
+    they are produced.
+
+    The whole generator runs in one thread (and one copy of the caller's context), so context
+    managers inside it, such as request_priority(), work as they do in synchronous code. If the
+    consumer stops early (breaks out, is cancelled or closes the iterator), the generator is
+    closed in its thread after the item it is producing, so its cleanup runs and it makes no
+    further calls.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    stopped = threading.Event()
+
+    def produce():
+        generator = generator_function(*args, **kwargs)
+        try:
+            for item in generator:
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        finally:
+            generator.close()
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    producer = asyncio.ensure_future(run_blocking(produce))
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        # Re-raise anything the generator raised.
+        await producer
+    finally:
+        stopped.set()
@@ -0,0 +1,265 @@
+import logging  # For reporting retries without cluttering the agents' own output.
+import os  # For reading the API key and client settings from environment variables.
+import random  # For jittering the retry backoff.
+import threading  # For creating the shared client safely from several threads.
+import time  # For backoff sleeps and latency measurements.
+
+import requests  # Import the requests library for making HTTP requests.
+from requests.adapters import HTTPAdapter  # Lets us size the keep-alive connection pool.
+
+from providers import get_alpha_vantage_key  # Reads (and checks) the API key when the client is created.
+import tracing  # Per-request spans and upstream metrics.
+
+logger = logging.getLogger(__name__)
+
+# Default Alpha Vantage endpoint. Point 'ALPHA_VANTAGE_BASE_URL' at a local stand-in for benchmarks.
+DEFAULT_BASE_URL = "https://www.alphavantage.co/query"
+
+# HTTP status codes worth retrying: rate limiting and transient server errors.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Phrases Alpha Vantage uses in its 'Note' / 'Information' payloads when a request was throttled.
+# Those payloads come back with HTTP 200 and no data, so they must be detected by content.
+_THROTTLE_PHRASES = ("rate limit", "call frequency", "requests per", "calls per")
+
+
+class AlphaVantageThrottled(requests.exceptions.RequestException):
+    """
+    Raised when Alpha Vantage keeps answering with a rate-limit 'Note' / 'Information' payload
+    after all retries. It subclasses RequestException, so the agents' existing network error
+    handling reports it instead of treating the throttled response as "no data".
+    """
+
+
+def _throttle_message(data):
+    # Return the throttling message if 'data' is a rate-limit payload, otherwise None.
+    if not isinstance(data, dict):
+        return None
+    for key in ("Note", "Information"):
+        message = data.get(key)
+        if isinstance(message, str) and any(phrase in message.lower() for phrase in _THROTTLE_PHRASES):
+            return message
+    return None
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+class AlphaVantageClient:
+    """
+    A shared HTTP client for every Alpha Vantage call.
+
+    It keeps connections alive in a pool (one TCP+TLS handshake per connection instead of per
+    request), applies connect/read timeouts, and retries connection errors, 429/5xx responses and
+    throttling payloads with jittered exponential backoff.
+
+    Args:
+        api_key (str, optional): Alpha Vantage API key. Defaults to 'ALPHA_VANTAGE_API_KEY'; a
+            ValueError is raised if neither is set.
+        base_url (str, optional): Query endpoint. Defaults to 'ALPHA_VANTAGE_BASE_URL' or the public API.
+        connect_timeout (float, optional): Seconds to wait for a connection. Defaults to
+            'ALPHA_VANTAGE_CONNECT_TIMEOUT' or 5.
+        read_timeout (float, optional): Seconds to wait for a response. Defaults to
+            'ALPHA_VANTAGE_READ_TIMEOUT' or 30.
+        max_retries (int, optional): Retries after the first attempt. Defaults to
+            'ALPHA_VANTAGE_MAX_RETRIES' or 3.
+        backoff_base (float, optional): First backoff ceiling in seconds; doubles on each retry.
+        backoff_max (float, optional): Upper bound for a single backoff sleep in seconds.
+        pool_maxsize (int, optional): Maximum number of pooled keep-alive connections.
+        pooled (bool, optional): If False, every call opens a fresh connection (useful only to
+            measure what pooling saves).
+    """
+
+    def __init__(self, api_key=None, base_url=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_base=1.0, backoff_max=30.0, pool_maxsize=10, pooled=True):
+        self.api_key = api_key or get_alpha_vantage_key()
+        self.base_url = base_url or os.environ.get("ALPHA_VANTAGE_BASE_URL") or DEFAULT_BASE_URL
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else _env_float("ALPHA_VANTAGE_CONNECT_TIMEOUT", 5.0),
+            read_timeout if read_timeout is not None else _env_float("ALPHA_VANTAGE_READ_TIMEOUT", 30.0),
+        )
+        self.max_retries = max_retries if max_retries is not None else int(_env_float("ALPHA_VANTAGE_MAX_RETRIES", 3))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pooled = pooled
+
+        self._session = None
+        if pooled:
+            # Retries are handled here (including throttle payloads), so the adapter itself doesn't retry.
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+            self._session = requests.Session()
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+
+        # Counters for measuring the client (per-call latency, retries, throttling).
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttled = 0
+        self.total_seconds = 0.0
+
+    def query(self, params, acquire=None):
+        """
+        Sends a request to the Alpha Vantage query endpoint and returns the parsed JSON.
+
+        Args:
+            params (dict): Query parameters, e.g. {"function": "GLOBAL_QUOTE", "symbol": "IBM"}.
+                The API key is added unless 'apikey' is already present.
+            acquire (callable, optional): Called before every retry, after the backoff; the
+                scheduler passes one that takes a budget token, so each attempt is paid for.
+
+        Returns:
+            dict: The decoded JSON payload. Error payloads such as {"Error Message": ...} are
+            returned as-is for the caller to report.
+
+        Raises:
+            AlphaVantageThrottled: If the API still reports throttling after all retries.
+            requests.exceptions.RequestException: For network errors, timeouts and HTTP errors
+                that persist after retries, and for responses that are not valid JSON.
+        """
+        return self._request(params, stream=False, decode=True, acquire=acquire)[1]
+
+    def get(self, params, stream=False, acquire=None):
+        """
+        Sends a request to the Alpha Vantage query endpoint and returns the raw response.
+
+        Same retries and timeouts as query(), for non-JSON outputs such as 'datatype=csv'.
+        Throttling payloads are detected when the response is JSON and not streamed.
+
+        Args:
+            params (dict): Query parameters (the API key is added unless already present).
+            stream (bool, optional): If True, the body is not downloaded up front.
+            acquire (callable, optional): Called before every retry (see query()).
+
+        Returns:
+            requests.Response: The successful response.
+        """
+        return self._request(params, stream=stream, decode=False, acquire=acquire)[0]
+
+    def _request(self, params, stream, decode, acquire=None):
+        # Shared retry loop. Returns (response, decoded JSON or None); with decode=True the body is
+        # parsed exactly once and reused for the throttle check.
+        params = {"apikey": self.api_key, **params}
+        function = params.get("function")
+        started = time.perf_counter()
+        attempt = 0
+        outcome = "error"
+        with tracing.span("alphavantage", function=function):
+            try:
+                while True:
+                    attempt += 1
+                    if attempt > 1 and acquire is not None:
+                        # A retry is another upstream call: it needs budget like the first attempt.
+                        acquire()
+                    with self._stats_lock:
+                        self.attempts += 1
+                    try:
+                        response = self._send(params, stream)
+                        if response.status_code in RETRY_STATUS_CODES and attempt <= self.max_retries:
+                            self._backoff(attempt, f"HTTP {response.status_code}", params)
+                            continue
+                        response.raise_for_status()
+                    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                        if attempt > self.max_retries:
+                            raise
+                        self._backoff(attempt, e, params)
+                        continue
+
+                    # A JSON body that only carries a throttling note means "try again later".
+                    data = None
+                    if decode:
+                        data = response.json()
+                        message = _throttle_message(data)
+                    elif not stream and "json" in response.headers.get("Content-Type", ""):
+                        try:
+                            message = _throttle_message(response.json())
+                        except ValueError:
+                            message = None
+                    else:
+                        message = None
+                    if message:
+                        with self._stats_lock:
+                            self.throttled += 1
+                        tracing.count("upstream_throttled_total", service="alphavantage", function=function)
+                        if attempt > self.max_retries:
+                            raise AlphaVantageThrottled(f"Alpha Vantage rate limit reached: {message}")
+                        self._backoff(attempt, "throttled", params)
+                        continue
+                    outcome = "ok"
+                    # Streamed bodies haven't been downloaded yet; they count by their declared length.
+                    received = len(response.content) if not stream else int(response.headers.get("Content-Length") or 0)
+                    tracing.add("upstream_bytes", received)
+                    tracing.count("upstream_bytes_total", received, service="alphavantage", function=function)
+                    return response, data
+            finally:
+                with self._stats_lock:
+                    self.calls += 1
+                    self.total_seconds += time.perf_counter() - started
+                tracing.add("upstream_calls")
+                tracing.count("upstream_requests_total", service="alphavantage", function=function, outcome=outcome)
+
+    def stats(self):
+        """
+        Returns the client's counters: calls, attempts, retries, throttled responses and mean latency.
+        """
+        with self._stats_lock:
+            return {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "mean_seconds": self.total_seconds / self.calls if self.calls else None,
+            }
+
+    def close(self):
+        # Release pooled connections.
+        if self._session is not None:
+            self._session.close()
+
+    def _send(self, params, stream):
+        if self._session is not None:
+            return self._session.get(self.base_url, params=params, timeout=self.timeout, stream=stream)
+        return requests.get(self.base_url, params=params, timeout=self.timeout, stream=stream)
+
+    def _backoff(self, attempt, reason, params):
+        # "Full jitter" exponential backoff: sleep a random time up to base * 2^(attempt - 1).
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        with self._stats_lock:
+            self.retries += 1
+        tracing.add("retries")
+        tracing.count("upstream_retries_total", service="alphavantage", function=params.get("function"))
+        logger.warning("Retrying Alpha Vantage %s (%s) in %.2fs [attempt %d/%d]",
+                       params.get("function"), reason, delay, attempt, self.max_retries + 1)
+        time.sleep(delay)
+
+
+# The process-wide client shared by all agents, created on first use.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared AlphaVantageClient, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AlphaVantageClient()
+        return _client
+
+
+def set_client(client):
+    """
+    Replaces the shared client (e.g., to point every agent at a local stand-in server).
+
+    Returns:
+        AlphaVantageClient: The previous client, or None.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+        return previous
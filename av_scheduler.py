@@ -0,0 +1,292 @@
+import contextvars  # Carries the request priority of the current query through nested agent calls.
+import heapq  # Priority queue of requests waiting for API budget.
+import itertools  # Tie-breaking sequence numbers so equal priorities stay first-come, first-served.
+import os  # For reading the configured API budget from environment variables.
+import threading  # Locks and condition variables for coordinating concurrent callers.
+import time  # Monotonic clock for the token buckets and wait-time measurements.
+from concurrent.futures import Future  # Lets coalesced callers wait on the leader's upstream call.
+from contextlib import contextmanager  # For the request_priority() context manager.
+
+import requests  # Import the requests library for its exception base class.
+
+from av_client import get_client  # Shared, pooled Alpha Vantage client.
+import tracing  # Budget waits and coalesced requests show up in the query's spans and metrics.
+
+# Request priorities: lower values are served first.
+INTERACTIVE = 0  # A user is waiting for the answer (StockAnalysisOrchestrator.process_query).
+BACKGROUND = 1  # Everything else (scripts, batch jobs, monitors).
+
+_priority = contextvars.ContextVar("alpha_vantage_priority", default=BACKGROUND)
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Sets the priority of every Alpha Vantage request made inside the 'with' block.
+
+    Example:
+        with request_priority(INTERACTIVE):
+            tickerprice("AAPL")
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class QuotaExceeded(requests.exceptions.RequestException):
+    """
+    Raised when a request cannot get API budget within the scheduler's maximum wait (for example
+    because the daily allowance is used up). It subclasses RequestException, so the agents report
+    it like any other failed request.
+    """
+
+
+class TokenBucket:
+    """
+    A token bucket that holds up to 'capacity' tokens and refills at capacity / period_seconds.
+
+    Args:
+        capacity (int): Maximum number of calls that can be made in a burst.
+        period_seconds (float): Time for an empty bucket to refill completely.
+    """
+
+    def __init__(self, capacity, period_seconds):
+        self.capacity = float(capacity)
+        self.rate = capacity / period_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        # Seconds until one token is available (0 if one is available now).
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+def _request_key(params):
+    # Identical requests (ignoring the API key) share one upstream call.
+    return tuple(sorted((key, str(value)) for key, value in params.items() if key != "apikey"))
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class RequestScheduler:
+    """
+    Sits in front of the Alpha Vantage client and keeps the agents inside the API budget.
+
+    - Budget: every upstream call takes a token from a per-minute and a per-day token bucket.
+      Callers wait (in priority order) until both buckets have a token.
+    - Priority: INTERACTIVE requests are served before BACKGROUND ones; see request_priority().
+    - Coalescing: while a request is in flight, identical requests wait for its result instead of
+      issuing their own call, so N concurrent callers cost one upstream call.
+
+    Args:
+        client (AlphaVantageClient, optional): Client used for upstream calls. Defaults to the shared client.
+        calls_per_minute (int, optional): Per-minute budget. Defaults to 'ALPHA_VANTAGE_CALLS_PER_MINUTE' or 5.
+        calls_per_day (int, optional): Per-day budget. Defaults to 'ALPHA_VANTAGE_CALLS_PER_DAY' or 500.
+        max_wait (float, optional): Longest a request may wait for budget before QuotaExceeded is
+            raised. Defaults to 'ALPHA_VANTAGE_MAX_QUEUE_WAIT' or 120 seconds.
+    """
+
+    def __init__(self, client=None, calls_per_minute=None, calls_per_day=None, max_wait=None):
+        self.client = client
+        self.calls_per_minute = calls_per_minute or _env_int("ALPHA_VANTAGE_CALLS_PER_MINUTE", 5)
+        self.calls_per_day = calls_per_day or _env_int("ALPHA_VANTAGE_CALLS_PER_DAY", 500)
+        self.max_wait = max_wait if max_wait is not None else _env_int("ALPHA_VANTAGE_MAX_QUEUE_WAIT", 120)
+        self._minute = TokenBucket(self.calls_per_minute, 60.0)
+        self._day = TokenBucket(self.calls_per_day, 24 * 60 * 60.0)
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._waiting = []  # Heap of (priority, sequence) tickets waiting for budget.
+        self._sequence = itertools.count()
+        self._inflight = {}  # Request key -> Future of the leader's upstream call.
+
+        # Counters exposed through stats().
+        self.requests = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def query(self, params, priority=None):
+        """
+        Sends an Alpha Vantage query within the API budget and returns the parsed JSON.
+
+        Args:
+            params (dict): Query parameters, as for AlphaVantageClient.query.
+            priority (int, optional): INTERACTIVE or BACKGROUND. Defaults to the priority set with
+                request_priority() (BACKGROUND if none is set).
+
+        Returns:
+            dict: The decoded JSON payload. Coalesced callers receive the same object, so it must
+            be treated as read-only.
+
+        Raises:
+            QuotaExceeded: If no budget became available within max_wait.
+            requests.exceptions.RequestException: Anything the client raises for the upstream call.
+        """
+        key = _request_key(params)
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            # Someone is already fetching exactly this; share their result (or their error).
+            tracing.add("coalesced")
+            tracing.count("scheduler_coalesced_total", function=params.get("function"))
+            return future.result()
+
+        try:
+            priority = _priority.get() if priority is None else priority
+            self._acquire(priority)
+            # Retries inside the client take a token each, like the first attempt.
+            result = (self.client or get_client()).query(params, acquire=lambda: self._acquire(priority))
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, params, priority=None, stream=False):
+        """
+        Sends an Alpha Vantage request within the API budget and returns the raw response, for
+        non-JSON outputs such as 'datatype=csv' or LISTING_STATUS. Raw responses are not coalesced.
+
+        Args:
+            params (dict): Query parameters, as for AlphaVantageClient.get.
+            priority (int, optional): INTERACTIVE or BACKGROUND (see query()).
+            stream (bool, optional): If True, the body is not downloaded up front.
+
+        Returns:
+            requests.Response: The successful response.
+        """
+        with self._lock:
+            self.requests += 1
+        priority = _priority.get() if priority is None else priority
+        self._acquire(priority)
+        return (self.client or get_client()).get(params, stream=stream, acquire=lambda: self._acquire(priority))
+
+    def stats(self):
+        """
+        Returns the scheduler's counters: queue depth, wait times, upstream calls and the
+        coalescing hit-rate (share of requests answered by another caller's in-flight call).
+        """
+        with self._lock:
+            granted = self.upstream_calls
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "coalescing_hit_rate": self.coalesced / self.requests if self.requests else 0.0,
+                "rejected": self.rejected,
+                "queue_depth": len(self._waiting),
+                "max_queue_depth": self.max_queue_depth,
+                "mean_wait_seconds": self.total_wait_seconds / granted if granted else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def remaining_today(self):
+        """
+        Returns the number of calls the per-day budget allows right now.
+        """
+        with self._lock:
+            self._day._refill(time.monotonic())
+            return int(self._day.tokens)
+
+    def _acquire(self, priority):
+        # Wait until this request is at the head of the queue and both buckets have a token.
+        ticket = (priority, next(self._sequence))
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = deadline - now
+                    if self._waiting[0] == ticket:
+                        wait = max(self._minute.wait_time(now), self._day.wait_time(now))
+                        if wait <= 0:
+                            self._minute.take(now)
+                            self._day.take(now)
+                            heapq.heappop(self._waiting)
+                            waited = now - started
+                            self.upstream_calls += 1
+                            self.total_wait_seconds += waited
+                            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                            # Waits under a millisecond are just the lock; only real budget waits are recorded.
+                            if waited >= 0.001:
+                                tracing.add("budget_wait_seconds", waited)
+                                tracing.get_metrics().observe("scheduler_wait_seconds", waited)
+                            # Let the next ticket re-check the buckets.
+                            self._cond.notify_all()
+                            return
+                        if wait > timeout:
+                            raise QuotaExceeded(
+                                f"Alpha Vantage budget exhausted ({self.calls_per_minute}/minute, "
+                                f"{self.calls_per_day}/day); next slot in {wait:.0f}s.")
+                        timeout = wait
+                    elif timeout <= 0:
+                        raise QuotaExceeded(f"Timed out after {self.max_wait}s waiting for Alpha Vantage budget.")
+                    self._cond.wait(timeout)
+            except BaseException:
+                # Give up our place in the queue and let the others move up.
+                self.rejected += 1
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+
+# The process-wide scheduler shared by all agents, created on first use.
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the shared RequestScheduler, creating it on first use.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler):
+    """
+    Replaces the shared scheduler (e.g., with a larger budget for benchmarks).
+
+    Returns:
+        RequestScheduler: The previous scheduler, or None.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        previous, _scheduler = _scheduler, scheduler
+        return previous
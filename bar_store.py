@@ -0,0 +1,378 @@
+import os  # Import the os module for file paths in the benchmark below.
+import sqlite3  # SQLite gives us a single-file, dependency-free on-disk store.
+import threading  # A lock keeps the shared connection safe when agents run in threads.
+import time  # For freshness checks and latency measurements.
+from datetime import date, timedelta  # For working out which trading day should be the latest stored bar.
+
+import numpy as np  # Trims a downloaded series to the closed sessions.
+import requests  # Import the requests library for its exception types.
+
+import market_hours  # The latest trading day is worked out on the exchange's calendar.
+
+from av_scheduler import get_scheduler  # Quota-aware scheduler in front of the shared Alpha Vantage client.
+from csv_ingest import fetch_daily_csv  # Streams full histories as CSV straight into arrays.
+from price_series import DailySeries  # NumPy-backed view of the stored bars.
+from storage import cache_path  # Resolves where locally persisted data lives.
+import tracing  # Downloads and store hits show up in the query's spans and metrics.
+
+# Alpha Vantage's compact output returns the most recent 100 daily bars. If the stored history
+# is older than this (in calendar days, roughly 100 trading days), a compact top-up would leave
+# a gap, so we fall back to a full download instead.
+COMPACT_COVERAGE_DAYS = 140
+
+# How long to wait before asking Alpha Vantage again when the newest stored bar still looks
+# behind (e.g., on a market holiday, or before today's bar has been published).
+DEFAULT_RECHECK_SECONDS = 15 * 60
+
+
+def _latest_expected_trading_day(now=None):
+    # The most recent weekday whose session has closed, on the exchange's calendar (not the local
+    # date, which is a day ahead or behind around midnight elsewhere). Until today's close, today's
+    # bar is still changing, so yesterday's is the latest final one. Exchange holidays are not
+    # modelled; they are covered by the recheck interval instead of triggering a request on every call.
+    now = market_hours.exchange_now(now)
+    day = now.date()
+    if now.time() < market_hours.MARKET_CLOSE:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:  # Saturday (5) or Sunday (6).
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def _closed_bars(series, last_date):
+    # The series up to and including 'last_date' (ISO date).
+    count = int(np.searchsorted(series.dates, np.datetime64(last_date, "D"), side="right"))
+    if count == len(series):
+        return series
+    return DailySeries(series.ticker, series.dates[:count], series.open[:count], series.high[:count],
+                       series.low[:count], series.close[:count], series.volume[:count])
+
+
+class DailyBarStore:
+    """
+    A local, persistent store of daily OHLCV bars per ticker, backed by SQLite.
+
+    The first request for a ticker downloads the full 'TIME_SERIES_DAILY' history once, as CSV
+    parsed while it arrives (see csv_ingest). Later requests only top up the missing recent days
+    with 'outputsize=compact', and skip the network entirely when the newest stored bar is
+    already the latest closed session. The bar of a session still in progress is never stored.
+
+    Args:
+        db_path (str, optional): Path of the SQLite file. Defaults to 'daily_bars.sqlite3' in the
+            local data directory.
+        recheck_seconds (float, optional): Minimum time between top-up attempts for a ticker whose
+            newest bar still looks behind.
+    """
+
+    def __init__(self, db_path=None, recheck_seconds=DEFAULT_RECHECK_SECONDS):
+        self.db_path = db_path or cache_path("daily_bars.sqlite3")
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        # check_same_thread=False because the connection is shared and guarded by self._lock.
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS bars (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                PRIMARY KEY (ticker, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bar_meta (
+                ticker TEXT PRIMARY KEY,
+                last_checked REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        # Counters used to report how many upstream calls the store saved.
+        self.api_calls = 0
+        self.full_fetches = 0
+        self.compact_fetches = 0
+        self.last_load_seconds = None
+        # In-memory DailySeries per ticker, rebuilt only when new bars have been written.
+        self._versions = {}
+        self._series = {}
+
+    def get_bars(self, ticker):
+        """
+        Returns all stored daily bars for a ticker, topping up the store first if it is stale.
+
+        Args:
+            ticker (str): The stock ticker symbol (e.g., "AAPL").
+
+        Returns:
+            list of tuple: (date, open, high, low, close, volume) rows ordered from oldest to
+            newest, with the date as an ISO 'YYYY-MM-DD' string.
+
+        Raises:
+            ValueError: If Alpha Vantage returns an error or no daily series for the ticker.
+            requests.exceptions.RequestException: If the download fails and nothing is stored yet.
+        """
+        started = time.perf_counter()
+        ticker = ticker.upper()
+        self.top_up(ticker)
+        rows = self._read(ticker)
+        self.last_load_seconds = time.perf_counter() - started
+        return rows
+
+    @tracing.traced("daily_bars")
+    def get_series(self, ticker):
+        """
+        Returns the ticker's bars as a DailySeries, topping up the store first if it is stale.
+
+        The series is kept in memory and reused until new bars are written for the ticker, so
+        repeated questions about the same ticker don't re-read or re-convert the history.
+
+        Args:
+            ticker (str): The stock ticker symbol (e.g., "AAPL").
+
+        Returns:
+            DailySeries: The ticker's daily bars (empty if none are stored).
+
+        Raises:
+            ValueError: If Alpha Vantage returns an error or no daily series for the ticker.
+            requests.exceptions.RequestException: If the download fails and nothing is stored yet.
+        """
+        started = time.perf_counter()
+        ticker = ticker.upper()
+        self.top_up(ticker)
+        with self._lock:
+            version = self._versions.get(ticker, 0)
+            cached = self._series.get(ticker)
+        if cached is not None and cached[0] == version:
+            series = cached[1]
+        else:
+            series = DailySeries.from_rows(ticker, self._read(ticker))
+            with self._lock:
+                self._series[ticker] = (version, series)
+        self.last_load_seconds = time.perf_counter() - started
+        return series
+
+    def top_up(self, ticker):
+        """
+        Brings the stored bars for a ticker up to date, using the cheapest request that works.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+
+        Returns:
+            int: The number of upstream API calls made (0 or 1).
+
+        Raises:
+            requests.exceptions.RequestException, ValueError: If the download fails and nothing is
+                stored yet. With stored bars, a failure is printed and the stored bars are used.
+        """
+        ticker = ticker.upper()
+        latest_stored, last_checked = self._latest(ticker)
+        expected = _latest_expected_trading_day()
+
+        # A bar newer than the latest closed session was stored while its session was still open
+        # (by an earlier version of the store): drop it so it is downloaded again once final.
+        if latest_stored is not None and latest_stored > expected:
+            self._drop_after(ticker, expected)
+            latest_stored, last_checked = self._latest(ticker)
+        # Nothing to do if the newest bar is already the latest trading day.
+        if latest_stored is not None and latest_stored >= expected:
+            tracing.cache_result("daily_bars", "hit")
+            return 0
+        # Don't hammer the API when a bar is legitimately missing (holiday, not yet published).
+        if latest_stored is not None and last_checked and time.time() - last_checked < self.recheck_seconds:
+            tracing.cache_result("daily_bars", "hit")
+            return 0
+
+        # Choose between a compact top-up and a full (re)download.
+        if latest_stored is None:
+            outputsize = "full"
+        else:
+            gap_days = (date.fromisoformat(expected) - date.fromisoformat(latest_stored)).days
+            outputsize = "compact" if gap_days <= COMPACT_COVERAGE_DAYS else "full"
+        tracing.cache_result("daily_bars", "miss")
+        tracing.annotate(outputsize=outputsize)
+
+        try:
+            if outputsize == "full":
+                # The full history is large, so it comes as CSV, parsed into arrays as it streams in.
+                series = self._fetch_full(ticker)
+            else:
+                daily_data = self._fetch(ticker, outputsize)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Record the attempt, so the next calls wait for the recheck interval instead of
+            # retrying (e.g. while the API answers with a rate-limit note).
+            self._mark_checked(ticker)
+            # Serve what we already have rather than failing the whole query.
+            if latest_stored is None:
+                raise
+            print(f"Could not top up daily bars for {ticker}, using stored data: {e}")
+            return 1
+
+        # Only closed sessions are stored; the bar of a session in progress would otherwise be
+        # taken as final and never refreshed.
+        if outputsize == "full":
+            self._write_series(ticker, _closed_bars(series, expected))
+        else:
+            self._write(ticker, {day: bar for day, bar in daily_data.items() if day <= expected})
+        return 1
+
+    def backfill(self, tickers, force=False):
+        """
+        Downloads the full daily history of several tickers (e.g. a watchlist), one CSV download each.
+
+        Args:
+            tickers (iterable of str): Ticker symbols.
+            force (bool, optional): Download tickers that already have stored bars again.
+
+        Returns:
+            dict: Maps each upper-cased ticker to its number of stored bars, or to None if the
+            download failed (the reason is printed).
+        """
+        results = {}
+        for ticker in dict.fromkeys(t.upper() for t in tickers):
+            try:
+                if force or self._latest(ticker)[0] is None:
+                    self._write_series(ticker, _closed_bars(self._fetch_full(ticker), _latest_expected_trading_day()))
+                with self._lock:
+                    results[ticker] = self._conn.execute("SELECT COUNT(*) FROM bars WHERE ticker = ?",
+                                                         (ticker,)).fetchone()[0]
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Could not backfill daily bars for {ticker}: {e}")
+                results[ticker] = None
+        return results
+
+    def stats(self):
+        """
+        Returns the store's counters for reporting (API calls made, fetch kinds, last load latency).
+        """
+        return {
+            "api_calls": self.api_calls,
+            "full_fetches": self.full_fetches,
+            "compact_fetches": self.compact_fetches,
+            "last_load_seconds": self.last_load_seconds,
+        }
+
+    def _fetch(self, ticker, outputsize):
+        # Download the daily series from Alpha Vantage and return the 'Time Series (Daily)' dict.
+        params = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": ticker,
+            "outputsize": outputsize,
+        }
+        self.api_calls += 1
+        if outputsize == "full":
+            self.full_fetches += 1
+        else:
+            self.compact_fetches += 1
+        data = get_scheduler().query(params)
+
+        if "Time Series (Daily)" in data:
+            return data["Time Series (Daily)"]
+        elif "Error Message" in data:
+            raise ValueError(f"Alpha Vantage API Error for {ticker}: {data['Error Message']}")
+        else:
+            raise ValueError(f"No 'Time Series (Daily)' data found for {ticker}. Response: {data}")
+
+    def _fetch_full(self, ticker):
+        # Download the whole history as CSV, parsed into a DailySeries while it arrives.
+        self.api_calls += 1
+        self.full_fetches += 1
+        return fetch_daily_csv(ticker, outputsize="full")
+
+    def _write_series(self, ticker, series):
+        # Store a full history. It covers every stored day, so it also becomes the in-memory
+        # series and the next get_series() doesn't read it back from SQLite.
+        rows = zip([ticker] * len(series), series.dates.astype(str).tolist(), series.open.tolist(),
+                   series.high.tolist(), series.low.tolist(), series.close.tolist(), series.volume.tolist())
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO bar_meta VALUES (?, ?)", (ticker, time.time()))
+            self._conn.commit()
+            version = self._versions[ticker] = self._versions.get(ticker, 0) + 1
+            self._series[ticker] = (version, series)
+
+    def _write(self, ticker, daily_data):
+        # Upsert every bar from the response; overlapping days simply overwrite the stored values.
+        rows = [
+            (
+                ticker,
+                date_str,
+                float(bar["1. open"]),
+                float(bar["2. high"]),
+                float(bar["3. low"]),
+                float(bar["4. close"]),
+                float(bar["5. volume"]),
+            )
+            for date_str, bar in daily_data.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO bar_meta VALUES (?, ?)", (ticker, time.time()))
+            self._conn.commit()
+            self._versions[ticker] = self._versions.get(ticker, 0) + 1
+
+    def _drop_after(self, ticker, last_date):
+        # Delete the ticker's bars after 'last_date' (ISO date).
+        with self._lock:
+            self._conn.execute("DELETE FROM bars WHERE ticker = ? AND date > ?", (ticker, last_date))
+            self._conn.commit()
+            self._versions[ticker] = self._versions.get(ticker, 0) + 1
+
+    def _mark_checked(self, ticker):
+        # Record a top-up attempt that stored nothing.
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO bar_meta VALUES (?, ?)", (ticker, time.time()))
+            self._conn.commit()
+
+    def _latest(self, ticker):
+        # Newest stored bar date and the time of the last top-up attempt for the ticker.
+        with self._lock:
+            latest = self._conn.execute("SELECT MAX(date) FROM bars WHERE ticker = ?", (ticker,)).fetchone()[0]
+            meta = self._conn.execute("SELECT last_checked FROM bar_meta WHERE ticker = ?", (ticker,)).fetchone()
+        return latest, (meta[0] if meta else None)
+
+    def _read(self, ticker):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT date, open, high, low, close, volume FROM bars WHERE ticker = ? ORDER BY date",
+                (ticker,),
+            ).fetchall()
+
+
+# The shared store used by the agents, created on first use.
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Returns the process-wide DailyBarStore, creating it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DailyBarStore()
+        return _store
+
+
+if __name__ == "__main__":
+    # Report cold vs. warm latency and upstream calls per query for tickerpricechange.
+    # The cold run uses a fresh, empty store in a temporary directory.
+    import sys
+    import tempfile
+
+    import bar_store  # Import by name so tickerchange sees the same module-level store.
+    import tickerchange
+
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "IBM"
+    with tempfile.TemporaryDirectory() as tmp:
+        store = bar_store._store = bar_store.DailyBarStore(db_path=os.path.join(tmp, "daily_bars.sqlite3"))
+        for label in ("cold", "warm"):
+            calls_before = store.api_calls
+            started = time.perf_counter()
+            result = tickerchange.tickerpricechange(ticker, "last month")
+            elapsed = time.perf_counter() - started
+            print(f"{label}: {result} | {elapsed * 1000:.1f} ms | {store.api_calls - calls_before} API call(s)")
+        store._conn.close()
@@ -0,0 +1,280 @@
+import contextvars  # Worker threads run in a copy of the caller's context (request priority, spans).
+import json  # Checkpoint lines and the consolidated report.
+import os  # For output paths and atomic replacement of the report.
+import threading  # Guards the checkpoint file and bounds concurrent Gemini calls.
+import time  # For timings and the Gemini rate limit.
+from concurrent.futures import ThreadPoolExecutor  # The bounded worker pool.
+from datetime import datetime  # Timestamps in the checkpoint and the report.
+
+import market_hours  # A checkpoint is only resumed on the exchange date it was written.
+from av_scheduler import TokenBucket, get_scheduler  # Paces Gemini calls; the Alpha Vantage day budget decides the optional inputs.
+from quote_cache import get_quote_cache  # "today" quotes are fetched in bulk up front.
+from ticker_news import ticker_news_agent, ticker_news_batch  # News for many tickers with as few requests as possible.
+from tickeranalysis import tickeranalysis  # The per-ticker analysis.
+from tickerchange import tickerpricechange  # The per-ticker price change.
+
+# Threads fetching data and waiting on Gemini. Alpha Vantage calls are still paced by the
+# scheduler, so this bounds concurrency, not the request rate.
+DEFAULT_WORKERS = 8
+
+# Gemini calls in flight at once.
+DEFAULT_LLM_CONCURRENCY = 4
+
+# Tickers per news request (see ticker_news_batch) and per bulk quote request.
+NEWS_CHUNK_SIZE = 25
+QUOTE_CHUNK_SIZE = 100
+
+
+def _chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def read_checkpoint(path, timeframe, as_of=None):
+    """
+    Returns the finished results recorded in a checkpoint file for the given timeframe (and, if
+    'as_of' is given, the given exchange date), as {ticker: result}. A missing file is an empty
+    checkpoint; a line cut short by a crash is ignored.
+    """
+    results = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if as_of is not None and record.get("as_of") != as_of:
+                    continue
+                if record.get("timeframe") == timeframe and record.get("ticker"):
+                    results[record["ticker"]] = record
+    except FileNotFoundError:
+        pass
+    return results
+
+
+class BatchAnalysis:
+    """
+    Runs tickeranalysis over a list of tickers (e.g. for a morning report) in a bounded worker
+    pool, checkpointing every finished ticker so an interrupted run picks up where it stopped.
+
+    - News is fetched up front in chunks with ticker_news_batch (usually one market-wide request
+      per chunk), and for "today" the quotes with one bulk request per 100 tickers.
+    - Each worker then gets its ticker's price change and asks Gemini for the analysis. At most
+      'llm_concurrency' Gemini calls run at once, optionally paced to 'llm_calls_per_minute'.
+      Alpha Vantage requests go through the scheduler, which keeps them within the API budget.
+    - Technical indicators and, for "today", the session's intraday bars each cost one more Alpha
+      Vantage request per ticker (on top of its news and price change), so they are optional. By
+      default each is included only if the scheduler's remaining day budget covers them for every
+      pending ticker; pass True or False to decide explicitly.
+    - Every finished ticker is appended to the checkpoint (JSON lines) right away. A new run with
+      the same checkpoint and timeframe on the same exchange date skips tickers that already
+      succeeded and retries failed ones. Records from an earlier date are ignored, so rerunning the
+      command the next morning starts afresh instead of reusing yesterday's "today".
+    - When the run ends, all results are written, in ticker order, to 'output' as one JSON report.
+
+    Args:
+        tickers (iterable of str): The tickers to analyze. Duplicates are analyzed once.
+        timeframe (str, optional): Timeframe passed to tickeranalysis.
+        output (str, optional): Path of the consolidated JSON report.
+        checkpoint (str, optional): Path of the checkpoint file. Defaults to 'output' plus
+            '.checkpoint.jsonl'; without either, nothing is checkpointed.
+        workers (int, optional): Size of the worker pool.
+        llm_concurrency (int, optional): Gemini calls in flight at once.
+        llm_calls_per_minute (int, optional): Gemini request limit; None for no limit.
+        as_of (str, optional): The run's exchange date (ISO format) recorded with every result;
+            only results with the same date are resumed. Defaults to today's exchange date.
+        include_technicals (bool, optional): Add the technical indicators to each analysis. None
+            (the default) includes them if the day budget allows.
+        include_intraday (bool, optional): Add the intraday bars to "today" analyses. None (the
+            default) includes them if the day budget allows.
+    """
+
+    def __init__(self, tickers, timeframe="today", output=None, checkpoint=None, workers=DEFAULT_WORKERS,
+                 llm_concurrency=DEFAULT_LLM_CONCURRENCY, llm_calls_per_minute=None, as_of=None,
+                 include_technicals=None, include_intraday=None):
+        self.tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+        self.timeframe = timeframe
+        self.output = output
+        self.checkpoint = checkpoint or (output + ".checkpoint.jsonl" if output else None)
+        self.workers = workers
+        self.as_of = as_of or market_hours.exchange_now().date().isoformat()
+        self.include_technicals = include_technicals
+        self.include_intraday = include_intraday if timeframe.lower() == "today" else False
+        self._llm_slots = threading.Semaphore(llm_concurrency)
+        self._llm_budget = TokenBucket(llm_calls_per_minute, 60.0) if llm_calls_per_minute else None
+        self._llm_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._results = {}
+        # Counters exposed through stats().
+        self.resumed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.wall_seconds = 0.0
+
+    def run(self):
+        """
+        Analyzes every ticker not already finished in the checkpoint.
+
+        Returns:
+            dict: Maps each ticker to its result: a dict with 'ticker', 'timeframe', 'as_of', 'status'
+            ("ok" or "failed"), 'price_change', 'analysis', 'error' and 'finished_at'.
+        """
+        started = time.perf_counter()
+        if self.checkpoint:
+            finished = read_checkpoint(self.checkpoint, self.timeframe, self.as_of)
+            self._results = {ticker: result for ticker, result in finished.items()
+                             if ticker in self.tickers and result.get("status") == "ok"}
+            self.resumed = len(self._results)
+        pending = [ticker for ticker in self.tickers if ticker not in self._results]
+        self._plan_optional_inputs(len(pending))
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+                def submit(fn, *args):
+                    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+                # The shared fetches are queued first, so workers waiting on them never hold up the pool.
+                news, quotes = {}, {}
+                for chunk in _chunks(pending, NEWS_CHUNK_SIZE):
+                    future = submit(self._fetch_news, chunk)
+                    news.update((ticker, future) for ticker in chunk)
+                if self.timeframe.lower() == "today":
+                    for chunk in _chunks(pending, QUOTE_CHUNK_SIZE):
+                        future = submit(self._fetch_quotes, chunk)
+                        quotes.update((ticker, future) for ticker in chunk)
+                analyses = [submit(self._analyze, ticker, news[ticker], quotes.get(ticker)) for ticker in pending]
+                for future in analyses:
+                    future.result()
+
+        self.wall_seconds = time.perf_counter() - started
+        results = {ticker: self._results[ticker] for ticker in self.tickers if ticker in self._results}
+        if self.output:
+            self._write_report(results)
+        return results
+
+    def stats(self):
+        """
+        Returns the run's counters: tickers resumed from the checkpoint, analyzed, failed, and wall time.
+        """
+        return {
+            "tickers": len(self.tickers),
+            "resumed": self.resumed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "wall_seconds": self.wall_seconds,
+            "technicals": bool(self.include_technicals),
+            "intraday": bool(self.include_intraday),
+        }
+
+    def _plan_optional_inputs(self, pending):
+        # Settle the optional inputs left to the budget: include them only if the day budget covers
+        # them on top of about one request per pending ticker for its news and price change.
+        auto = [name for name in ("include_technicals", "include_intraday") if getattr(self, name) is None]
+        if not auto:
+            return
+        needed = pending * (1 + len(auto))
+        remaining = get_scheduler().remaining_today()
+        include = remaining >= needed
+        if not include:
+            print(f"Alpha Vantage day budget too low for technical indicators and intraday bars "
+                  f"({remaining} calls left, about {needed} needed); analyzing without them.")
+        for name in auto:
+            setattr(self, name, include)
+
+    def _fetch_news(self, tickers):
+        try:
+            return ticker_news_batch(tickers)
+        except Exception as e:
+            # The workers fall back to fetching their ticker's news themselves.
+            print(f"Batched news fetch failed for {len(tickers)} tickers: {e}")
+            return {}
+
+    def _fetch_quotes(self, tickers):
+        # Fills the shared quote cache, so the workers' "today" price changes are cache hits.
+        try:
+            get_quote_cache().get_many(tickers)
+        except Exception as e:
+            print(f"Bulk quote fetch failed for {len(tickers)} tickers: {e}")
+
+    def _analyze(self, ticker, news_future, quotes_future):
+        analysis = None
+        if quotes_future is not None:
+            quotes_future.result()
+        price_change = tickerpricechange(ticker, self.timeframe)
+        # Tickers the batched fetch had nothing for get a request of their own.
+        news = news_future.result().get(ticker) or ticker_news_agent(ticker, max_articles=5)
+        if price_change is None:
+            error = "price change unavailable"
+        elif news is None:
+            error = "no news"
+        else:
+            with self._llm_slots:
+                self._wait_for_llm_budget()
+                # An empty string leaves an input out of the prompt without fetching it.
+                analysis = tickeranalysis(ticker, self.timeframe, news=news, price_change=price_change,
+                                          technicals=None if self.include_technicals else "",
+                                          intraday=None if self.include_intraday else "")
+            error = None if analysis is not None else "analysis failed"
+        self._finish({
+            "ticker": ticker,
+            "timeframe": self.timeframe,
+            "as_of": self.as_of,
+            "status": "failed" if error else "ok",
+            "price_change": price_change,
+            "analysis": analysis,
+            "error": error,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def _wait_for_llm_budget(self):
+        if self._llm_budget is None:
+            return
+        with self._llm_lock:
+            while True:
+                wait = self._llm_budget.wait_time(time.monotonic())
+                if wait <= 0:
+                    self._llm_budget.take(time.monotonic())
+                    return
+                time.sleep(wait)
+
+    def _finish(self, result):
+        # Record a finished ticker in memory and in the checkpoint.
+        with self._checkpoint_lock:
+            self._results[result["ticker"]] = result
+            if result["status"] == "ok":
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            if self.checkpoint:
+                with open(self.checkpoint, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result) + "\n")
+
+    def _write_report(self, results):
+        # Write to a temporary file first, so a crash never leaves a half-written report.
+        report = {
+            "timeframe": self.timeframe,
+            "as_of": self.as_of,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "stats": self.stats(),
+            "results": list(results.values()),
+        }
+        temporary = self.output + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(temporary, self.output)
+
+
+if __name__ == "__main__":
+    # python batch_analysis.py tickers.txt report.json [timeframe]
+    # The ticker file has one ticker per line (or comma-separated); rerun the same command on the
+    # same day to resume an interrupted run.
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python batch_analysis.py TICKER_FILE OUTPUT_JSON [TIMEFRAME]")
+        sys.exit(2)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        tickers = f.read().replace(",", "\n").split()
+    batch = BatchAnalysis(tickers, sys.argv[3] if len(sys.argv) > 3 else "today", output=sys.argv[2])
+    batch.run()
+    print(batch.stats())
@@ -0,0 +1,394 @@
+"""
+A local stand-in for the Alpha Vantage '/query' endpoint, for benchmarks.
+
+It serves deterministic synthetic data (derived from the ticker symbol) for the functions the
+agents use, with optional added latency and throttling, and counts the calls it receives.
+
+Example:
+    standin = AlphaVantageStandIn(latency=0.02)
+    base_url = standin.start()          # e.g. "http://127.0.0.1:54321/query"
+    ...                                 # point AlphaVantageClient(base_url=base_url) at it
+    print(standin.calls)                # {"GLOBAL_QUOTE": 10, ...}
+    standin.stop()
+
+With 'fixtures' it can also record and replay real responses:
+
+    AlphaVantageStandIn(fixtures="benchmarks/fixtures", mode="record")  # forwards to the real API
+    AlphaVantageStandIn(fixtures="benchmarks/fixtures")                 # replays what was recorded
+
+In replay mode, requests without a recorded response fall back to the synthetic data (and are
+counted in 'fixture_misses').
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+PREMIUM_INFORMATION = ("Thank you for using Alpha Vantage! This is a premium endpoint. You may subscribe to "
+                       "any of the premium plans at https://www.alphavantage.co/premium/ to instantly unlock "
+                       "all premium endpoints")
+THROTTLE_NOTE = ("Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute "
+                 "and 500 calls per day.")
+
+
+# The real endpoint, for record mode.
+DEFAULT_UPSTREAM_URL = "https://www.alphavantage.co/query"
+
+# Symbols mentioned by the synthetic market-wide news feed.
+NEWS_UNIVERSE = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX", "AMD", "INTC",
+                 "PLTR", "IBM", "ORCL", "CRM", "JPM", "BAC", "WMT", "KO", "DIS", "XOM"]
+
+
+# Parameters left out of fixture keys: the key is secret, and news top-ups ask for articles
+# since a moving 'time_from' that a replay should answer with the recorded feed.
+_VOLATILE_PARAMS = {"apikey", "time_from"}
+
+
+def fixture_name(params):
+    """
+    Returns the fixture file name for a query, e.g. "GLOBAL_QUOTE-AAPL-1a2b3c4d5e.json".
+    """
+    stable = {key: value for key, value in sorted(params.items()) if key not in _VOLATILE_PARAMS}
+    digest = hashlib.sha1(json.dumps(stable).encode()).hexdigest()[:10]
+    subject = (params.get("symbol") or params.get("tickers") or "all").replace(",", "_").replace("/", "_")
+    return f"{params.get('function', 'UNKNOWN')}-{subject}-{digest}.json"
+
+
+def _sentiment_label(score):
+    # Alpha Vantage's buckets, collapsed to three.
+    return "Bullish" if score > 0.15 else "Bearish" if score < -0.15 else "Neutral"
+
+
+def _rng(*parts):
+    # A random generator seeded from the request identity, so the same question gets the same answer.
+    return random.Random(zlib.crc32("|".join(map(str, parts)).encode()))
+
+
+def synthetic_daily_bars(ticker, count, end=None):
+    """
+    Returns 'count' synthetic daily bars for 'ticker' as (date, open, high, low, close, volume)
+    tuples ordered from oldest to newest, ending on the most recent weekday on or before 'end'.
+    """
+    end = end or date.today()
+    rng = _rng("daily", ticker)
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    days.reverse()
+
+    bars = []
+    price = 20.0 + rng.random() * 200.0
+    for day in days:
+        open_ = price
+        price = max(1.0, price * (1.0 + rng.gauss(0.0003, 0.02)))
+        high = max(open_, price) * (1.0 + abs(rng.gauss(0, 0.005)))
+        low = min(open_, price) * (1.0 - abs(rng.gauss(0, 0.005)))
+        volume = int(1_000_000 * (0.5 + rng.random()))
+        bars.append((day.isoformat(), round(open_, 4), round(high, 4), round(low, 4), round(price, 4), volume))
+    return bars
+
+
+class AlphaVantageStandIn:
+    """
+    A threaded local HTTP server that answers Alpha Vantage style '/query' requests.
+
+    Args:
+        latency (float, optional): Seconds to sleep before answering each request.
+        history_days (int, optional): Number of bars returned for 'outputsize=full'.
+        throttle_rate (float, optional): Fraction of requests answered with a rate-limit 'Note'.
+        premium (bool, optional): If True, premium endpoints (REALTIME_BULK_QUOTES) answer with data;
+            otherwise they answer with the premium 'Information' message, like a free key.
+        host (str, optional): Interface to bind. Defaults to 127.0.0.1.
+        port (int, optional): Port to bind. Defaults to an ephemeral port.
+        fixtures (str, optional): Directory of recorded responses (see fixture_name()).
+        mode (str, optional): "replay" serves recorded responses where there are any; "record"
+            forwards every request to 'upstream_url' and saves the response into 'fixtures'.
+        upstream_url (str, optional): The real endpoint used in record mode.
+    """
+
+    def __init__(self, latency=0.0, history_days=5000, throttle_rate=0.0, premium=False, host="127.0.0.1", port=0,
+                 fixtures=None, mode="replay", upstream_url=DEFAULT_UPSTREAM_URL):
+        if mode not in ("replay", "record"):
+            raise ValueError(f"Unknown stand-in mode '{mode}'.")
+        if mode == "record" and not fixtures:
+            raise ValueError("Record mode needs a fixtures directory.")
+        self.latency = latency
+        self.history_days = history_days
+        self.throttle_rate = throttle_rate
+        self.premium = premium
+        self.fixtures = fixtures
+        self.mode = mode
+        self.upstream_url = upstream_url
+        self.calls = Counter()
+        self.bytes_sent = 0
+        # Record/replay counters (for the whole run; reset_counts() leaves them alone).
+        self.recorded = 0
+        self.replayed = 0
+        self.fixture_misses = 0
+        self._lock = threading.Lock()
+        self._throttle_rng = random.Random(0)
+        self._daily_cache = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    def start(self):
+        # Serve in a background thread and return the query URL.
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+            self.bytes_sent = 0
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    # --- Payload builders -------------------------------------------------------------------
+
+    def respond(self, params):
+        """
+        Builds the response for a query. Returns (status, content_type, body_bytes).
+        """
+        function = params.get("function", "")
+        with self._lock:
+            self.calls[function] += 1
+        if self.mode == "record":
+            return self._record(params)
+        if self.fixtures:
+            response = self._replay(params)
+            if response is not None:
+                return response
+        with self._lock:
+            throttled = self.throttle_rate and self._throttle_rng.random() < self.throttle_rate
+        if throttled:
+            return self._json({"Note": THROTTLE_NOTE})
+
+        builder = getattr(self, "_" + function.lower(), None)
+        if builder is None:
+            return self._json({"Error Message": f"Invalid API call. Unknown function '{function}'."})
+        return builder(params)
+
+    def _record(self, params):
+        # Forward the request to the real API and save the answer, unless it is a throttling note,
+        # premium notice or error message (no use as a fixture).
+        response = requests.get(self.upstream_url, params=params, timeout=(5, 60))
+        content_type = response.headers.get("Content-Type", "application/json").split(";")[0]
+        body = response.content
+        try:
+            data = json.loads(body) if content_type == "application/json" else None
+        except ValueError:
+            data = None
+        notice = isinstance(data, dict) and any(key in data for key in ("Note", "Information", "Error Message"))
+        if response.status_code == 200 and not notice:
+            os.makedirs(self.fixtures, exist_ok=True)
+            stable = {key: value for key, value in params.items() if key not in _VOLATILE_PARAMS}
+            path = os.path.join(self.fixtures, fixture_name(params))
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"params": stable, "content_type": content_type, "body": body.decode("utf-8")}, f)
+            with self._lock:
+                self.recorded += 1
+        return response.status_code, content_type, body
+
+    def _replay(self, params):
+        # The recorded response for a query, or None if there isn't one.
+        path = os.path.join(self.fixtures, fixture_name(params))
+        try:
+            with open(path, encoding="utf-8") as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.fixture_misses += 1
+            return None
+        with self._lock:
+            self.replayed += 1
+        return 200, fixture["content_type"], fixture["body"].encode("utf-8")
+
+    def _json(self, payload, status=200):
+        return status, "application/json", json.dumps(payload).encode()
+
+    def _daily(self, ticker):
+        with self._lock:
+            bars = self._daily_cache.get(ticker)
+        if bars is None:
+            bars = synthetic_daily_bars(ticker, self.history_days)
+            with self._lock:
+                self._daily_cache[ticker] = bars
+        return bars
+
+    def _global_quote(self, params):
+        ticker = params.get("symbol", "").upper()
+        bars = self._daily(ticker)
+        last, previous = bars[-1], bars[-2]
+        change = last[4] - previous[4]
+        return self._json({"Global Quote": {
+            "01. symbol": ticker,
+            "02. open": f"{last[1]:.4f}",
+            "03. high": f"{last[2]:.4f}",
+            "04. low": f"{last[3]:.4f}",
+            "05. price": f"{last[4]:.4f}",
+            "06. volume": str(last[5]),
+            "07. latest trading day": last[0],
+            "08. previous close": f"{previous[4]:.4f}",
+            "09. change": f"{change:.4f}",
+            "10. change percent": f"{change / previous[4] * 100:.4f}%",
+        }})
+
+    def _realtime_bulk_quotes(self, params):
+        if not self.premium:
+            return self._json({"Information": PREMIUM_INFORMATION})
+        data = []
+        for ticker in [t for t in params.get("symbol", "").upper().split(",") if t][:100]:
+            bars = self._daily(ticker)
+            last, previous = bars[-1], bars[-2]
+            change = last[4] - previous[4]
+            data.append({
+                "symbol": ticker, "timestamp": f"{last[0]} 16:00:00.000", "open": f"{last[1]:.4f}",
+                "high": f"{last[2]:.4f}", "low": f"{last[3]:.4f}", "close": f"{last[4]:.4f}",
+                "volume": str(last[5]), "previous_close": f"{previous[4]:.4f}", "change": f"{change:.4f}",
+                "change_percent": f"{change / previous[4] * 100:.4f}",
+            })
+        return self._json({"endpoint": "Realtime Bulk Quotes", "data": data})
+
+    def _time_series_daily(self, params):
+        ticker = params.get("symbol", "").upper()
+        bars = self._daily(ticker)
+        if params.get("outputsize") != "full":
+            bars = bars[-100:]
+        if params.get("datatype") == "csv":
+            lines = ["timestamp,open,high,low,close,volume"]
+            lines += [f"{day},{o:.4f},{h:.4f},{l:.4f},{c:.4f},{v}" for day, o, h, l, c, v in reversed(bars)]
+            return 200, "application/x-download", ("\r\n".join(lines) + "\r\n").encode()
+        series = {
+            day: {"1. open": f"{o:.4f}", "2. high": f"{h:.4f}", "3. low": f"{l:.4f}",
+                  "4. close": f"{c:.4f}", "5. volume": str(v)}
+            for day, o, h, l, c, v in reversed(bars)
+        }
+        return self._json({
+            "Meta Data": {"1. Information": "Daily Prices (open, high, low, close) and Volumes", "2. Symbol": ticker},
+            "Time Series (Daily)": series,
+        })
+
+    def _time_series_intraday(self, params):
+        # The regular session of the latest daily bar: a random path from its open to its close.
+        ticker = params.get("symbol", "").upper()
+        interval = params.get("interval", "5min")
+        minutes = int(interval.replace("min", "") or 5)
+        day, open_, _, _, close, volume = self._daily(ticker)[-1]
+        count = 390 // minutes
+        rng = _rng("intraday", ticker, day, minutes)
+        walk = [0.0]
+        for _ in range(count):
+            walk.append(walk[-1] + rng.gauss(0.0, 0.003 * (minutes / 5) ** 0.5))
+        # Bend the walk so it ends at the daily close.
+        target = close / open_ - 1
+        path = [open_ * (1 + step + (target - walk[-1]) * i / count) for i, step in enumerate(walk)]
+        start = datetime.fromisoformat(day) + timedelta(hours=9, minutes=30)
+        bars = []
+        for i in range(count):
+            o, c = path[i], path[i + 1]
+            bars.append(((start + timedelta(minutes=minutes * i)).strftime("%Y-%m-%d %H:%M:%S"), o,
+                         max(o, c) * (1 + abs(rng.gauss(0, 0.0008))), min(o, c) * (1 - abs(rng.gauss(0, 0.0008))),
+                         c, int(volume / count * (0.5 + rng.random()))))
+        if params.get("outputsize") != "full":
+            bars = bars[-100:]
+        series = {
+            stamp: {"1. open": f"{o:.4f}", "2. high": f"{h:.4f}", "3. low": f"{l:.4f}",
+                    "4. close": f"{c:.4f}", "5. volume": str(v)}
+            for stamp, o, h, l, c, v in reversed(bars)
+        }
+        return self._json({
+            "Meta Data": {"1. Information": f"Intraday ({interval}) open, high, low, close prices and volume",
+                          "2. Symbol": ticker, "4. Interval": interval, "6. Time Zone": "US/Eastern"},
+            f"Time Series ({interval})": series,
+        })
+
+    def _news_sentiment(self, params):
+        # With 'tickers' the feed only holds articles mentioning all of them (as the real API
+        # does); without it, the latest market-wide news, each article mentioning a few symbols.
+        tickers = [t for t in params.get("tickers", "").upper().split(",") if t]
+        limit = min(int(params.get("limit", 50)), 1000 if not tickers else 50)
+        rng = _rng("news", ",".join(tickers), datetime.now().strftime("%Y%m%d%H"))
+        now = datetime.now()
+        # Ticker-specific feeds publish every 37 minutes; the market-wide feed every 3.
+        spacing = 37 if tickers else 3
+        feed = []
+        for i in range(limit):
+            mentioned = tickers or rng.sample(NEWS_UNIVERSE, rng.randint(1, 3))
+            score = round(rng.uniform(-0.6, 0.6), 6)
+            label = _sentiment_label(score)
+            ticker_sentiment = []
+            for ticker in mentioned:
+                ticker_score = round(max(-1.0, min(1.0, score + rng.uniform(-0.3, 0.3))), 6)
+                ticker_sentiment.append({"ticker": ticker, "relevance_score": f"{rng.random():.6f}",
+                                         "ticker_sentiment_score": f"{ticker_score:.6f}",
+                                         "ticker_sentiment_label": _sentiment_label(ticker_score)})
+            feed.append({
+                "title": f"{'/'.join(mentioned)} headline {i}",
+                "url": f"https://news.example.com/{'-'.join(tickers) or 'market'}/{now:%Y%m%d%H}/{i}",
+                "time_published": (now - timedelta(minutes=spacing * i)).strftime("%Y%m%dT%H%M%S"),
+                "summary": "Synthetic summary for benchmarking. " * 3,
+                "source": rng.choice(["Reuters", "Bloomberg", "Benzinga", "Motley Fool"]),
+                "overall_sentiment_score": score,
+                "overall_sentiment_label": label,
+                "ticker_sentiment": ticker_sentiment,
+            })
+        if params.get("time_from"):
+            # Like the real API: only articles published at or after time_from (YYYYMMDDTHHMM).
+            feed = [item for item in feed if item["time_published"][:13] >= params["time_from"]]
+        if params.get("time_to"):
+            feed = [item for item in feed if item["time_published"][:13] <= params["time_to"]]
+        return self._json({"items": str(len(feed)), "feed": feed})
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep connections alive between requests.
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without TCP_NODELAY a kept-alive connection
+            # stalls on delayed ACKs and the benchmark would measure that instead of the client.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if standin.latency:
+                    time.sleep(standin.latency)
+                status, content_type, body = standin.respond(params)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with standin._lock:
+                    standin.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean.
+
+        return Handler
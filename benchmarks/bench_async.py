@@ -0,0 +1,79 @@
+"""
+Throughput of StockAnalysisOrchestrator: sequential process_query vs. concurrent process_queries.
+
+Runs entirely offline against a local Alpha Vantage stand-in and a fake Gemini model:
+
+    python -m benchmarks.bench_async --queries 40 --concurrency 8 --llm-latency 0.3 --api-latency 0.1
+
+Both runs start from empty stores and caches in a temporary directory. The queries repeat, so
+the sequential run answers the repeats from its caches; concurrently, repeats that are in flight
+at the same time can both miss them, and the call counts come out somewhat higher.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+QUERIES = [
+    "Why did Tesla stock drop today?",
+    "What is the current price of Apple?",
+    "How has Nvidia stock changed in the last week?",
+    "What's happening with Palantir stock recently?",
+    "Did Amazon's price go up last month?",
+    "Tell me something about Google's stock.",
+    "How has Microsoft stock changed in the last year?",
+    "What is the current price of Netflix?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake Gemini call")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="seconds per stand-in Alpha Vantage call")
+    args = parser.parse_args()
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import AlphaVantageStandIn
+    standin = AlphaVantageStandIn(latency=args.api_latency)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The stores are persistent: keep the synthetic bars, news and analyses out of the real
+        # data directory.
+        os.environ["STOCK_CACHE_DIR"] = tmp
+
+        import av_scheduler
+        import orchaesterate
+        from benchmarks.bench_suite import reset_state
+        from benchmarks.fake_gemini import install_fake_models
+
+        model = install_fake_models(latency=args.llm_latency)
+        # The benchmark measures concurrency, not the free-tier budget.
+        av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+        orchestrator = orchaesterate.StockAnalysisOrchestrator()
+        queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+        for label in ("sequential", "concurrent"):
+            # Each run starts cold (empty bar and news stores, no cached quotes or analyses), so
+            # both pay the same downloads and Gemini calls.
+            reset_state(os.path.join(tmp, label))
+            standin.reset_counts()
+            llm_calls = model.calls
+            started = time.perf_counter()
+            if label == "sequential":
+                responses = [orchestrator.process_query(query) for query in queries]
+            else:
+                responses = orchestrator.process_queries(queries, concurrency=args.concurrency)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>10}: {len(responses)} queries in {elapsed:6.2f} s | "
+                  f"{len(responses) / elapsed:6.2f} queries/s | "
+                  f"{standin.total_calls()} Alpha Vantage calls | {model.calls - llm_calls} LLM calls")
+        reset_state(os.path.join(tmp, "done"))
+    standin.stop()
+
+if __name__ == "__main__":
+    main()
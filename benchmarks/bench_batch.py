@@ -0,0 +1,87 @@
+"""
+Wall time of analyzing a ticker universe: the serial tickeranalysis loop vs. BatchAnalysis.
+
+Runs against a local Alpha Vantage stand-in and a fake Gemini model, so it needs no API keys and
+no network:
+
+    python -m benchmarks.bench_batch --tickers 30 --workers 8 --api-latency 0.05 --llm-latency 0.5
+
+Every run starts from empty stores and caches. The second batch run leaves out the technical
+indicators and intraday bars, which cost one Alpha Vantage request per ticker each. The last run resumes a batch that was stopped
+halfway, from its checkpoint, and shows that only the remaining tickers are fetched and analyzed.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=30, help="universe size")
+    parser.add_argument("--timeframe", default="today", help="timeframe of the analyses")
+    parser.add_argument("--workers", type=int, default=8, help="BatchAnalysis worker pool size")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Gemini calls in flight at once")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per stand-in Alpha Vantage call")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    args = parser.parse_args()
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import NEWS_UNIVERSE, AlphaVantageStandIn
+    standin = AlphaVantageStandIn(latency=args.api_latency)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+    universe = (NEWS_UNIVERSE + [f"TKR{i:03d}" for i in range(args.tickers)])[:args.tickers]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["STOCK_CACHE_DIR"] = tmp
+
+        import av_scheduler
+        from batch_analysis import BatchAnalysis
+        from benchmarks.bench_suite import reset_state
+        from benchmarks.fake_gemini import install_fake_models
+        from tickeranalysis import tickeranalysis
+
+        model = install_fake_models(latency=args.llm_latency)
+        # The benchmark measures the pipeline, not the free-tier budget.
+        av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+        checkpoint = os.path.join(tmp, "resume.checkpoint.jsonl")
+
+        def serial():
+            return sum(tickeranalysis(ticker, args.timeframe) is not None for ticker in universe)
+
+        def batch(tickers=universe, path=None, extras=None):
+            runner = BatchAnalysis(tickers, args.timeframe, checkpoint=path, workers=args.workers,
+                                   llm_concurrency=args.llm_concurrency, include_technicals=extras,
+                                   include_intraday=extras)
+            runner.run()
+            return runner.stats()["succeeded"]
+
+        def interrupt():
+            # A run over the first half stands in for one that died halfway.
+            batch(universe[:len(universe) // 2], checkpoint)
+
+        print(f"{len(universe)} tickers, timeframe {args.timeframe!r}, Alpha Vantage {args.api_latency * 1000:.0f} ms, "
+              f"Gemini {args.llm_latency * 1000:.0f} ms per call\n")
+        runs = [("serial loop", None, serial),
+                (f"batch ({args.workers} workers)", None, batch),
+                ("batch, no extras", None, lambda: batch(extras=False)),
+                ("resumed batch", interrupt, lambda: batch(universe, checkpoint))]
+        for number, (label, prepare, run) in enumerate(runs):
+            reset_state(os.path.join(tmp, f"run{number}"))
+            if prepare is not None:
+                prepare()
+            standin.reset_counts()
+            llm_before = model.calls
+            started = time.perf_counter()
+            analyzed = run()
+            elapsed = time.perf_counter() - started
+            print(f"{label:>20}: {elapsed:6.2f} s | {analyzed:3d} analyzed | "
+                  f"{standin.total_calls():3d} Alpha Vantage calls | {model.calls - llm_before:3d} Gemini calls")
+        reset_state(os.path.join(tmp, "done"))
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
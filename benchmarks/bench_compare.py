@@ -0,0 +1,102 @@
+"""
+Time to compare many tickers: the vectorized Comparison vs. a loop over ticker pairs.
+
+Needs no network access; the daily series are simulated with a one-factor model (a shared market
+return plus each ticker's own noise), and some tickers list partway through the window:
+
+    python -m benchmarks.bench_compare --sizes 10 100 500 --years 5
+
+For each universe size, the vectorized side aligns every series on one date index and computes
+returns, relative performance, the full correlation and beta matrices and the rolling correlation
+and beta against a benchmark. The loop side intersects the dates of each pair and calls
+np.corrcoef / np.cov on it, the way repeated per-ticker lookups would; it is skipped above
+--loop-max tickers. Where both run, the correlation and beta matrices are compared.
+"""
+import argparse
+import time
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def simulate_universe(count, years, seed):
+    # 'count' tickers plus the benchmark "MKT" (the factor itself), weekdays only.
+    from price_series import DailySeries
+
+    rng = np.random.default_rng(seed)
+    days = years * TRADING_DAYS_PER_YEAR
+    dates = np.busday_offset("2020-01-01", np.arange(days), roll="forward")
+    market = rng.normal(0.0003, 0.01, days)
+    series = [DailySeries("MKT", dates, *([100 * np.cumprod(1 + market)] * 4), np.ones(days))]
+    for number in range(count):
+        beta = rng.uniform(0.3, 1.8)
+        returns = beta * market + rng.normal(0.0, rng.uniform(0.005, 0.03), days)
+        # About one ticker in five lists partway through the window.
+        start = int(rng.integers(0, days // 2)) if rng.random() < 0.2 else 0
+        closes = 50 * np.cumprod(1 + returns[start:])
+        series.append(DailySeries(f"T{number:04d}", dates[start:], closes, closes, closes, closes,
+                                  np.ones(days - start)))
+    return series
+
+
+def vectorized(series_list, window):
+    from compare import Comparison
+
+    comparison = Comparison.from_series(series_list, window, benchmark="MKT")
+    comparison.performance()
+    comparison.rolling()
+    return comparison.correlation(), comparison.beta()
+
+
+def pair_loop(series_list):
+    # Each pair aligned on the dates both have, one pair at a time.
+    count = len(series_list)
+    correlation = np.full((count, count), np.nan)
+    beta = np.full((count, count), np.nan)
+    for i, a in enumerate(series_list):
+        for j, b in enumerate(series_list):
+            if j < i:
+                continue
+            _, in_a, in_b = np.intersect1d(a.dates, b.dates, return_indices=True)
+            x = np.diff(a.close[in_a]) / a.close[in_a][:-1]
+            y = np.diff(b.close[in_b]) / b.close[in_b][:-1]
+            covariance = np.cov(x, y)
+            correlation[i, j] = correlation[j, i] = np.corrcoef(x, y)[0, 1]
+            beta[i, j], beta[j, i] = covariance[0, 1] / covariance[1, 1], covariance[0, 1] / covariance[0, 0]
+    return correlation, beta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="universe sizes")
+    parser.add_argument("--years", type=int, default=5, help="years of daily bars per ticker")
+    parser.add_argument("--loop-max", type=int, default=200, help="largest universe the pair loop runs on")
+    parser.add_argument("--seed", type=int, default=11, help="random seed of the series")
+    args = parser.parse_args()
+
+    print(f"{args.years} years of daily bars, benchmark MKT\n")
+    # Warm up imports and BLAS, so the first size isn't charged for them.
+    warmup = simulate_universe(2, 1, args.seed)
+    vectorized(warmup, (warmup[0].dates[0].astype(object), warmup[0].dates[-1].astype(object)))
+    for size in args.sizes:
+        series_list = simulate_universe(size, args.years, args.seed)
+        # The whole simulated history is compared.
+        window = (series_list[0].dates[0].astype(object), series_list[0].dates[-1].astype(object))
+        started = time.perf_counter()
+        correlation, beta = vectorized(series_list, window)
+        fast = time.perf_counter() - started
+        line = f"{size:5d} tickers: vectorized {fast * 1000:9.1f} ms"
+        if size <= args.loop_max:
+            started = time.perf_counter()
+            expected_correlation, expected_beta = pair_loop(series_list)
+            slow = time.perf_counter() - started
+            error = max(np.nanmax(np.abs(correlation - expected_correlation)), np.nanmax(np.abs(beta - expected_beta)))
+            line += f" | pair loop {slow * 1000:9.1f} ms ({slow / fast:5.0f}x) | max difference {error:.1e}"
+        else:
+            line += " | pair loop skipped"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
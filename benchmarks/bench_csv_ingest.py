@@ -0,0 +1,84 @@
+"""
+Parse time and peak memory of a full daily history: JSON into a dict of bars vs. streamed CSV into arrays.
+
+Runs against a local Alpha Vantage stand-in, so it needs no API key and no network:
+
+    python -m benchmarks.bench_csv_ingest --bars 25000 --repeat 5
+
+"JSON" is the previous full-download path: the 'TIME_SERIES_DAILY' JSON decoded into a nested
+dict, converted to rows and then to a DailySeries. "CSV" is csv_ingest.fetch_daily_csv, which
+requests datatype=csv and parses each line into typed arrays as it arrives. Times are the median
+of --repeat runs without tracemalloc; peak memory is measured in a separate traced run.
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+
+def json_path(ticker):
+    from av_scheduler import get_scheduler
+    from price_series import DailySeries
+
+    data = get_scheduler().query({"function": "TIME_SERIES_DAILY", "symbol": ticker, "outputsize": "full"})
+    rows = sorted(
+        (day, float(bar["1. open"]), float(bar["2. high"]), float(bar["3. low"]), float(bar["4. close"]),
+         float(bar["5. volume"]))
+        for day, bar in data["Time Series (Daily)"].items()
+    )
+    return DailySeries.from_rows(ticker, rows)
+
+
+def csv_path(ticker):
+    from csv_ingest import fetch_daily_csv
+
+    return fetch_daily_csv(ticker, outputsize="full")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=25000, help="bars of history served by the stand-in")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per path")
+    args = parser.parse_args()
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import AlphaVantageStandIn
+    standin = AlphaVantageStandIn(history_days=args.bars)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+
+    import av_scheduler
+    import numpy as np
+
+    # The benchmark measures parsing, not the free-tier budget.
+    av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+
+    results = {}
+    for label, load in (("JSON", json_path), ("CSV", csv_path)):
+        series = load("AAPL")  # Warm up (connection, stand-in's bar generation).
+        times = []
+        for _ in range(args.repeat):
+            standin.reset_counts()
+            started = time.perf_counter()
+            series = load("AAPL")
+            times.append(time.perf_counter() - started)
+        response_bytes = standin.bytes_sent
+
+        tracemalloc.start()
+        load("AAPL")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[label] = series
+        print(f"{label:>4}: {len(series)} bars in {statistics.median(times) * 1000:7.1f} ms (median) | "
+              f"peak traced memory {peak / 2**20:6.1f} MiB | response {response_bytes / 2**20:5.1f} MiB")
+
+    same = all(np.array_equal(getattr(results["JSON"], column), getattr(results["CSV"], column))
+               for column in ("dates", "open", "high", "low", "close", "volume"))
+    print(f"Both paths produce the same series: {same}")
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-call latency of Alpha Vantage requests with pooled (keep-alive) vs. unpooled connections.
+
+Runs against a local stand-in server, so it needs no API key and no network:
+
+    python -m benchmarks.bench_http_pool --calls 300 --latency 0.005
+
+Against a plain-HTTP local server the difference is the TCP handshake and connection setup;
+against the real HTTPS endpoint the unpooled path additionally pays a TLS handshake per call.
+"""
+import argparse
+import statistics
+import time
+
+from av_client import AlphaVantageClient
+from benchmarks.av_standin import AlphaVantageStandIn
+
+
+def measure(client, calls, symbols):
+    # Time each call individually and return the latencies in milliseconds.
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        client.query({"function": "GLOBAL_QUOTE", "symbol": symbols[i % len(symbols)]})
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"{label:>9}: mean {statistics.mean(ordered):7.3f} ms | p50 {statistics.median(ordered):7.3f} ms | "
+          f"p95 {p95:7.3f} ms | {len(ordered)} calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="server-side latency per request (seconds)")
+    args = parser.parse_args()
+
+    standin = AlphaVantageStandIn(latency=args.latency)
+    base_url = standin.start()
+    symbols = ["AAPL", "MSFT", "NVDA", "TSLA", "AMZN"]
+    try:
+        for label, pooled in (("unpooled", False), ("pooled", True)):
+            client = AlphaVantageClient(api_key="bench", base_url=base_url, pooled=pooled)
+            measure(client, 5, symbols)  # Warm up (and open the pooled connection).
+            summarize(label, measure(client, args.calls, symbols))
+            client.close()
+    finally:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
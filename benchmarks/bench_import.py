@@ -0,0 +1,88 @@
+"""
+Import (cold start) time of the agents, from `python -X importtime`, and the one-off cost of the first model.
+
+Each run imports the module in a fresh interpreter, so nothing is cached between runs:
+
+    python -m benchmarks.bench_import --module orchaesterate --runs 5 --top 10
+
+The report shows the wall time of `import <module>` (median over the runs), the slowest imports
+by cumulative time, whether the Gemini SDK was loaded at import, and how long the first
+providers.get_model() call takes (that is where the SDK is loaded now).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Reports what the import loaded; printed on the last line of the child's stdout.
+_CHILD = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed, 'google.generativeai' in sys.modules, 'numpy' in sys.modules, 'requests' in sys.modules)
+"""
+
+_FIRST_MODEL = """
+import time
+import {module}
+from providers import get_model
+started = time.perf_counter()
+get_model()
+print(time.perf_counter() - started)
+"""
+
+
+def _run(code, importtime=False):
+    command = [sys.executable, "-W", "ignore"] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    # Keys only need to exist; nothing here talks to the network.
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "benchmark"))
+    result = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1], result.stderr
+
+
+def _parse_importtime(stderr):
+    # Lines look like "import time:   self [us] | cumulative | imported package".
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="orchaesterate")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        line, _ = _run(_CHILD.format(module=args.module))
+        elapsed, genai_loaded, numpy_loaded, requests_loaded = line.split()
+        timings.append(float(elapsed))
+    print(f"import {args.module}: median {statistics.median(timings) * 1000:7.1f} ms | "
+          f"min {min(timings) * 1000:7.1f} ms over {args.runs} fresh interpreters")
+    print(f"  loaded at import: google.generativeai={genai_loaded} numpy={numpy_loaded} requests={requests_loaded}")
+
+    _, stderr = _run(_CHILD.format(module=args.module), importtime=True)
+    rows = sorted(_parse_importtime(stderr), reverse=True)
+    print("\nSlowest imports (cumulative, from -X importtime):")
+    for cumulative_us, self_us, name in rows[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms cumulative | {self_us / 1000:7.1f} ms self | {name}")
+
+    try:
+        line, _ = _run(_FIRST_MODEL.format(module=args.module))
+        print(f"\nFirst get_model() (Gemini SDK import + configure): {float(line) * 1000:7.1f} ms, paid once per process")
+    except subprocess.CalledProcessError as e:
+        print(f"\nFirst get_model() failed (is google-generativeai installed?): {e.stderr.strip().splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-ticker compute time of the technical indicators over 20 years of daily bars: a full compute
+vs. an incremental update when a new bar arrives.
+
+Runs on synthetic bars in memory, so it needs no API key and no network:
+
+    python -m benchmarks.bench_indicators --years 20 --tickers 50 --repeat 5
+
+"full" is the first request for a ticker (every indicator over the whole history, vectorized);
+"incremental" folds one new bar into the kept state; "reuse" is a request with no new bars.
+"arrays" is indicator_arrays(), every indicator for every bar. Each is the median per ticker.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+
+def synthetic_series(ticker, bars, seed):
+    from price_series import DailySeries
+
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+    volume = rng.lognormal(15, 0.4, bars)
+    dates = np.datetime64("2004-01-02") + np.arange(bars)
+    return DailySeries(ticker, dates, close, close * 1.01, close * 0.99, close, volume)
+
+
+def truncated(series, count):
+    from price_series import DailySeries
+
+    return DailySeries(series.ticker, series.dates[:count], series.open[:count], series.high[:count],
+                       series.low[:count], series.close[:count], series.volume[:count])
+
+
+def per_ticker_ms(function, items, repeat):
+    # Median over 'repeat' runs of the mean time per item, in milliseconds.
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            function(item)
+        times.append((time.perf_counter() - started) / len(items) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=float, default=20, help="years of daily bars per ticker")
+    parser.add_argument("--tickers", type=int, default=50, help="number of tickers")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs")
+    args = parser.parse_args()
+
+    from indicators import IndicatorEngine, indicator_arrays
+
+    bars = int(args.years * 252)
+    universe = [synthetic_series(f"T{i:03d}", bars, i) for i in range(args.tickers)]
+    previous = [truncated(series, bars - 1) for series in universe]
+
+    def full(series):
+        IndicatorEngine().update(series)
+
+    engines = {}
+
+    def prepare():
+        for series in previous:
+            engines[series.ticker] = IndicatorEngine()
+            engines[series.ticker].update(series)
+
+    def incremental(series):
+        engines[series.ticker].update(series)
+
+    print(f"{args.tickers} tickers x {bars} bars ({args.years:g} years)\n")
+    print(f"{'full':>12}: {per_ticker_ms(full, universe, args.repeat):7.3f} ms per ticker")
+    times = []
+    for _ in range(args.repeat):
+        prepare()
+        times.append(per_ticker_ms(incremental, universe, 1))
+    print(f"{'incremental':>12}: {statistics.median(times):7.3f} ms per ticker (one new bar)")
+    print(f"{'reuse':>12}: {per_ticker_ms(incremental, universe, args.repeat):7.3f} ms per ticker (no new bars)")
+    print(f"{'arrays':>12}: {per_ticker_ms(indicator_arrays, universe, args.repeat):7.3f} ms per ticker (every bar)")
+
+
+if __name__ == "__main__":
+    main()
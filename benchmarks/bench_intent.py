@@ -0,0 +1,81 @@
+"""
+Intent parsing latency: the LLM for every query vs. the rule-based fast path with LLM fallback.
+
+Runs entirely offline with a fake Gemini model (and a local Alpha Vantage stand-in, should the
+ticker resolver need it):
+
+    python -m benchmarks.bench_intent --queries 40 --llm-latency 0.5
+
+Only the intent/ticker/timeframe step is timed; the sub-agents the orchestrator would call next
+are the same for both paths.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Typical questions, plus a few the rules leave to the LLM.
+QUERIES = [
+    "What is the current price of Apple?",
+    "Why did Tesla stock drop today?",
+    "How has Nvidia stock changed in the last week?",
+    "What's happening with Palantir stock recently?",
+    "Did Amazon's price go up last month?",
+    "How has Microsoft done across every horizon?",
+    "Any news on AMD?",
+    "How has MSFT performed year to date?",
+    "Should I buy Nvidea?",
+    "What do analysts think about the chip sector?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    args = parser.parse_args()
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import AlphaVantageStandIn
+    standin = AlphaVantageStandIn()
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the resolver's listing and memo out of the real data directory.
+        os.environ["STOCK_CACHE_DIR"] = tmp
+
+        import av_scheduler
+        import intent_rules
+        import orchaesterate
+        from benchmarks.fake_gemini import install_fake_models
+        from ticker_resolver import get_resolver
+
+        model = install_fake_models(latency=args.llm_latency)
+        av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+        orchestrator = orchaesterate.StockAnalysisOrchestrator()
+        queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+        # Load the resolver's index before timing, as a long-running process would have.
+        get_resolver().resolve("AAPL")
+
+        for label, parse in (("LLM", orchestrator._llm_intent), ("rules+LLM", orchestrator._parse_intent)):
+            intent_rules._classifier = intent_rules.IntentClassifier()
+            model.calls = 0
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                parse(query)
+                latencies.append(time.perf_counter() - started)
+            print(f"{label:>9}: p50 {statistics.median(latencies) * 1000:8.2f} ms, "
+                  f"mean {statistics.mean(latencies) * 1000:8.2f} ms, total {sum(latencies):6.2f} s | "
+                  f"{model.calls} LLM calls for {len(queries)} queries")
+        stats = intent_rules.get_intent_classifier().stats()
+        print(f"rules handled {stats['rule_hit_rate']:.0%} of queries, "
+              f"mean {stats['mean_rule_seconds'] * 1000:.2f} ms per classification")
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
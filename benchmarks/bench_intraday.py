@@ -0,0 +1,107 @@
+"""
+Per-bar cost and memory of IntradayBuffer's rolling statistics vs. recomputing them from a list of bars.
+
+Needs no network access; the bars are a simulated random walk:
+
+    python -m benchmarks.bench_intraday --bars 20000 --capacity 390 --move-bars 30
+
+The bars are 1-minute bars in sessions of 390 (a new session clears both sides). Both sides keep
+the session's latest 'capacity' bars and produce, after every bar, the VWAP, high, low and
+largest rise and drop over 'move-bars' bars. The recomputation rescans its bars each time (O(capacity)
+per bar); the buffer updates its sums and monotonic deques (amortized O(1) per bar). The results
+are compared after every bar, and a second pass measures the buffer's memory as bars stream in.
+"""
+import argparse
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+# 1-minute bars in a regular session.
+SESSION_BARS = 390
+
+
+def simulate_bars(count, seed):
+    # One-minute bars from 09:30, 390 per session, one session per day.
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0, 0.001, count)))
+    opens = np.concatenate([[100.0], closes[:-1]])
+    highs = np.maximum(opens, closes) * (1 + np.abs(rng.normal(0, 0.0005, count)))
+    lows = np.minimum(opens, closes) * (1 - np.abs(rng.normal(0, 0.0005, count)))
+    volumes = rng.integers(1_000, 10_000, count).astype(float)
+    index = np.arange(count)
+    times = (np.datetime64("2026-01-05T09:30") + (index // SESSION_BARS).astype("timedelta64[D]")
+             + (index % SESSION_BARS).astype("timedelta64[m]"))
+    return [(times[i], float(opens[i]), float(highs[i]), float(lows[i]), float(closes[i]), float(volumes[i]))
+            for i in range(count)]
+
+
+def recompute(bars, move_bars):
+    # The same statistics from scratch.
+    closes = [bar[4] for bar in bars]
+    volume = sum(bar[5] for bar in bars)
+    moves = [(closes[i] / closes[i - move_bars] - 1) * 100 for i in range(move_bars, len(closes))]
+    return (sum((bar[2] + bar[3] + bar[4]) / 3 * bar[5] for bar in bars) / volume,
+            max(bar[2] for bar in bars), min(bar[3] for bar in bars),
+            max(moves) if moves else None, min(moves) if moves else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=20000, help="bars streamed in")
+    parser.add_argument("--capacity", type=int, default=390, help="bars kept (one session of 1-minute bars)")
+    parser.add_argument("--move-bars", type=int, default=30, help="window of the largest rise and drop")
+    parser.add_argument("--seed", type=int, default=3, help="random seed of the bars")
+    args = parser.parse_args()
+
+    from intraday import IntradayBuffer
+
+    bars = simulate_bars(args.bars, args.seed)
+    print(f"{args.bars} bars, capacity {args.capacity}, {args.move_bars}-bar moves\n")
+
+    window = deque(maxlen=args.capacity)
+    expected = []
+    started = time.perf_counter()
+    for number, bar in enumerate(bars):
+        if number % SESSION_BARS == 0:
+            window.clear()
+        window.append(bar)
+        expected.append(recompute(window, args.move_bars))
+    naive = time.perf_counter() - started
+
+    buffer = IntradayBuffer("SIM", capacity=args.capacity, move_bars=args.move_bars)
+    summaries = []
+    started = time.perf_counter()
+    for bar in bars:
+        buffer.append(*bar)
+        summaries.append(buffer.summary())
+    incremental = time.perf_counter() - started
+
+    mismatches = 0
+    for (vwap, high, low, rise, drop), summary in zip(expected, summaries):
+        got_rise = summary["largest_rise"]["percent"] if summary["largest_rise"] else None
+        got_drop = summary["largest_drop"]["percent"] if summary["largest_drop"] else None
+        if (not np.isclose(vwap, summary["vwap"]) or high != summary["high"] or low != summary["low"]
+                or (rise is None) != (got_rise is None) or (rise is not None and not np.isclose(rise, got_rise))
+                or (drop is not None and not np.isclose(drop, got_drop))):
+            mismatches += 1
+
+    print(f"{'recompute':>12}: {naive / len(bars) * 1e6:8.2f} us per bar")
+    print(f"{'ring buffer':>12}: {incremental / len(bars) * 1e6:8.2f} us per bar (including summary())")
+    print(f"\nmismatches: {mismatches} of {len(bars)} bars")
+
+    # Memory held by a buffer as bars stream in: fixed once it is created.
+    tracemalloc.start()
+    buffer = IntradayBuffer("SIM", capacity=args.capacity, move_bars=args.move_bars)
+    held = []
+    for number, bar in enumerate(bars, 1):
+        buffer.append(*bar)
+        if number in (1, args.capacity, len(bars)):
+            held.append((number, tracemalloc.get_traced_memory()[0]))
+    tracemalloc.stop()
+    print("buffer memory: " + ", ".join(f"{size / 1024:.1f} KiB after {number} bars" for number, size in held))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Event-detection latency and calls per hour of the watchlist monitor: adaptive vs. round-robin polling.
+
+Simulates a trading session on a virtual clock, so it runs in well under a second and needs no
+network access:
+
+    python -m benchmarks.bench_monitor --calls-per-hour 60 --hours 6.5
+
+The watchlist mixes volatile, ordinary and quiet tickers (simulated prices, one step per
+second). Both monitors get the same budget and the same price paths; the only difference is
+adaptive=True/False. Detection latency is measured against the simulated path: the time from
+the second a move first crossed the threshold to the poll that reported it.
+"""
+import argparse
+
+import numpy as np
+
+# Volatility (percent per square root of a minute) of the simulated tickers.
+WATCHLIST = {
+    "VOL1": 0.30, "VOL2": 0.25,
+    "MID1": 0.10, "MID2": 0.10, "MID3": 0.08,
+    "QUIET1": 0.03, "QUIET2": 0.03, "QUIET3": 0.02, "QUIET4": 0.02, "QUIET5": 0.02,
+}
+
+
+def simulate_paths(seconds, seed):
+    # One price per second for each ticker: a geometric random walk starting at 100.
+    rng = np.random.default_rng(seed)
+    paths = {}
+    for ticker, volatility in WATCHLIST.items():
+        steps = rng.normal(0.0, volatility / 100 / np.sqrt(60), seconds)
+        paths[ticker] = 100 * np.exp(np.concatenate([[0.0], np.cumsum(steps)]))
+    return paths
+
+
+def run(paths, seconds, adaptive, calls_per_hour, threshold):
+    from quotes import Quote
+    from watchlist_monitor import WatchlistMonitor
+
+    clock = [0.0]
+
+    def fetch(ticker):
+        price = float(paths[ticker][int(clock[0])])
+        return Quote(ticker, price, 100.0, price - 100.0, price - 100.0, 0, None)
+
+    latencies = []
+
+    def on_event(event):
+        # Time since the path first crossed the threshold, searched back to the previous poll.
+        path = paths[event.ticker]
+        detected = int(event.detected_at)
+        previous = detected - int(event.latency_seconds)
+        moved = np.abs(path[previous + 1:detected + 1] / event.data["reference"] - 1) * 100 >= threshold
+        latencies.append(detected - (previous + 1 + int(np.argmax(moved))))
+
+    monitor = WatchlistMonitor(WATCHLIST, on_event=on_event, calls_per_hour=calls_per_hour,
+                               move_threshold=threshold, news_interval=0, adaptive=adaptive,
+                               market_hours_only=False, fetch=fetch, clock=lambda: clock[0])
+    while clock[0] < seconds:
+        delay = monitor.poll_once(clock[0])
+        # Prices move once a second, so that's the finest step worth simulating.
+        clock[0] += max(1.0, float(np.ceil(delay))) if delay > 0 else 0.0
+    return monitor.stats(), np.array(latencies, dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls-per-hour", type=int, default=60, help="monitor budget")
+    parser.add_argument("--hours", type=float, default=6.5, help="simulated market time")
+    parser.add_argument("--threshold", type=float, default=1.0, help="move threshold in percent")
+    parser.add_argument("--seed", type=int, default=7, help="random seed of the price paths")
+    args = parser.parse_args()
+
+    seconds = int(args.hours * 3600)
+    paths = simulate_paths(seconds, args.seed)
+    print(f"{len(WATCHLIST)} tickers, {args.hours:g} h, budget {args.calls_per_hour} calls/h, "
+          f"threshold {args.threshold:g}%\n")
+    for label, adaptive in (("round robin", False), ("adaptive", True)):
+        stats, latencies = run(paths, seconds, adaptive, args.calls_per_hour, args.threshold)
+        events = stats["events"].get("move", 0)
+        mean = latencies.mean() / 60 if len(latencies) else float("nan")
+        p95 = np.percentile(latencies, 95) / 60 if len(latencies) else float("nan")
+        print(f"{label:>11}: {stats['calls_per_hour']:5.1f} calls/h | {events:3d} move events | "
+              f"detection latency mean {mean:5.1f} min, p95 {p95:5.1f} min")
+
+
+if __name__ == "__main__":
+    main()
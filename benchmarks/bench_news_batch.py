@@ -0,0 +1,87 @@
+"""
+API calls and latency of watchlist news: one NEWS_SENTIMENT request per ticker vs. ticker_news_batch.
+
+Runs against a local Alpha Vantage stand-in, so it needs no API key and no network:
+
+    python -m benchmarks.bench_news_batch --tickers 10 --api-latency 0.2
+
+Both runs start from an empty news store. The report also shows the share of articles that carry
+a sentiment score, which the agents now read from the feed's per-ticker 'ticker_sentiment' entries.
+
+A last check stores one old article for a ticker, so its newest stored article predates the oldest
+article of the (shortened) market-wide feed, then tops it up with the batch. The articles published
+in between must come from the ticker's own request, so window() over the gap isn't empty.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=10, help="watchlist size (up to 20)")
+    parser.add_argument("--articles", type=int, default=5, help="articles per ticker")
+    parser.add_argument("--api-latency", type=float, default=0.2, help="seconds per stand-in Alpha Vantage call")
+    args = parser.parse_args()
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import NEWS_UNIVERSE, AlphaVantageStandIn
+    standin = AlphaVantageStandIn(latency=args.api_latency)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+
+    import av_scheduler
+    import news_store
+    import ticker_news
+
+    # The benchmark counts calls; it doesn't model the free-tier budget.
+    av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+    watchlist = NEWS_UNIVERSE[:args.tickers]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("per-ticker", "batched"):
+            news_store._store = news_store.NewsStore(db_path=os.path.join(tmp, f"{label}.sqlite3"))
+            standin.reset_counts()
+            started = time.perf_counter()
+            if label == "per-ticker":
+                results = {ticker: ticker_news.ticker_news_agent(ticker, args.articles) for ticker in watchlist}
+            else:
+                results = ticker_news.ticker_news_batch(watchlist, args.articles)
+            elapsed = time.perf_counter() - started
+            articles = [article for news in results.values() if news for article in news]
+            with_sentiment = sum(article["sentiment_score"] is not None for article in articles)
+            print(f"{label:>10}: {len(watchlist)} tickers in {elapsed * 1000:7.1f} ms | "
+                  f"{standin.total_calls()} Alpha Vantage calls | {len(articles)} articles, "
+                  f"{with_sentiment / len(articles):.0%} with sentiment")
+            news_store._store._conn.close()
+
+        gap_check(news_store.NewsStore(db_path=os.path.join(tmp, "gap.sqlite3"), batch_limit=100), watchlist)
+    standin.stop()
+
+
+def gap_check(store, watchlist):
+    # 100 market-wide articles reach back about 5 hours; the stored article is 20 hours old.
+    ticker = watchlist[0]
+    previous = (datetime.now() - timedelta(hours=20)).strftime("%Y%m%dT%H%M%S")
+    store._write([{"url": "https://news.example.com/old", "title": f"{ticker} old headline",
+                   "time_published": previous, "ticker_sentiment": [{"ticker": ticker}]}], ticker)
+    store._mark_checked([ticker])
+    with store._lock:
+        store._conn.execute("UPDATE news_meta SET last_checked = 0")
+        store._conn.commit()
+
+    store.top_up_many(watchlist)
+    feed_oldest = min(article["time_published"] for article in store.window(ticker, previous)
+                      if article["url"].startswith("https://news.example.com/market/"))
+    filled = [article for article in store.window(ticker, previous, feed_oldest)
+              if article["url"] != "https://news.example.com/old"]
+    print(f"\ngap check: {len(filled)} {ticker} articles stored between the old article ({previous}) and "
+          f"the batch feed's oldest ({feed_oldest}), {store.stats()['fallback_calls']} per-ticker request(s) "
+          f"-> {'OK' if filled else 'GAP'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Analysis prompt size with and without the token budget, as the number of articles grows.
+
+Runs offline on synthetic articles (with syndicated near-duplicate headlines):
+
+    python -m benchmarks.bench_prompt --articles 5 20 50 200 --budget 1200
+
+"unbounded" lists every article with its full summary; "budgeted" is the default
+AnalysisPromptBuilder. For each size it reports the estimated prompt tokens, the articles used,
+and whether the five most important distinct articles (relevance x |sentiment|) made it in.
+"""
+import argparse
+import random
+import time
+
+from prompt_builder import AnalysisPromptBuilder, _importance
+
+
+def synthetic_news(count, seed=0):
+    # Articles with varied relevance and sentiment; every fourth one re-runs an earlier headline
+    # with different capitalisation and a source tag, as syndicated stories do.
+    rng = random.Random(seed)
+    articles = []
+    for i in range(count):
+        if i % 4 == 3:
+            original = articles[rng.randrange(len(articles))]
+            title = original["title"].upper() + " - report"
+        else:
+            title = f"Story {i}: {rng.choice(['Earnings', 'Guidance', 'Recall', 'Upgrade', 'Lawsuit'])} update for ACME"
+        score = round(rng.uniform(-0.8, 0.8), 3)
+        articles.append({
+            "title": title, "url": f"https://news.example.com/{i}", "source": rng.choice(["Reuters", "Benzinga"]),
+            "summary": "Details of the story and what analysts made of it. " * rng.randint(3, 12),
+            "relevance_score": round(rng.random(), 3), "sentiment_score": score,
+            "sentiment_label": "Bullish" if score > 0.15 else "Bearish" if score < -0.15 else "Neutral",
+        })
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, nargs="+", default=[5, 20, 50, 200])
+    parser.add_argument("--budget", type=int, default=1200, help="token budget of the budgeted builder")
+    args = parser.parse_args()
+
+    for count in args.articles:
+        news = synthetic_news(count)
+        top = sorted((a for a in news if not a["title"].endswith(" - report")), key=_importance, reverse=True)[:5]
+        for label, builder in (("unbounded", AnalysisPromptBuilder(token_budget=None, summary_chars=10 ** 6)),
+                               ("budgeted", AnalysisPromptBuilder(token_budget=args.budget))):
+            started = time.perf_counter()
+            prompt = builder.build("ACME", "today", news, "$-1.23 (-2.50%) for today")
+            elapsed = time.perf_counter() - started
+            stats = builder.stats()
+            kept = sum(article["title"].lower() in prompt.lower() for article in top)
+            print(f"{count:4d} articles {label:>9}: {stats['last_tokens']:6d} tokens | "
+                  f"{stats['articles_used']:3d} used, {stats['duplicates_dropped']:3d} duplicates dropped | "
+                  f"top drivers kept {kept}/{len(top)} | built in {elapsed * 1000:5.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Time to first byte and total latency of price-drop analyses, buffered vs. streamed.
+
+Runs entirely offline against a local Alpha Vantage stand-in and a fake Gemini model that streams
+its answer in chunks:
+
+    python -m benchmarks.bench_streaming --queries 10 --llm-latency 2.0 --chunks 20 --api-latency 0.1
+
+"Buffered" is process_query (the whole answer arrives at once, so TTFB equals total latency);
+"streamed" is process_query(..., stream=True), which yields the price change and headlines first
+and then Gemini's text as it is generated.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+QUERIES = [
+    "Why did Tesla stock drop today?",
+    "Why did Nvidia stock drop today?",
+    "Why did Apple stock drop today?",
+    "Why did Palantir stock drop today?",
+]
+
+
+def summarize(label, ttfb, total):
+    print(f"{label:>9}: TTFB p50 {statistics.median(ttfb) * 1000:8.1f} ms, max {max(ttfb) * 1000:8.1f} ms | "
+          f"total p50 {statistics.median(total) * 1000:8.1f} ms, max {max(total) * 1000:8.1f} ms | {len(total)} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="seconds per fake Gemini call")
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per streamed Gemini answer")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="seconds per stand-in Alpha Vantage call")
+    args = parser.parse_args()
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import AlphaVantageStandIn
+    standin = AlphaVantageStandIn(latency=args.api_latency)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The stores are persistent: keep the synthetic bars, news and analyses out of the real
+        # data directory.
+        os.environ["STOCK_CACHE_DIR"] = tmp
+
+        import av_scheduler
+        import orchaesterate
+        import quote_cache
+        from benchmarks.bench_suite import reset_state
+        from benchmarks.fake_gemini import FakeGenerativeModel
+        from providers import register_model
+
+        register_model(FakeGenerativeModel(latency=args.llm_latency, chunks=args.chunks))
+        # The benchmark measures latency, not the free-tier budget.
+        av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+        orchestrator = orchaesterate.StockAnalysisOrchestrator()
+        queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+        for label in ("buffered", "streamed"):
+            # Each mode starts cold (empty bar and news stores, no cached analyses), so both pay the
+            # same Alpha Vantage round-trips and Gemini calls.
+            reset_state(os.path.join(tmp, label))
+            ttfb, total = [], []
+            for query in queries:
+                quote_cache.get_quote_cache().clear()
+                started = time.perf_counter()
+                if label == "buffered":
+                    orchestrator.process_query(query)
+                    ttfb.append(time.perf_counter() - started)
+                else:
+                    first = None
+                    for _ in orchestrator.process_query(query, stream=True):
+                        if first is None:
+                            first = time.perf_counter() - started
+                    ttfb.append(first)
+                total.append(time.perf_counter() - started)
+            summarize(label, ttfb, total)
+        reset_state(os.path.join(tmp, "done"))
+    standin.stop()
+
+if __name__ == "__main__":
+    main()
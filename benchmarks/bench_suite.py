@@ -0,0 +1,214 @@
+"""
+End-to-end benchmark suite: latency percentiles, upstream calls and throughput of every agent.
+
+Runs entirely offline against the local Alpha Vantage stand-in and the fake Gemini model, either
+on synthetic data or replaying fixtures recorded with benchmarks.record_fixtures:
+
+    python -m benchmarks.bench_suite --iterations 20 --api-latency 0.05 --llm-latency 0.5
+    python -m benchmarks.bench_suite --fixtures benchmarks/fixtures
+
+Each case starts from empty caches and stores and calls its agent 'iterations' times, cycling
+through the tickers, so the numbers include both first (cold) and repeated (warm) calls. Cases:
+tickerprice, tickerpricechange for each timeframe, ticker_news_agent, tickeranalysis and
+process_query.
+
+As a regression gate, save a baseline and compare later runs against it; the run fails (exit
+status 1) if a case's p95 latency grows by more than --tolerance or it makes more upstream calls:
+
+    python -m benchmarks.bench_suite --save baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+DEFAULT_TICKERS = ["AAPL", "MSFT", "NVDA", "TSLA", "AMZN"]
+
+# process_query questions, cycled through with the tickers.
+QUERY_TEMPLATES = [
+    "What is the current price of {ticker}?",
+    "How has {ticker} stock changed in the last week?",
+    "What's happening with {ticker} stock recently?",
+    "Why did {ticker} stock drop today?",
+]
+
+
+def cases(orchestrator):
+    """
+    Returns the benchmark cases as (name, function of a ticker) pairs. The agents are imported
+    here, after the caller has pointed them at the stand-in.
+    """
+    from ticker_news import ticker_news_agent
+    from tickeranalysis import tickeranalysis
+    from tickerchange import tickerpricechange
+    from tickerprice import tickerprice
+
+    query_number = iter(range(sys.maxsize))
+    return [
+        ("tickerprice", tickerprice),
+        ("tickerpricechange[today]", lambda ticker: tickerpricechange(ticker, "today")),
+        ("tickerpricechange[last week]", lambda ticker: tickerpricechange(ticker, "last week")),
+        ("tickerpricechange[last month]", lambda ticker: tickerpricechange(ticker, "last month")),
+        ("tickerpricechange[last year]", lambda ticker: tickerpricechange(ticker, "last year")),
+        ("ticker_news_agent", lambda ticker: ticker_news_agent(ticker, max_articles=5)),
+        ("tickeranalysis", lambda ticker: tickeranalysis(ticker, "today")),
+        ("process_query", lambda ticker: orchestrator.process_query(
+            QUERY_TEMPLATES[next(query_number) % len(QUERY_TEMPLATES)].format(ticker=ticker))),
+    ]
+
+
+def reset_state(directory):
+    """
+    Points the local stores at an empty directory and drops the process-wide caches, so the next
+    case starts cold.
+    """
+    import analysis_cache
+    import bar_store
+    import indicators
+    import intent_rules
+    import intraday
+    import news_store
+    import prompt_builder
+    import quote_cache
+
+    os.makedirs(directory, exist_ok=True)
+    os.environ["STOCK_CACHE_DIR"] = directory
+    bar_store._store = None
+    news_store._store = None
+    quote_cache._cache = None
+    analysis_cache._cache = None
+    prompt_builder._builder = None
+    intent_rules._classifier = None
+    indicators._engine = None
+    intraday._tracker = None
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile.
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def run_case(function, tickers, iterations, standin, model):
+    """
+    Calls 'function' for 'iterations' tickers in turn and returns the case's measurements.
+    """
+    standin.reset_counts()
+    llm_calls_before = model.calls
+    latencies = []
+    failures = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        result = function(tickers[i % len(tickers)])
+        latencies.append(time.perf_counter() - call_started)
+        if result is None:
+            failures += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "throughput_per_s": iterations / elapsed if elapsed else 0.0,
+        "upstream_calls": standin.total_calls(),
+        "upstream_by_function": dict(standin.calls),
+        "llm_calls": model.calls - llm_calls_before,
+        "failures": failures,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints how each case changed against a baseline and returns the names of regressed cases.
+    """
+    regressions = []
+    print(f"\nAgainst baseline (tolerance {tolerance:.0%} on p95):")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"  {name:<30} new case")
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        regressed = change > tolerance or result["upstream_calls"] > before["upstream_calls"]
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<30} p95 {before['p95_ms']:8.1f} -> {result['p95_ms']:8.1f} ms ({change:+.0%}) | "
+              f"upstream {before['upstream_calls']} -> {result['upstream_calls']}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="calls per case")
+    parser.add_argument("--tickers", default=",".join(DEFAULT_TICKERS), help="comma-separated tickers")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per stand-in Alpha Vantage call")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    parser.add_argument("--fixtures", help="replay responses recorded by benchmarks.record_fixtures")
+    parser.add_argument("--cases", help="comma-separated case names to run (default: all)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    args = parser.parse_args()
+    tickers = [ticker.strip().upper() for ticker in args.tickers.split(",") if ticker.strip()]
+
+    # The Alpha Vantage client requires a key; the stand-in doesn't check it.
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+    from benchmarks.av_standin import AlphaVantageStandIn
+    standin = AlphaVantageStandIn(latency=args.api_latency, fixtures=args.fixtures)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = standin.start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Everything the agents persist goes to the temporary directory.
+        os.environ["STOCK_CACHE_DIR"] = tmp
+
+        import av_scheduler
+        import orchaesterate
+        from benchmarks.fake_gemini import install_fake_models
+
+        model = install_fake_models(latency=args.llm_latency, fixtures=args.fixtures)
+        # The suite measures the pipeline, not the free-tier budget.
+        av_scheduler.set_scheduler(av_scheduler.RequestScheduler(calls_per_minute=100000, calls_per_day=10000000))
+        orchestrator = orchaesterate.StockAnalysisOrchestrator()
+        selected = set(args.cases.split(",")) if args.cases else None
+        # Open the client's connections and run the agents' lazy imports outside the measurements.
+        reset_state(os.path.join(tmp, "warmup"))
+        for _, function in cases(orchestrator):
+            function(tickers[0])
+
+        print(f"{len(tickers)} tickers, {args.iterations} calls per case, "
+              f"{'fixtures from ' + args.fixtures if args.fixtures else 'synthetic data'}\n")
+        print(f"{'case':<30} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'calls/s':>8} {'upstream':>8} {'LLM':>5}")
+        for number, (name, function) in enumerate(cases(orchestrator)):
+            if selected and name not in selected:
+                continue
+            reset_state(os.path.join(tmp, f"case{number}"))
+            result = run_case(function, tickers, args.iterations, standin, model)
+            results[name] = result
+            print(f"{name:<30} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f} {result['max_ms']:9.1f} "
+                  f"{result['throughput_per_s']:8.1f} {result['upstream_calls']:8d} {result['llm_calls']:5d}"
+                  f"{'  (' + str(result['failures']) + ' failed)' if result['failures'] else ''}")
+        reset_state(os.path.join(tmp, "done"))
+    standin.stop()
+
+    if args.fixtures:
+        print(f"\nFixtures: {standin.replayed} responses replayed, {standin.fixture_misses} synthetic; "
+              f"{model.replayed} Gemini answers replayed")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+A fake Gemini model for benchmarks, with configurable latency and no network access.
+
+It recognises the prompts the agents send (intent parsing, ticker identification, analysis)
+and answers them deterministically from the user query, so the whole pipeline can run offline.
+
+Example:
+    model = install_fake_models(latency=0.3)   # every agent now uses the fake model
+    ...
+    print(model.calls)
+
+Real answers can be recorded with RecordingModel and replayed by passing the same fixtures
+directory to the fake model; prompts without a recorded answer get the synthetic one.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# Company names the fake model can resolve, mirroring the examples in the agents' prompts.
+KNOWN_COMPANIES = {
+    "apple": "AAPL", "microsoft": "MSFT", "google": "GOOGL", "alphabet": "GOOGL", "amazon": "AMZN",
+    "tesla": "TSLA", "nvidia": "NVDA", "palantir": "PLTR", "meta": "META", "facebook": "META",
+    "netflix": "NFLX", "amd": "AMD", "intel": "INTC", "berkshire hathaway": "BRK.A", "general electric": "GE",
+}
+
+ANALYSIS_TEXT = (
+    "**1. Price and Volume Context:** The stock moved in line with the reported change. "
+    "**2. Recent News Analysis:** Headlines were mixed, with sentiment leaning slightly positive. "
+    "**3. Correlation and Causation:** The move coincided with the most relevant headline. "
+    "**4. Broader Market Context:** Sector peers traded similarly. "
+    "**5. Summary of Key Drivers:** Company news and sector flows explain most of the move."
+)
+
+
+class FakeResponse:
+    """Mimics the parts of a Gemini response the agents use ('.text')."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _find_ticker(text):
+    lowered = text.lower()
+    for name, symbol in KNOWN_COMPANIES.items():
+        if name in lowered:
+            return symbol
+    match = re.search(r"\b[A-Z]{2,5}\b", text)
+    return match.group(0) if match else None
+
+
+def _intent_answer(query):
+    lowered = query.lower()
+    if "why" in lowered or "drop" in lowered:
+        intent = "Investigate price drop reason"
+    elif "current price" in lowered or "price of" in lowered:
+        intent = "Get current price"
+    elif "news" in lowered or "happening" in lowered:
+        intent = "Get recent news"
+    elif "go up" in lowered or "go down" in lowered:
+        intent = "Analyze price change direction"
+    elif "changed" in lowered or "how has" in lowered or "performed" in lowered:
+        intent = "Get price change"
+    else:
+        intent = "Get general information"
+    timeframe = next((t for t in ("today", "week", "month", "year") if t in lowered), "today")
+    timeframe = timeframe if timeframe == "today" else f"last {timeframe}"
+    return f"Intent: {intent}\nTicker: {_find_ticker(query) or ''}\nTimeframe: {timeframe}"
+
+
+# File, inside a fixtures directory, holding recorded Gemini answers keyed by prompt hash.
+GEMINI_FIXTURES = "gemini.json"
+
+
+def _prompt_key(prompt):
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+def load_answers(fixtures):
+    """
+    Returns the recorded answers in a fixtures directory as {prompt hash: text} ({} if none).
+    """
+    path = os.path.join(fixtures, GEMINI_FIXTURES)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RecordingModel:
+    """
+    Wraps a real Gemini model and saves every answer into a fixtures directory, for later
+    replay by FakeGenerativeModel. Streamed answers are recorded once the stream is consumed.
+    """
+
+    def __init__(self, model, fixtures):
+        self.model = model
+        self.fixtures = fixtures
+        self.answers = load_answers(fixtures)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        response = self.model.generate_content(prompt, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(prompt, response)
+        self._save(prompt, response.text)
+        return response
+
+    def _record_stream(self, prompt, chunks):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk.text)
+            yield chunk
+        self._save(prompt, "".join(parts))
+
+    def _save(self, prompt, text):
+        with self._lock:
+            self.answers[_prompt_key(prompt)] = text
+            os.makedirs(self.fixtures, exist_ok=True)
+            path = os.path.join(self.fixtures, GEMINI_FIXTURES)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.answers, f, indent=1)
+            os.replace(path + ".tmp", path)
+
+
+class FakeGenerativeModel:
+    """
+    Stands in for google.generativeai.GenerativeModel.
+
+    Args:
+        latency (float, optional): Seconds each generate_content call takes (spread across the
+            chunks when streaming).
+        chunks (int, optional): Number of chunks a streamed response is split into.
+        fixtures (str, optional): Directory with recorded answers (see RecordingModel) to replay.
+    """
+
+    def __init__(self, latency=0.0, chunks=8, fixtures=None):
+        self.latency = latency
+        self.chunks = chunks
+        self.answers = load_answers(fixtures) if fixtures else {}
+        self.calls = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        text = self.answer(prompt)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency)
+        return FakeResponse(text)
+
+    def answer(self, prompt):
+        recorded = self.answers.get(_prompt_key(prompt))
+        if recorded is not None:
+            with self._lock:
+                self.replayed += 1
+            return recorded
+        # Work out which agent sent the prompt and answer accordingly.
+        query = prompt.rsplit("User Query:", 1)[-1].split("\n")[0].strip()
+        if "understanding user queries" in prompt:
+            return _intent_answer(query)
+        if "identify the stock ticker" in prompt:
+            return _find_ticker(query) or query.upper()
+        return ANALYSIS_TEXT
+
+    def _stream(self, text):
+        # Yield the text in roughly equal chunks, sleeping before each one.
+        size = max(1, len(text) // self.chunks + 1)
+        for start in range(0, len(text), size):
+            time.sleep(self.latency / self.chunks)
+            yield FakeResponse(text[start:start + size])
+
+
+def install_fake_models(latency=0.0, fixtures=None):
+    """
+    Replaces the Gemini model used by every agent with one shared FakeGenerativeModel.
+
+    Returns:
+        FakeGenerativeModel: The installed model (its 'calls' counter counts LLM round-trips).
+    """
+    from providers import register_model
+
+    model = FakeGenerativeModel(latency=latency, fixtures=fixtures)
+    register_model(model)
+    return model
@@ -0,0 +1,61 @@
+"""
+Records real Alpha Vantage and Gemini responses as fixtures for the benchmark suite.
+
+Needs real keys (ALPHA_VANTAGE_API_KEY and GEMINI_API_KEY, e.g. from .env) and network access:
+
+    python -m benchmarks.record_fixtures --tickers AAPL,MSFT --out benchmarks/fixtures
+
+It runs every case of benchmarks.bench_suite once per ticker, with the Alpha Vantage client
+pointed at a stand-in in record mode (which forwards each request to the real API and saves the
+answer) and Gemini wrapped in a RecordingModel. Replay them with:
+
+    python -m benchmarks.bench_suite --fixtures benchmarks/fixtures
+
+Requests go through the regular scheduler, so a free Alpha Vantage key is respected (and a
+recording of several tickers takes a few minutes).
+"""
+import argparse
+import os
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", default="AAPL,MSFT", help="comma-separated tickers")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "fixtures"), help="fixtures directory")
+    args = parser.parse_args()
+    tickers = [ticker.strip().upper() for ticker in args.tickers.split(",") if ticker.strip()]
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from benchmarks.av_standin import AlphaVantageStandIn
+    from benchmarks.av_standin import DEFAULT_UPSTREAM_URL
+    recorder = AlphaVantageStandIn(fixtures=args.out, mode="record",
+                                   upstream_url=os.environ.get("ALPHA_VANTAGE_BASE_URL") or DEFAULT_UPSTREAM_URL)
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = recorder.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Start from empty stores, so every request the suite can make is recorded.
+        os.environ["STOCK_CACHE_DIR"] = tmp
+
+        import orchaesterate
+        from benchmarks.bench_suite import cases, reset_state
+        from benchmarks.fake_gemini import RecordingModel
+        from providers import get_model, register_model
+
+        model = RecordingModel(get_model(), args.out)
+        register_model(model)
+        orchestrator = orchaesterate.StockAnalysisOrchestrator()
+        for number, (name, function) in enumerate(cases(orchestrator)):
+            reset_state(os.path.join(tmp, f"case{number}"))
+            for ticker in tickers:
+                print(f"Recording {name} for {ticker}...")
+                function(ticker)
+        reset_state(os.path.join(tmp, "done"))
+    recorder.stop()
+    print(f"Recorded {recorder.recorded} Alpha Vantage responses and {len(model.answers)} Gemini answers in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import contextvars  # Loader threads run in a copy of the caller's context (request priority, spans).
+from concurrent.futures import ThreadPoolExecutor  # Loads the tickers' daily series concurrently.
+
+import numpy as np  # The aligned series and every statistic are NumPy matrices.
+import requests  # Import the requests library for its exception types.
+
+import bar_store  # The stored daily bars the comparison is computed from.
+import tracing  # Loads and failures show up in the query's spans and metrics.
+from price_series import window_bounds  # Window specifications ("1Y", "last month", "ytd", ...).
+
+# Window compared when the query doesn't name one.
+DEFAULT_WINDOW = "1Y"
+
+# Reference for beta and relative performance.
+DEFAULT_BENCHMARK = "SPY"
+
+# Bars per window of the rolling correlation and beta (about a quarter).
+DEFAULT_ROLLING_WINDOW = 63
+
+# Fewer overlapping daily returns than this leave a correlation or beta undefined (NaN).
+MIN_OVERLAP = 20
+
+# Threads loading daily series. Alpha Vantage calls are still paced by the scheduler.
+DEFAULT_WORKERS = 8
+
+
+def align_closes(series_list):
+    """
+    Aligns several tickers' daily closes on one date index: the union of their dates.
+
+    A ticker missing a date inside its own history (a halt, a holiday on another exchange) takes
+    its previous close; before its first bar and after its last one it is NaN.
+
+    Args:
+        series_list (list of DailySeries): The tickers' series.
+
+    Returns:
+        tuple: (dates, closes), a datetime64[D] array of length T and a T x N matrix.
+    """
+    non_empty = [series.dates for series in series_list if len(series)]
+    if non_empty:
+        # The union as a histogram of day numbers: one pass instead of sorting every date.
+        days = np.concatenate(non_empty).astype(np.int64)
+        first_day = days.min()
+        dates = (np.flatnonzero(np.bincount(days - first_day)) + first_day).astype("datetime64[D]")
+    else:
+        dates = np.empty(0, dtype="datetime64[D]")
+    closes = np.full((len(dates), len(series_list)), np.nan)
+    first = np.zeros(len(series_list), dtype=np.int64)
+    last = np.full(len(series_list), -1, dtype=np.int64)
+    for column, series in enumerate(series_list):
+        if len(series):
+            rows = np.searchsorted(dates, series.dates)
+            closes[rows, column] = series.close
+            first[column], last[column] = rows[0], rows[-1]
+
+    # Forward-fill: each cell takes the latest row at or above it that has a close.
+    rows = np.arange(len(dates))[:, None]
+    filled = np.maximum.accumulate(np.where(np.isnan(closes), 0, rows), axis=0)
+    closes = closes[filled, np.arange(len(series_list))]
+    closes[(rows < first) | (rows > last)] = np.nan
+    return dates, closes
+
+
+def _pairwise_moments(returns):
+    # Covariance of every pair of columns over the rows where both have a value (pairwise-complete),
+    # plus each side's variance over those same rows. One matrix product per sum, so N x N pairs
+    # cost a few BLAS calls rather than N x N loops; the matrices are symmetric, so the other
+    # side's sums are transposes.
+    present = ~np.isnan(returns)
+    values = np.where(present, returns, 0.0)
+    present = present.astype(np.float64)
+    n = present.T @ present
+    sums = values.T @ present  # (i, j): sum of column i over the rows where j has a value.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (values.T @ values - sums * sums.T / n) / (n - 1)
+        var = ((values * values).T @ present - sums ** 2 / n) / (n - 1)
+    enough = n >= MIN_OVERLAP
+    return np.where(enough, cov, np.nan), np.where(enough, var, np.nan), np.where(enough, var.T, np.nan)
+
+
+class Comparison:
+    """
+    Several tickers' daily closes aligned over one window, with their returns, relative
+    performance, correlation and beta computed in vectorized passes over the aligned matrix.
+
+    Correlations and betas use pairwise-complete daily returns, so a ticker with a shorter
+    history still pairs with the others over the dates they share.
+
+    Args:
+        tickers (list of str): Column labels.
+        dates (numpy.ndarray): The aligned dates (datetime64[D]).
+        closes (numpy.ndarray): T x N aligned closes (NaN where a ticker has no history).
+        benchmark (str, optional): One of 'tickers', the reference for beta and relative performance.
+        compared (list of str, optional): The tickers asked about, when the benchmark was only
+            added for reference. Defaults to all of 'tickers'.
+    """
+
+    def __init__(self, tickers, dates, closes, benchmark=None, compared=None):
+        self.tickers = list(tickers)
+        self.compared = [ticker for ticker in compared if ticker in self.tickers] if compared else list(self.tickers)
+        self.dates = dates
+        self.closes = closes
+        self.benchmark = benchmark if benchmark in self.tickers else None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.returns = closes[1:] / closes[:-1] - 1
+        self._moments = None
+
+    @classmethod
+    def from_series(cls, series_list, window=DEFAULT_WINDOW, benchmark=None, compared=None):
+        """
+        Aligns the series (see align_closes) and keeps the rows inside 'window', counted back from
+        the latest date of any of them.
+
+        Raises:
+            ValueError: If the window is not understood or no series covers it.
+        """
+        dates, closes = align_closes(series_list)
+        if not len(dates):
+            raise ValueError("No daily data to compare.")
+        start, end, valid = window_bounds(dates, [window])
+        if not valid[0]:
+            raise ValueError(f"The daily data doesn't cover {window}.")
+        rows = slice(int(start[0]), int(end[0]) + 1)
+        return cls([series.ticker for series in series_list], dates[rows], closes[rows], benchmark, compared)
+
+    def performance(self):
+        """
+        Returns each ticker's performance over the window.
+
+        Returns:
+            dict: Maps each ticker to a dict with 'start_date' and 'start_price' (its first close in
+            the window), 'end_price', 'percent_change' and 'relative_percent' (the change minus the
+            benchmark's, or the group's mean without a benchmark), or to None without data.
+        """
+        present = ~np.isnan(self.closes)
+        first = np.argmax(present, axis=0)
+        last = len(self.closes) - 1 - np.argmax(present[::-1], axis=0)
+        columns = np.arange(len(self.tickers))
+        start, end = self.closes[first, columns], self.closes[last, columns]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            change = (end / start - 1) * 100
+        reference = change[self.tickers.index(self.benchmark)] if self.benchmark else np.nanmean(change)
+        results = {}
+        for column, ticker in enumerate(self.tickers):
+            if not present[:, column].any():
+                results[ticker] = None
+                continue
+            results[ticker] = {
+                "start_date": str(self.dates[first[column]]),
+                "start_price": float(start[column]),
+                "end_price": float(end[column]),
+                "percent_change": float(change[column]),
+                "relative_percent": float(change[column] - reference),
+            }
+        return results
+
+    def rebased(self):
+        """
+        Returns the T x N closes rebased to 100 at each ticker's first close in the window.
+        """
+        present = ~np.isnan(self.closes)
+        first = self.closes[np.argmax(present, axis=0), np.arange(len(self.tickers))]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.closes / first * 100
+
+    def correlation(self):
+        """
+        Returns the N x N correlation matrix of daily returns (NaN for pairs with too little overlap).
+        """
+        cov, var_x, var_y = self._pairwise_moments()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return cov / np.sqrt(var_x * var_y)
+
+    def beta(self):
+        """
+        Returns the N x N beta matrix: entry (i, j) is the beta of ticker i's daily returns on
+        ticker j's, cov(i, j) / var(j) over the dates they share.
+        """
+        cov, _, var_y = self._pairwise_moments()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return cov / var_y
+
+    def _pairwise_moments(self):
+        # Shared by correlation() and beta(), so asking for both costs one pass.
+        if self._moments is None:
+            self._moments = _pairwise_moments(self.returns)
+        return self._moments
+
+    def rolling(self, window=DEFAULT_ROLLING_WINDOW, reference=None):
+        """
+        Returns the rolling correlation and beta of every ticker against one reference ticker.
+
+        Computed from cumulative sums of the masked returns, so each window costs O(1) per ticker
+        whatever its length.
+
+        Args:
+            window (int, optional): Daily returns per window.
+            reference (str, optional): The reference ticker; defaults to the benchmark.
+
+        Returns:
+            tuple: (dates, correlation, beta): the window end dates and two (T - window) x N matrices
+            (NaN where a window has fewer than 'window' // 2 shared returns). None without a reference
+            or if the comparison is shorter than the window.
+        """
+        reference = reference or self.benchmark
+        if reference not in self.tickers or len(self.returns) < window:
+            return None
+        x = self.returns
+        y = x[:, [self.tickers.index(reference)]]
+        mask = (~np.isnan(x) & ~np.isnan(y)).astype(np.float64)
+        x0, y0 = np.where(mask > 0, x, 0.0), np.where(mask > 0, y, 0.0)
+
+        def windowed(values):
+            # Sum over each trailing window, from one cumulative sum.
+            total = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+            return total[window:] - total[:-window]
+
+        n = windowed(mask)
+        sum_x, sum_y = windowed(x0), windowed(y0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = windowed(x0 * y0) - sum_x * sum_y / n
+            var_x = windowed(x0 * x0) - sum_x ** 2 / n
+            var_y = windowed(y0 * y0) - sum_y ** 2 / n
+            enough = n >= window // 2
+            correlation = np.where(enough, cov / np.sqrt(var_x * var_y), np.nan)
+            beta = np.where(enough, cov / var_y, np.nan)
+        return self.dates[window:], correlation, beta
+
+
+def _load_series(ticker):
+    try:
+        return bar_store.get_store().get_series(ticker)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Could not load daily data for {ticker}: {e}")
+        tracing.record_error(e)
+        return None
+
+
+@tracing.traced()
+def compare_tickers(tickers, window=DEFAULT_WINDOW, benchmark=DEFAULT_BENCHMARK, workers=DEFAULT_WORKERS):
+    """
+    Loads the tickers' daily series (from the local bar store, concurrently) and compares them
+    over a window.
+
+    Args:
+        tickers (iterable of str): The tickers to compare. Duplicates are compared once.
+        window (optional): Window specification understood by DailySeries.returns ("1Y",
+            "last month", "ytd", ...).
+        benchmark (str, optional): Reference ticker for beta and relative performance; it is
+            loaded too (and added as the last column) if it isn't one of 'tickers'. None for none.
+        workers (int, optional): Threads loading series.
+
+    Returns:
+        Comparison: The comparison of the tickers that have data, or None (after printing why)
+        if fewer than two of them do.
+    """
+    tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+    wanted = tickers + ([benchmark.upper()] if benchmark and benchmark.upper() not in tickers else [])
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(wanted))), thread_name_prefix="compare") as pool:
+        loaded = list(pool.map(lambda ticker: contextvars.copy_context().run(_load_series, ticker), wanted))
+    series_list = [series for series in loaded if series is not None and len(series)]
+    if sum(series.ticker in tickers for series in series_list) < 2:
+        print(f"Not enough daily data to compare {', '.join(tickers)}.")
+        return None
+    try:
+        return Comparison.from_series(series_list, window, benchmark.upper() if benchmark else None, tickers)
+    except ValueError as e:
+        print(f"Could not compare {', '.join(tickers)}: {e}")
+        tracing.record_error(e)
+        return None
+
+
+def format_comparison(comparison, window=DEFAULT_WINDOW, max_pairs=5):
+    """
+    Returns a comparison as text: each ticker's change and relative performance (best first), its
+    beta to the benchmark, and the most and least correlated pairs.
+    """
+    performance = comparison.performance()
+    tickers = comparison.compared
+    ranked = sorted((ticker for ticker in tickers if performance[ticker]),
+                    key=lambda ticker: performance[ticker]["percent_change"], reverse=True)
+    label = comparison.benchmark or "group mean"
+    betas = comparison.beta()
+    reference = comparison.tickers.index(comparison.benchmark) if comparison.benchmark else None
+
+    lines = [f"Comparison over {window} ({comparison.dates[0]} to {comparison.dates[-1]}):"]
+    for ticker in ranked:
+        result = performance[ticker]
+        line = f"- {ticker}: {result['percent_change']:+.2f}% ({result['relative_percent']:+.2f}% vs {label})"
+        if reference is not None and ticker != comparison.benchmark:
+            beta = betas[comparison.tickers.index(ticker), reference]
+            if not np.isnan(beta):
+                line += f", beta {beta:.2f}"
+        lines.append(line)
+    if comparison.benchmark not in tickers and comparison.benchmark and performance[comparison.benchmark]:
+        lines.append(f"- {comparison.benchmark} (benchmark): {performance[comparison.benchmark]['percent_change']:+.2f}%")
+
+    # Pairs among the compared tickers (not the benchmark), by correlation of daily returns.
+    correlation = comparison.correlation()
+    columns = [comparison.tickers.index(ticker) for ticker in tickers]
+    pairs = [(correlation[a, b], comparison.tickers[a], comparison.tickers[b])
+             for i, a in enumerate(columns) for b in columns[i + 1:] if not np.isnan(correlation[a, b])]
+    pairs.sort(reverse=True)
+    if pairs:
+        shown = pairs if len(pairs) <= 2 * max_pairs else pairs[:max_pairs] + pairs[-max_pairs:]
+        lines.append("Correlation of daily returns: " + ", ".join(f"{a}/{b} {value:.2f}" for value, a, b in shown))
+    return "\n".join(lines)
+
+
+def comparison_summary(tickers, window=DEFAULT_WINDOW, benchmark=DEFAULT_BENCHMARK):
+    """
+    Returns the comparison of several tickers over a window as text (see format_comparison),
+    or None (after printing why) if they can't be compared.
+    """
+    comparison = compare_tickers(tickers, window, benchmark)
+    return format_comparison(comparison, window) if comparison is not None else None
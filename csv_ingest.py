@@ -0,0 +1,115 @@
+import json  # Alpha Vantage answers errors with JSON even when CSV was requested.
+from array import array  # Growable typed arrays: one machine value per field, no per-bar objects kept.
+from datetime import date  # For turning bar dates into day numbers.
+
+import numpy as np  # The parsed columns end up as NumPy arrays in a DailySeries.
+
+from av_client import AlphaVantageThrottled, _throttle_message  # Rate-limit payloads are reported like the JSON path does.
+from av_scheduler import get_scheduler  # Quota-aware scheduler in front of the shared Alpha Vantage client.
+from price_series import DailySeries  # NumPy-backed view of a ticker's bars.
+
+# Bytes read from the network at a time while parsing.
+CHUNK_SIZE = 64 * 1024
+
+# Day number of 1970-01-01, so dates become days since the epoch (what datetime64[D] stores).
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Columns of Alpha Vantage's daily CSV, in the order the series needs them.
+_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def _text(line):
+    return line.decode("utf-8") if isinstance(line, bytes) else line
+
+
+def parse_daily_csv(ticker, lines):
+    """
+    Parses a daily 'TIME_SERIES_DAILY' CSV (datatype=csv) line by line into a DailySeries.
+
+    Each bar goes straight into typed arrays (the date as days since the epoch, open/high/low/
+    close/volume as floats), so the full history is never held as text or as a dict of bars.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        lines (iterable of bytes or str): The response lines, header first (e.g.
+            response.iter_lines()).
+
+    Returns:
+        DailySeries: The bars, ordered from oldest to newest.
+
+    Raises:
+        AlphaVantageThrottled: If the response is a rate-limit note.
+        ValueError: If the response is an error message or not a daily CSV.
+    """
+    lines = iter(lines)
+    header = next(lines, None)
+    if header is None or not _text(header).strip():
+        raise ValueError(f"Empty daily CSV response for {ticker}.")
+    if _text(header).lstrip().startswith("{"):
+        # Errors, premium notices and throttling come back as JSON.
+        body = _text(header) + "".join(_text(line) for line in lines)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise ValueError(f"Unreadable daily CSV response for {ticker}: {body[:200]}")
+        message = _throttle_message(data)
+        if message:
+            raise AlphaVantageThrottled(f"Alpha Vantage rate limit reached: {message}")
+        if "Error Message" in data:
+            raise ValueError(f"Alpha Vantage API Error for {ticker}: {data['Error Message']}")
+        raise ValueError(f"No daily CSV data found for {ticker}. Response: {data}")
+
+    names = [name.strip().lower() for name in _text(header).split(",")]
+    try:
+        positions = [names.index(column) for column in _COLUMNS]
+    except ValueError:
+        raise ValueError(f"Unexpected daily CSV header for {ticker}: {_text(header).strip()}")
+    separator = b"," if isinstance(header, bytes) else ","
+    day, op, hi, lo, cl, vo = positions
+
+    dates = array("q")
+    opens, highs, lows, closes, volumes = array("d"), array("d"), array("d"), array("d"), array("d")
+    for line in lines:
+        if not line:
+            continue
+        fields = line.split(separator)
+        dates.append(date.fromisoformat(_text(fields[day]).strip()).toordinal() - _EPOCH_ORDINAL)
+        # float() accepts bytes as well as str.
+        opens.append(float(fields[op]))
+        highs.append(float(fields[hi]))
+        lows.append(float(fields[lo]))
+        closes.append(float(fields[cl]))
+        volumes.append(float(fields[vo]))
+
+    columns = [np.frombuffer(column, dtype=np.int64 if column.typecode == "q" else np.float64)
+               for column in (dates, opens, highs, lows, closes, volumes)]
+    # Alpha Vantage lists the newest bar first; the series wants the oldest first.
+    if len(columns[0]) > 1 and columns[0][0] > columns[0][-1]:
+        columns = [column[::-1] for column in columns]
+    if np.any(np.diff(columns[0]) <= 0):
+        order = np.unique(columns[0], return_index=True)[1]
+        columns = [column[order] for column in columns]
+    return DailySeries(ticker, columns[0], *(np.ascontiguousarray(column) for column in columns[1:]))
+
+
+def fetch_daily_csv(ticker, outputsize="full"):
+    """
+    Downloads a ticker's daily bars as CSV and parses them while they arrive (see parse_daily_csv).
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        outputsize (str, optional): "full" (the whole history) or "compact" (the last 100 bars).
+
+    Returns:
+        DailySeries: The bars, ordered from oldest to newest.
+
+    Raises:
+        AlphaVantageThrottled, ValueError: See parse_daily_csv.
+        requests.exceptions.RequestException: If the download fails.
+    """
+    params = {"function": "TIME_SERIES_DAILY", "symbol": ticker, "outputsize": outputsize, "datatype": "csv"}
+    response = get_scheduler().get(params, stream=True)
+    try:
+        return parse_daily_csv(ticker, response.iter_lines(chunk_size=CHUNK_SIZE))
+    finally:
+        response.close()
@@ -1,17 +1,19 @@
-import google.generativeai as genai
-import os
+import time
 
-# Configure the Generative AI model with the API key stored in the environment variables.
-# It assumes you have set an environment variable named 'GEMINI_API_KEY' with your API key.
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-
-# Specify the name of the Gemini model to use.
-model_name = "models/gemini-1.5-flash-latest"
-# Initialize the GenerativeModel with the specified model name.
-model = genai.GenerativeModel(model_name)
+from providers import get_model  # Shared Gemini model, created on first use (reads 'GEMINI_API_KEY').
+from ticker_resolver import get_resolver  # Local symbol/name index and memo of earlier answers.
+from tracing import record_error, span, traced  # Per-stage spans and metrics.
 
 # Define a function called 'ticker_identify' that takes a user query as input.
+@traced()
 def ticker_identify(user_query):
+    # Most queries name a well-known company or a symbol, so try the local resolver first
+    # (symbols, company names, aliases and earlier LLM answers). Only unresolved queries reach Gemini.
+    resolver = get_resolver()
+    ticker = resolver.resolve(user_query)
+    if ticker:
+        return ticker
+
     # Define a prompt to instruct the language model to identify the stock ticker
     # symbol from the user's query.
     prompt = f"""You are a helpful agent designed to identify the stock ticker symbol
@@ -40,21 +42,28 @@ def ticker_identify(user_query):
 
     try:
         # Send the prompt to the language model to generate a response.
-        response = model.generate_content(prompt)
+        started = time.perf_counter()
+        with span("gemini", purpose="ticker"):
+            response = get_model().generate_content(prompt)
+        llm_seconds = time.perf_counter() - started
         # Extract the generated text (which should be the ticker symbol) and remove any leading/trailing whitespace.
         ticker = response.text.strip()
         # Basic validation to check if the identified ticker looks like a valid stock ticker.
         # It checks if the length is between 1 and 10 characters, and if it's fully uppercase
         # or contains a period (which is common for some tickers like BRK.A).
         if 1 <= len(ticker) <= 10 and (ticker.isupper() or "." in ticker):
+            # Memoize the answer so the same query is resolved locally next time.
+            resolver.remember(user_query, ticker, llm_seconds)
             return ticker  # Return the identified ticker symbol.
         else:
+            resolver.record_llm_call(llm_seconds)
             return None  # Return None if the identified text doesn't look like a valid ticker.
                          # This indicates that the ticker could not be reliably identified.
     except Exception as e:
         # If any error occurs during the communication with the language model,
         # print the error message for debugging purposes and return None.
         print(f"Error in identify_ticker_agent: {e}")
+        record_error(e)
         return None
 
 # queries = [
@@ -0,0 +1,333 @@
+import math  # For annualizing volatility.
+import threading  # Protects the per-ticker state when agents run in threads.
+import time  # For compute time measurements.
+
+import requests  # Import the requests library for its exception types.
+
+import numpy as np  # Indicators are computed over the series' NumPy arrays.
+from numpy.lib.stride_tricks import sliding_window_view  # Rolling windows without copying the data.
+
+import bar_store  # The stored daily bars the indicators are computed from.
+import tracing  # Full computes, incremental updates and reuses show up in the spans and metrics.
+
+# Simple and exponential moving average lengths, in bars.
+SMA_WINDOWS = (20, 50, 200)
+EMA_SPANS = (12, 26)
+
+# Look-back of RSI (Wilder's smoothing), realized volatility and the volume z-score, in bars.
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 20
+VOLUME_WINDOW = 20
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Bars kept with each ticker's state for the rolling windows; everything else is carried as a
+# running value, so an update only touches the new bars.
+_TAIL = max(max(SMA_WINDOWS), VOLATILITY_WINDOW + 1, VOLUME_WINDOW + 1)
+
+# Below this many bars RSI has no starting average yet, and a history is simply recomputed.
+_MIN_INCREMENTAL_BARS = RSI_PERIOD + 1
+
+
+def _ema(values, alpha, initial):
+    """
+    Returns the exponential moving average of 'values' (y = y_prev + alpha * (x - y_prev)),
+    continuing from 'initial', the average just before values[0].
+
+    Vectorized in blocks: within a block y_t = d^(t+1) * (initial + alpha * sum_s x_s / d^(s+1))
+    with d = 1 - alpha, which is one cumulative sum. Blocks are short enough that d^-t stays
+    below 1e12, so no precision is lost.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(len(values))
+    decay = 1.0 - alpha
+    block = max(1, int(27.6 / -math.log(decay)))  # decay ** -block < 1e12
+    previous = initial
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        out[start:start + len(chunk)] = powers * (previous + alpha * np.cumsum(chunk / powers))
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def _wilder_average(values):
+    # Wilder's running average: the mean of the first RSI_PERIOD values, then an EMA with
+    # alpha 1/RSI_PERIOD. Returns the final value (0 for no values).
+    if not len(values):
+        return 0.0
+    start = float(values[:RSI_PERIOD].mean())
+    return float(_ema(values[RSI_PERIOD:], 1.0 / RSI_PERIOD, start)[-1]) if len(values) > RSI_PERIOD else start
+
+
+def _rsi(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def indicator_arrays(series):
+    """
+    Computes every indicator for every bar of a DailySeries, vectorized over the whole history.
+
+    Returns:
+        dict of numpy.ndarray: Arrays aligned with series.dates, NaN where the history is too
+        short: 'sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26', 'rsi_14', 'volatility_20d'
+        (annualized, in percent), 'drawdown' (percent below the highest close so far) and
+        'volume_zscore_20' (the bar's volume against the 20 bars before it).
+    """
+    close, volume = series.close, series.volume
+    count = len(close)
+    arrays = {}
+
+    sums = np.concatenate([[0.0], np.cumsum(close)])
+    for window in SMA_WINDOWS:
+        sma = np.full(count, np.nan)
+        if count >= window:
+            sma[window - 1:] = (sums[window:] - sums[:-window]) / window
+        arrays[f"sma_{window}"] = sma
+
+    for span in EMA_SPANS:
+        ema = np.full(count, np.nan)
+        if count:
+            ema[0] = close[0]
+            ema[1:] = _ema(close[1:], 2.0 / (span + 1), close[0])
+        arrays[f"ema_{span}"] = ema
+
+    rsi = np.full(count, np.nan)
+    if count > RSI_PERIOD:
+        diffs = np.diff(close)
+        gains, losses = np.maximum(diffs, 0.0), np.maximum(-diffs, 0.0)
+        avg_gain = np.concatenate([[gains[:RSI_PERIOD].mean()],
+                                   _ema(gains[RSI_PERIOD:], 1.0 / RSI_PERIOD, gains[:RSI_PERIOD].mean())])
+        avg_loss = np.concatenate([[losses[:RSI_PERIOD].mean()],
+                                   _ema(losses[RSI_PERIOD:], 1.0 / RSI_PERIOD, losses[:RSI_PERIOD].mean())])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        values[avg_loss == 0] = np.where(avg_gain[avg_loss == 0] > 0, 100.0, 50.0)
+        rsi[RSI_PERIOD:] = values
+    arrays[f"rsi_{RSI_PERIOD}"] = rsi
+
+    volatility = np.full(count, np.nan)
+    if count > VOLATILITY_WINDOW:
+        returns = np.diff(np.log(close))
+        volatility[VOLATILITY_WINDOW:] = (sliding_window_view(returns, VOLATILITY_WINDOW).std(axis=1, ddof=1)
+                                          * math.sqrt(TRADING_DAYS_PER_YEAR) * 100)
+    arrays[f"volatility_{VOLATILITY_WINDOW}d"] = volatility
+
+    arrays["drawdown"] = (close / np.maximum.accumulate(close) - 1.0) * 100 if count else np.empty(0)
+
+    zscore = np.full(count, np.nan)
+    if count > VOLUME_WINDOW:
+        windows = sliding_window_view(volume[:-1], VOLUME_WINDOW)
+        spread = windows.std(axis=1, ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zscore[VOLUME_WINDOW:] = np.where(spread > 0, (volume[VOLUME_WINDOW:] - windows.mean(axis=1)) / spread, 0.0)
+    arrays[f"volume_zscore_{VOLUME_WINDOW}"] = zscore
+    return arrays
+
+
+class _IndicatorState:
+    # Everything needed to extend a ticker's indicators by new bars: the running averages, the
+    # highest close, and the last _TAIL closes and volumes for the rolling windows.
+
+    def __init__(self, series):
+        arrays = indicator_arrays(series)
+        self.count = len(series)
+        self.last_date = series.dates[-1]
+        self.emas = {span: float(arrays[f"ema_{span}"][-1]) for span in EMA_SPANS}
+        diffs = np.diff(series.close)
+        # The running RSI averages (the last RSI value alone can't be extended).
+        self.avg_gain = _wilder_average(np.maximum(diffs, 0.0))
+        self.avg_loss = _wilder_average(np.maximum(-diffs, 0.0))
+        peak_index = int(np.argmax(series.close))
+        self.peak, self.peak_date = float(series.close[peak_index]), series.dates[peak_index]
+        self.closes = series.close[-_TAIL:].copy()
+        self.volumes = series.volume[-_TAIL:].copy()
+
+    def extend(self, dates, closes, volumes):
+        # Move the state forward by the new bars (oldest first).
+        for span in EMA_SPANS:
+            self.emas[span] = float(_ema(closes, 2.0 / (span + 1), self.emas[span])[-1])
+        diffs = np.diff(np.concatenate([[self.closes[-1]], closes]))
+        self.avg_gain = float(_ema(np.maximum(diffs, 0.0), 1.0 / RSI_PERIOD, self.avg_gain)[-1])
+        self.avg_loss = float(_ema(np.maximum(-diffs, 0.0), 1.0 / RSI_PERIOD, self.avg_loss)[-1])
+        peak_index = int(np.argmax(closes))
+        if closes[peak_index] > self.peak:
+            self.peak, self.peak_date = float(closes[peak_index]), dates[peak_index]
+        self.closes = np.concatenate([self.closes, closes])[-_TAIL:]
+        self.volumes = np.concatenate([self.volumes, volumes])[-_TAIL:]
+        self.count += len(closes)
+        self.last_date = dates[-1]
+
+    def snapshot(self):
+        # The latest value of every indicator, from the running values and the tail windows.
+        closes, volumes = self.closes, self.volumes
+        close = float(closes[-1])
+        snapshot = {"date": str(self.last_date), "close": close, "bars": self.count}
+        for window in SMA_WINDOWS:
+            snapshot[f"sma_{window}"] = float(closes[-window:].mean()) if len(closes) >= window else None
+        for span in EMA_SPANS:
+            snapshot[f"ema_{span}"] = self.emas[span]
+        snapshot[f"rsi_{RSI_PERIOD}"] = _rsi(self.avg_gain, self.avg_loss) if self.count > RSI_PERIOD else None
+        if len(closes) > VOLATILITY_WINDOW:
+            returns = np.diff(np.log(closes[-VOLATILITY_WINDOW - 1:]))
+            snapshot[f"volatility_{VOLATILITY_WINDOW}d"] = float(returns.std(ddof=1) * math.sqrt(TRADING_DAYS_PER_YEAR) * 100)
+        else:
+            snapshot[f"volatility_{VOLATILITY_WINDOW}d"] = None
+        snapshot["drawdown"] = (close / self.peak - 1.0) * 100
+        snapshot["peak_close"] = self.peak
+        snapshot["peak_date"] = str(self.peak_date)
+        if len(volumes) > VOLUME_WINDOW:
+            previous = volumes[-VOLUME_WINDOW - 1:-1]
+            spread = previous.std(ddof=1)
+            snapshot[f"volume_zscore_{VOLUME_WINDOW}"] = float((volumes[-1] - previous.mean()) / spread) if spread > 0 else 0.0
+        else:
+            snapshot[f"volume_zscore_{VOLUME_WINDOW}"] = None
+        return snapshot
+
+
+class IndicatorEngine:
+    """
+    Keeps the latest technical indicators of each ticker, computed locally from the stored daily
+    bars instead of one Alpha Vantage indicator request per indicator and ticker.
+
+    The first request for a ticker computes its indicators over the whole history (vectorized,
+    see indicator_arrays). The engine then keeps the running values (EMAs, RSI averages, highest
+    close) and the last few hundred bars, so when the store has new bars only those are folded
+    in. If stored history changed in any other way (a re-download, a revised bar), the ticker is
+    recomputed from scratch.
+
+    Args:
+        store (DailyBarStore, optional): Where the bars come from. Defaults to the shared store.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._states = {}
+        self._snapshots = {}
+        # Counters exposed through stats().
+        self.full_computes = 0
+        self.incremental_updates = 0
+        self.reuses = 0
+        self.compute_seconds = 0.0
+
+    def snapshot(self, ticker):
+        """
+        Returns the ticker's latest indicators, topping up its stored bars first.
+
+        Returns:
+            dict: See update(); None if no bars are stored for the ticker.
+
+        Raises:
+            ValueError, requests.exceptions.RequestException: See DailyBarStore.get_series.
+        """
+        store = self.store or bar_store.get_store()
+        return self.update(store.get_series(ticker))
+
+    def update(self, series):
+        """
+        Brings a ticker's indicators up to date with a DailySeries and returns them.
+
+        Returns:
+            dict: 'date' and 'close' of the latest bar, 'bars', 'sma_20', 'sma_50', 'sma_200',
+            'ema_12', 'ema_26', 'rsi_14', 'volatility_20d' (annualized, in percent), 'drawdown'
+            (percent below 'peak_close', the highest close, on 'peak_date') and
+            'volume_zscore_20'. Values the history is too short for are None. Returns None for
+            an empty series.
+        """
+        count = len(series)
+        if not count:
+            return None
+        ticker = series.ticker.upper()
+        started = time.perf_counter()
+        with self._lock:
+            state = self._states.get(ticker)
+            if state is not None and state.count == count and state.last_date == series.dates[-1] \
+                    and state.closes[-1] == series.close[-1]:
+                self.reuses += 1
+                tracing.cache_result("indicators", "hit")
+                return self._snapshots[ticker]
+            if state is not None and _MIN_INCREMENTAL_BARS <= state.count < count \
+                    and series.dates[state.count - 1] == state.last_date \
+                    and series.close[state.count - 1] == state.closes[-1]:
+                state.extend(series.dates[state.count:], series.close[state.count:], series.volume[state.count:])
+                self.incremental_updates += 1
+                tracing.cache_result("indicators", "incremental")
+            else:
+                state = self._states[ticker] = _IndicatorState(series)
+                self.full_computes += 1
+                tracing.cache_result("indicators", "miss")
+            snapshot = self._snapshots[ticker] = state.snapshot()
+            self.compute_seconds += time.perf_counter() - started
+            return snapshot
+
+    def stats(self):
+        """
+        Returns the engine's counters: full computes, incremental updates, reused snapshots and
+        the total compute time.
+        """
+        with self._lock:
+            return {
+                "tickers": len(self._states),
+                "full_computes": self.full_computes,
+                "incremental_updates": self.incremental_updates,
+                "reuses": self.reuses,
+                "compute_seconds": self.compute_seconds,
+            }
+
+
+def format_indicators(snapshot):
+    """
+    Returns the indicators as one line of text for the analysis prompt, e.g.
+    "close $187.20 (2024-05-03) vs SMA20 $180.11 (+3.9%), ...; RSI(14) 61; ...".
+    """
+    close = snapshot["close"]
+    parts = []
+    averages = [f"SMA{window} ${snapshot[f'sma_{window}']:.2f} ({(close / snapshot[f'sma_{window}'] - 1) * 100:+.1f}%)"
+                for window in SMA_WINDOWS if snapshot.get(f"sma_{window}")]
+    averages += [f"EMA{span} ${snapshot[f'ema_{span}']:.2f}" for span in EMA_SPANS]
+    parts.append(f"close ${close:.2f} ({snapshot['date']}) vs " + ", ".join(averages))
+    if snapshot.get(f"rsi_{RSI_PERIOD}") is not None:
+        parts.append(f"RSI({RSI_PERIOD}) {snapshot[f'rsi_{RSI_PERIOD}']:.0f}")
+    if snapshot.get(f"volatility_{VOLATILITY_WINDOW}d") is not None:
+        parts.append(f"{VOLATILITY_WINDOW}-day realized volatility {snapshot[f'volatility_{VOLATILITY_WINDOW}d']:.0f}% annualized")
+    parts.append(f"{-snapshot['drawdown']:.1f}% below the high of ${snapshot['peak_close']:.2f} ({snapshot['peak_date']})"
+                 if snapshot["drawdown"] < 0 else "at its highest close")
+    if snapshot.get(f"volume_zscore_{VOLUME_WINDOW}") is not None:
+        parts.append(f"volume z-score {snapshot[f'volume_zscore_{VOLUME_WINDOW}']:+.1f} vs the prior {VOLUME_WINDOW} days")
+    return "; ".join(parts)
+
+
+def technical_summary(ticker):
+    """
+    Returns the ticker's latest indicators as one line of text (see format_indicators), from
+    the shared engine and the locally stored daily bars.
+
+    Returns:
+        str: The indicators, or None (after printing why) if the daily bars couldn't be loaded.
+    """
+    try:
+        snapshot = get_indicator_engine().snapshot(ticker)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Technical indicators unavailable for {ticker}: {e}")
+        tracing.record_error(e)
+        return None
+    return format_indicators(snapshot) if snapshot else None
+
+
+# The shared engine used by the agents, created on first use.
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_indicator_engine():
+    """
+    Returns the process-wide IndicatorEngine, creating it on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine()
+        return _engine
@@ -0,0 +1,268 @@
+import re  # Patterns for the common question shapes and timeframes.
+import threading  # Protects the counters when queries run in threads.
+import time  # For latency measurements.
+
+from ticker_resolver import get_resolver  # Local symbol/name index, the same one ticker_identify uses.
+
+# Classifications below this confidence are left to the LLM.
+DEFAULT_MIN_CONFIDENCE = 0.75
+
+# Intent patterns, most specific first; the first matching intent wins. The intent names are the
+# ones the orchestrator's LLM prompt produces, so both paths feed the same routing code.
+_INTENT_PATTERNS = [
+    # A question that opens with a comparison verb is a comparison.
+    ("Compare tickers", 0.9, re.compile(
+        r"^\W*(?:please\s+)?(compare|comparison|correlat\w*)\b")),
+    ("Investigate price drop reason", 0.95, re.compile(
+        r"\b(why|what caused|reason)\b.*\b(drop|dropp|fall|fell|down|declin|slid|slump|plung|tank|sink|sank|crash|dip)\w*")),
+    ("Analyze price change direction", 0.9, re.compile(
+        r"\b(did|has|have|is)\b.*\b((go|gone|went)\s+(up|down)|ris(e|es|en|ing)|rose)\b")),
+    # Otherwise "vs" or "against" only makes it a comparison if it isn't a drop or direction
+    # question ("why did NVDA fall vs AMD today?").
+    ("Compare tickers", 0.9, re.compile(
+        r"\b(compar(e|ed|ing|ison)|versus|vs|against|correlat\w*|outperform\w*|relative to)\b")),
+    ("Get recent news", 0.9, re.compile(
+        r"\b(news|headlines?|happening|going on|latest on|what's new|updates?)\b")),
+    ("Get price change", 0.9, re.compile(
+        r"\b(chang|perform|return|move|moved|gain|did\b.*\bdo\b|done)\w*")),
+    ("Get current price", 0.9, re.compile(
+        r"\b(price|quote|trading at|worth|cost|how much is)\b")),
+    ("Get general information", 0.8, re.compile(
+        r"\b(tell me|talk|about|information|info|overview)\b")),
+]
+
+# Timeframe patterns, in the forms the orchestrator's routing understands.
+_ALL_HORIZONS = re.compile(r"\b(every|all|each)\s+(horizons?|timeframes?|periods?)\b")
+_YTD = re.compile(r"\b(ytd|year[- ]to[- ]date)\b")
+_LAST_N = re.compile(r"\b(?:last|past)\s+(\d+)\s+(day|week|month|year)s?\b")
+_LAST_UNIT = re.compile(r"\b(?:this|last|past)\s+(week|month|year)\b")
+_RECENT = re.compile(r"\b(recent|recently|lately)\b")
+
+# Separators between the tickers of a comparison ("NVDA, KO vs PEP", "AT&T compared to Verizon").
+_TICKER_SEPARATORS = re.compile(
+    r",|/|\b(?:vs|versus|against|compare[ds]?\s+(?:to|with)|relative\s+to)\b\.?", re.IGNORECASE)
+# "with" and "to" only separate tickers in "compare X with Y" / "compare X to Y".
+_COMPARE_SEPARATORS = re.compile(r"\b(?:with|to)\b", re.IGNORECASE)
+_LEADING_COMPARE = re.compile(r"^\W*(?:please\s+)?compare\b", re.IGNORECASE)
+# "and" and a spaced "&" may also be part of a name ("Johnson & Johnson", "Procter and Gamble").
+_NAME_JOINERS = re.compile(r"(\s&\s|\band\b)", re.IGNORECASE)
+
+# How much a ticker found by each resolver path can be trusted.
+_SOURCE_CONFIDENCE = {"symbol": 1.0, "alias": 1.0, "memo": 1.0, "name": 0.95, "fuzzy": 0.7}
+
+
+def extract_timeframe(query):
+    """
+    Returns the timeframe a query asks about ("today", "last week", "last 10 days", "ytd",
+    "all", "recently", ...), or None if it doesn't name one.
+    """
+    text = query.lower()
+    if _ALL_HORIZONS.search(text):
+        return "all"
+    if _YTD.search(text):
+        return "ytd"
+    match = _LAST_N.search(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        if count == 1:
+            return f"last {unit}"
+        # "Last 7 days" is the same horizon as "last week", which every intent handles.
+        if (count, unit) in ((7, "day"), (30, "day"), (365, "day")):
+            return {7: "last week", 30: "last month", 365: "last year"}[count]
+        return f"last {count} {unit}s"
+    match = _LAST_UNIT.search(text)
+    if match:
+        return f"last {match.group(1)}"
+    if "today" in text:
+        return "today"
+    if _RECENT.search(text):
+        return "recently"
+    return None
+
+
+def split_tickers(text, resolver=None):
+    """
+    Splits the tickers of a comparison ("NVDA, AMD and INTC", "KO versus PEP") into their
+    non-empty parts, stripped. The parts are names or symbols, not yet resolved.
+
+    "and" and a spaced "&" only separate parts that the ticker resolver recognizes on their own,
+    so "Johnson & Johnson vs Pfizer" keeps "Johnson & Johnson" whole. A "&" without spaces never
+    separates ("AT&T").
+
+    Args:
+        text (str): The query or the ticker text of a comparison.
+        resolver (TickerResolver, optional): Ticker resolver. Defaults to the shared resolver.
+    """
+    resolver = resolver or get_resolver()
+    chunks = _TICKER_SEPARATORS.split(text)
+    if _LEADING_COMPARE.match(text):
+        chunks = [part for chunk in chunks for part in _COMPARE_SEPARATORS.split(chunk)]
+    parts = []
+    for chunk in chunks:
+        # Alternating pieces and joiners; a piece that doesn't resolve on its own (except by a
+        # fuzzy match) is joined with the next one.
+        pieces = _NAME_JOINERS.split(chunk)
+        current = pieces[0]
+        for joiner, piece in zip(pieces[1::2], pieces[2::2]):
+            ticker, source = resolver.lookup(current.strip()) if current.strip() else (None, None)
+            if ticker and source != "fuzzy":
+                parts.append(current.strip())
+                current = piece
+            else:
+                current = current + joiner + piece if current.strip() else piece
+        if current.strip():
+            parts.append(current.strip())
+    return parts
+
+
+class IntentClassifier:
+    """
+    Classifies common stock questions locally, without an LLM round-trip.
+
+    The intent comes from question patterns (why ... drop, did ... go up, news, changed,
+    price, compare ...), the ticker from the local ticker resolver (every ticker, for a
+    comparison) and the timeframe from phrase patterns. The confidence combines the pattern's weight with how the ticker was resolved; below
+    'min_confidence' (or without a ticker) the query is left to the LLM.
+
+    Args:
+        min_confidence (float, optional): Lowest confidence accepted without the LLM.
+        resolver (TickerResolver, optional): Ticker resolver. Defaults to the shared resolver.
+    """
+
+    def __init__(self, min_confidence=DEFAULT_MIN_CONFIDENCE, resolver=None):
+        self.min_confidence = min_confidence
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        # Counters exposed through stats().
+        self.rule_hits = 0
+        self.llm_fallbacks = 0
+        self.rule_seconds = 0.0
+        self.llm_seconds = 0.0
+
+    def classify(self, query):
+        """
+        Classifies a query locally.
+
+        Returns:
+            dict: {"Intent": ..., "Ticker": ..., "Timeframe": ..., "Confidence": ...} (Timeframe
+            only if the query names one), or None if the query should go to the LLM.
+        """
+        started = time.perf_counter()
+        result = self._classify(query)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.rule_seconds += elapsed
+            if result is not None:
+                self.rule_hits += 1
+        return result
+
+    def record_llm(self, seconds):
+        # Count a query that needed the LLM, with the LLM's latency.
+        with self._lock:
+            self.llm_fallbacks += 1
+            self.llm_seconds += seconds
+
+    def stats(self):
+        """
+        Returns the classifier's counters: queries handled by the rules and by the LLM, and the
+        mean latency of each path.
+        """
+        with self._lock:
+            queries = self.rule_hits + self.llm_fallbacks
+            return {
+                "queries": queries,
+                "rule_hits": self.rule_hits,
+                "llm_fallbacks": self.llm_fallbacks,
+                "rule_hit_rate": self.rule_hits / queries if queries else 0.0,
+                # Every query is tried against the rules first.
+                "mean_rule_seconds": self.rule_seconds / queries if queries else 0.0,
+                "mean_llm_seconds": self.llm_seconds / self.llm_fallbacks if self.llm_fallbacks else 0.0,
+            }
+
+    def _classify(self, query):
+        text = query.lower()
+        matches = [(intent, weight) for intent, weight, pattern in _INTENT_PATTERNS if pattern.search(text)]
+        resolver = self.resolver or get_resolver()
+        # A comparison needs two tickers; with fewer ("did TSLA fall against the market?") the next
+        # matching intent applies.
+        if matches and matches[0][0] == "Compare tickers":
+            compared = self._compared_tickers(query, resolver)
+            if len(compared) < 2:
+                matches = [match for match in matches if match[0] != "Compare tickers"]
+        if not matches:
+            return None
+        intent, weight = matches[0]
+
+        if intent == "Compare tickers":
+            ticker, source_confidence = ", ".join(compared), min(compared.values())
+        else:
+            ticker, source = resolver.lookup(query)
+            if ticker is None:
+                return None
+            source_confidence = _SOURCE_CONFIDENCE.get(source, 0.5)
+        confidence = weight * source_confidence
+        if confidence < self.min_confidence:
+            return None
+
+        parts = {"Intent": intent, "Ticker": ticker, "Confidence": round(confidence, 3)}
+        timeframe = extract_timeframe(query)
+        if timeframe:
+            parts["Timeframe"] = timeframe
+        return parts
+
+    def _compared_tickers(self, query, resolver):
+        # Each part of the query between separators may name a ticker. Returns {ticker: confidence}
+        # in the order they appear.
+        found = {}
+        for part in split_tickers(query, resolver):
+            ticker, source = resolver.lookup(part)
+            if ticker and ticker not in found:
+                found[ticker] = _SOURCE_CONFIDENCE.get(source, 0.5)
+        return found
+
+
+# The shared classifier used by the orchestrator, created on first use.
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier():
+    """
+    Returns the process-wide IntentClassifier, creating it on first use.
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = IntentClassifier()
+        return _classifier
+
+
+if __name__ == "__main__":
+    # Show how a set of typical questions is classified, and how fast.
+    queries = [
+        "Why did Tesla stock drop today?",
+        "What is the current price of Apple?",
+        "How has Nvidia stock changed in the last week?",
+        "What's happening with Palantir stock recently?",
+        "Did Amazon's price go up last month?",
+        "Tell me something about Google's stock.",
+        "How has Microsoft done across every horizon?",
+        "How has AAPL performed over the last 10 days?",
+        "Any news on AMD?",
+        "Compare NVDA, AMD and INTC over the last year",
+        "Why did NVDA fall vs AMD today?",
+        "How did KO do versus PEP this year?",
+        "Johnson & Johnson vs Pfizer",
+        "AT&T compared to Verizon",
+        "Should I buy Nvidea?",
+        "Is Tesla a risky stock?",
+        "Is there any risk in holding Apple?",
+        "The weather in New York.",
+    ]
+    classifier = IntentClassifier()
+    for query in queries:
+        parts = classifier.classify(query)
+        print(f"{query!r:50} -> {parts if parts else 'LLM fallback'}")
+    stats = classifier.stats()
+    print(f"\nHandled locally: {stats['rule_hits']}/{len(queries)} | "
+          f"mean classification latency {stats['mean_rule_seconds'] * 1e6:.0f} us")
@@ -0,0 +1,353 @@
+import threading  # Protects the buffers when agents run in threads.
+import time  # For refresh intervals.
+from collections import OrderedDict, deque  # Least recently used tickers; monotonic deques for the rolling extremes.
+from datetime import datetime  # For parsing bar timestamps.
+
+import numpy as np  # Preallocated arrays hold the bars.
+import requests  # Import the requests library for its exception types.
+
+import market_hours  # Bars only change while the market is open.
+import tracing  # Fetches and buffer hits show up in the query's spans and metrics.
+from av_scheduler import get_scheduler  # Quota-aware scheduler in front of the shared Alpha Vantage client.
+
+# Bar size requested from TIME_SERIES_INTRADAY, in minutes (1, 5, 15, 30 or 60).
+DEFAULT_INTERVAL_MINUTES = 5
+
+# Length of the regular session; a buffer holds one session of bars.
+SESSION_MINUTES = 390
+
+# Length of the window the largest rise and drop are measured over.
+DEFAULT_MOVE_MINUTES = 30
+
+# How often a ticker's bars are fetched again while the market is open.
+DEFAULT_REFRESH_SECONDS = 60
+
+# Tickers whose buffers are kept; the least recently used ones are dropped beyond this.
+DEFAULT_MAX_TICKERS = 200
+
+# 'outputsize=compact' returns the latest 100 bars.
+COMPACT_BARS = 100
+
+
+class IntradayBuffer:
+    """
+    One session of a ticker's intraday bars in a preallocated ring buffer, with rolling
+    statistics maintained as bars arrive.
+
+    Memory is fixed when the buffer is created: 'capacity' slots per field, and deques that
+    never hold more than 'capacity' entries. Each bar is folded in in amortized O(1):
+
+    - VWAP from running sums of price x volume and volume (a bar leaving the buffer is subtracted).
+    - High and low from monotonic deques, whose fronts are the extremes of the buffered bars.
+    - The largest rise and drop over any 'move_bars' consecutive bars, also from monotonic deques
+      of the window moves.
+
+    A bar from a new session clears the buffer, so the statistics always describe the current
+    session (the oldest bars are evicted if a session has more than 'capacity' bars).
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        capacity (int, optional): Bars held; defaults to one regular session of 5-minute bars.
+        move_bars (int, optional): Bars per window for the largest rise and drop.
+    """
+
+    def __init__(self, ticker, capacity=SESSION_MINUTES // DEFAULT_INTERVAL_MINUTES,
+                 move_bars=DEFAULT_MOVE_MINUTES // DEFAULT_INTERVAL_MINUTES):
+        self.ticker = ticker
+        self.capacity = capacity
+        self.move_bars = move_bars
+        self.times = np.zeros(capacity, dtype="datetime64[m]")
+        self.open = np.zeros(capacity)
+        self.high = np.zeros(capacity)
+        self.low = np.zeros(capacity)
+        self.close = np.zeros(capacity)
+        self.volume = np.zeros(capacity)
+        self._moves = np.zeros(capacity)  # Percent move of the window ending at each bar.
+        self._highs = deque(maxlen=capacity)  # Sequence numbers with decreasing highs.
+        self._lows = deque(maxlen=capacity)  # Sequence numbers with increasing lows.
+        self._rises = deque(maxlen=capacity)  # Window ends with decreasing moves.
+        self._drops = deque(maxlen=capacity)  # Window ends with increasing moves.
+        self.clear()
+
+    def clear(self):
+        self.session = None
+        self.session_open = None
+        self._first = 0  # Sequence number of the oldest buffered bar.
+        self._next = 0  # Sequence number the next bar gets; its slot is _next % capacity.
+        self._price_volume = 0.0
+        self._total_volume = 0.0
+        for window in (self._highs, self._lows, self._rises, self._drops):
+            window.clear()
+
+    def __len__(self):
+        return self._next - self._first
+
+    @property
+    def last_time(self):
+        return self.times[(self._next - 1) % self.capacity] if len(self) else None
+
+    def append(self, bar_time, open_, high, low, close, volume):
+        """
+        Adds a bar. Bars must arrive in time order; a bar not newer than the last one is ignored.
+
+        Args:
+            bar_time (numpy.datetime64 or datetime): The bar's timestamp (exchange local time).
+            open_, high, low, close, volume (float): The bar's values.
+
+        Returns:
+            bool: True if the bar was added.
+        """
+        bar_time = np.datetime64(bar_time, "m")
+        session = bar_time.astype("datetime64[D]")
+        if session != self.session:
+            self.clear()
+            self.session = session
+            self.session_open = float(open_)
+        elif bar_time <= self.last_time:
+            return False
+        if len(self) == self.capacity:
+            self._evict()
+
+        seq = self._next
+        slot = seq % self.capacity
+        self.times[slot] = bar_time
+        self.open[slot], self.high[slot], self.low[slot] = open_, high, low
+        self.close[slot], self.volume[slot] = close, volume
+        self._price_volume += (high + low + close) / 3 * volume
+        self._total_volume += volume
+        self._next += 1
+
+        _push(self._highs, seq, lambda other: self.high[other % self.capacity] <= high)
+        _push(self._lows, seq, lambda other: self.low[other % self.capacity] >= low)
+        start = seq - self.move_bars
+        if start >= self._first:
+            base = self.close[start % self.capacity]
+            move = self._moves[slot] = (close / base - 1) * 100 if base else 0.0
+            _push(self._rises, seq, lambda other: self._moves[other % self.capacity] <= move)
+            _push(self._drops, seq, lambda other: self._moves[other % self.capacity] >= move)
+        return True
+
+    def summary(self):
+        """
+        Returns the session's statistics, or None if the buffer is empty.
+
+        Returns:
+            dict: 'session' (date), 'bars', 'first_time' and 'last_time', 'open' (of the session),
+            'last', 'change_percent' (last vs. open), 'vwap', 'high' and 'high_time', 'low' and
+            'low_time', and 'largest_rise' / 'largest_drop' (dicts with 'percent', 'start' and
+            'end', or None until a full window has been seen).
+        """
+        if not len(self):
+            return None
+        cap = self.capacity
+        last = float(self.close[(self._next - 1) % cap])
+        high_slot, low_slot = self._highs[0] % cap, self._lows[0] % cap
+        return {
+            "session": str(self.session),
+            "bars": len(self),
+            "first_time": _clock(self.times[self._first % cap]),
+            "last_time": _clock(self.last_time),
+            "open": self.session_open,
+            "last": last,
+            "change_percent": (last / self.session_open - 1) * 100 if self.session_open else None,
+            "vwap": self._price_volume / self._total_volume if self._total_volume > 0 else None,
+            "high": float(self.high[high_slot]),
+            "high_time": _clock(self.times[high_slot]),
+            "low": float(self.low[low_slot]),
+            "low_time": _clock(self.times[low_slot]),
+            "largest_rise": self._window(self._rises),
+            "largest_drop": self._window(self._drops),
+        }
+
+    def _window(self, moves):
+        if not moves:
+            return None
+        end = moves[0]
+        return {"percent": float(self._moves[end % self.capacity]),
+                "start": _clock(self.times[(end - self.move_bars) % self.capacity]),
+                "end": _clock(self.times[end % self.capacity])}
+
+    def _evict(self):
+        # Drop the oldest bar: take it out of the sums and of every deque whose front it is
+        # (for the moves, the windows it starts).
+        seq = self._first
+        slot = seq % self.capacity
+        self._price_volume -= (self.high[slot] + self.low[slot] + self.close[slot]) / 3 * self.volume[slot]
+        self._total_volume -= self.volume[slot]
+        for window in (self._highs, self._lows):
+            if window and window[0] == seq:
+                window.popleft()
+        for window in (self._rises, self._drops):
+            while window and window[0] - self.move_bars <= seq:
+                window.popleft()
+        self._first += 1
+
+
+def _push(window, seq, dominated):
+    # Append to a monotonic deque, first dropping the entries the new one dominates.
+    while window and dominated(window[-1]):
+        window.pop()
+    window.append(seq)
+
+
+def _clock(value):
+    # 'HH:MM' of a datetime64[m] timestamp.
+    return str(value)[11:16]
+
+
+def parse_intraday(data, interval_minutes=DEFAULT_INTERVAL_MINUTES):
+    """
+    Returns the bars of a TIME_SERIES_INTRADAY response as (time, open, high, low, close, volume)
+    tuples, oldest first.
+
+    Raises:
+        ValueError: If the response holds no intraday series.
+    """
+    series = data.get(f"Time Series ({interval_minutes}min)")
+    if series is None:
+        if "Error Message" in data:
+            raise ValueError(f"Alpha Vantage API Error: {data['Error Message']}")
+        raise ValueError(f"No intraday data found. Response: {data}")
+    return [
+        (datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S"), float(bar["1. open"]), float(bar["2. high"]),
+         float(bar["3. low"]), float(bar["4. close"]), float(bar["5. volume"]))
+        for stamp, bar in sorted(series.items())
+    ]
+
+
+class IntradayTracker:
+    """
+    Keeps an IntradayBuffer per ticker, filled from TIME_SERIES_INTRADAY.
+
+    A ticker is fetched again at most every 'refresh_seconds' while the market is open; only
+    bars newer than the buffered ones are added. Outside market hours the bars can't change, so
+    a ticker fetched since the close is answered from its buffer.
+
+    Args:
+        interval_minutes (int, optional): Bar size (1, 5, 15, 30 or 60).
+        refresh_seconds (float, optional): Minimum time between fetches of a ticker while open.
+        move_minutes (int, optional): Window of the largest rise and drop.
+        max_tickers (int, optional): Buffers kept (least recently used ones are dropped).
+    """
+
+    def __init__(self, interval_minutes=DEFAULT_INTERVAL_MINUTES, refresh_seconds=DEFAULT_REFRESH_SECONDS,
+                 move_minutes=DEFAULT_MOVE_MINUTES, max_tickers=DEFAULT_MAX_TICKERS):
+        self.interval_minutes = interval_minutes
+        self.refresh_seconds = refresh_seconds
+        self.move_minutes = move_minutes
+        self.max_tickers = max_tickers
+        self._lock = threading.Lock()
+        self._buffers = OrderedDict()  # ticker -> (buffer, fetched_at, fetched_while_open)
+        # Counters exposed through stats().
+        self.fetches = 0
+        self.hits = 0
+        self.bars_added = 0
+
+    def get(self, ticker):
+        """
+        Returns the ticker's IntradayBuffer, fetching new bars first if they are due.
+
+        Raises:
+            ValueError: If Alpha Vantage returns an error or no intraday series.
+            requests.exceptions.RequestException: If the request fails.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            entry = self._buffers.get(ticker)
+            if entry is not None:
+                self._buffers.move_to_end(ticker)
+        if entry is not None and not self._due(entry):
+            self.hits += 1
+            tracing.cache_result("intraday", "hit")
+            return entry[0]
+        tracing.cache_result("intraday", "miss")
+
+        buffer = entry[0] if entry is not None else IntradayBuffer(
+            ticker, capacity=SESSION_MINUTES // self.interval_minutes,
+            move_bars=max(1, self.move_minutes // self.interval_minutes))
+        # The compact response covers a whole session unless the bars are short.
+        full = not len(buffer) and buffer.capacity > COMPACT_BARS
+        data = get_scheduler().query({"function": "TIME_SERIES_INTRADAY", "symbol": ticker,
+                                      "interval": f"{self.interval_minutes}min", "extended_hours": "false",
+                                      "outputsize": "full" if full else "compact"})
+        bars = parse_intraday(data, self.interval_minutes)
+        latest_session = max(bar[0] for bar in bars).date() if bars else None
+        added = 0
+        with self._lock:
+            self.fetches += 1
+            for bar in bars:
+                # Only the latest session goes into the buffer.
+                if bar[0].date() == latest_session and buffer.append(*bar):
+                    added += 1
+            self.bars_added += added
+            self._buffers[ticker] = (buffer, time.time(), market_hours.is_market_open())
+            self._buffers.move_to_end(ticker)
+            while len(self._buffers) > self.max_tickers:
+                self._buffers.popitem(last=False)
+        return buffer
+
+    def stats(self):
+        """
+        Returns the tracker's counters: tickers buffered, fetches, buffer hits and bars added.
+        """
+        with self._lock:
+            return {"tickers": len(self._buffers), "fetches": self.fetches, "hits": self.hits,
+                    "bars_added": self.bars_added}
+
+    def _due(self, entry):
+        _, fetched_at, fetched_while_open = entry
+        if market_hours.is_market_open():
+            return time.time() - fetched_at >= self.refresh_seconds
+        # Closed: a fetch made after the last close already has the final bars. Closed periods
+        # last at most about 66 hours (a weekend), which bounds how old that fetch can be.
+        return fetched_while_open or time.time() - fetched_at > 66 * 3600
+
+
+def format_intraday(summary, interval_minutes=DEFAULT_INTERVAL_MINUTES, move_minutes=DEFAULT_MOVE_MINUTES):
+    """
+    Returns a session summary (see IntradayBuffer.summary) as one line of text for the prompt.
+    """
+    parts = [f"{interval_minutes}-min bars for {summary['session']} ({summary['first_time']}-{summary['last_time']} ET): "
+             f"open ${summary['open']:.2f}, last ${summary['last']:.2f} ({summary['change_percent']:+.2f}%)"]
+    if summary["vwap"]:
+        parts.append(f"VWAP ${summary['vwap']:.2f} (last {(summary['last'] / summary['vwap'] - 1) * 100:+.2f}% vs VWAP)")
+    parts.append(f"high ${summary['high']:.2f} at {summary['high_time']}, low ${summary['low']:.2f} at {summary['low_time']}")
+    for key, label in (("largest_drop", "drop"), ("largest_rise", "rise")):
+        window = summary[key]
+        if window and (window["percent"] < 0 if label == "drop" else window["percent"] > 0):
+            parts.append(f"largest {move_minutes}-min {label} {window['percent']:+.2f}% from {window['start']} to {window['end']}")
+    return "; ".join(parts)
+
+
+def intraday_summary(ticker):
+    """
+    Returns today's intraday session of a ticker as one line of text (see format_intraday),
+    through the shared tracker.
+
+    Returns:
+        str: The summary, or None (after printing why) if the bars couldn't be retrieved.
+    """
+    tracker = get_intraday_tracker()
+    try:
+        summary = tracker.get(ticker).summary()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Intraday data unavailable for {ticker}: {e}")
+        tracing.record_error(e)
+        return None
+    return format_intraday(summary, tracker.interval_minutes, tracker.move_minutes) if summary else None
+
+
+# The shared tracker used by the agents, created on first use.
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_intraday_tracker():
+    """
+    Returns the process-wide IntradayTracker, creating it on first use.
+    """
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = IntradayTracker()
+        return _tracker
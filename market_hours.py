@@ -0,0 +1,57 @@
+from datetime import datetime, time, timedelta, timezone  # For session times and date arithmetic.
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError  # Standard library time zones (Python 3.9+).
+    EXCHANGE_TZ = ZoneInfo("America/New_York")
+except (ImportError, ZoneInfoNotFoundError):
+    # Without time zone data (e.g. Windows without the 'tzdata' package) fall back to US Eastern
+    # Standard Time; session boundaries are then off by an hour during daylight saving time.
+    EXCHANGE_TZ = timezone(timedelta(hours=-5), "EST")
+
+# Regular trading session of the US exchanges Alpha Vantage quotes, in exchange local time.
+# Exchange holidays and half days are not modelled: on those days the market is treated as open,
+# which only makes caching more conservative.
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+
+def exchange_now(now=None):
+    """
+    Returns 'now' (default: the current time) as an aware datetime in the exchange's time zone.
+    Naive datetimes are interpreted as UTC.
+    """
+    if now is None:
+        return datetime.now(EXCHANGE_TZ)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return now.astimezone(EXCHANGE_TZ)
+
+
+def is_market_open(now=None):
+    """
+    Returns True during the regular session (weekdays 9:30-16:00 exchange time).
+    """
+    now = exchange_now(now)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now=None):
+    """
+    Returns the start of the next regular session after 'now' as an aware datetime
+    (the start of today's session if it hasn't opened yet).
+    """
+    now = exchange_now(now)
+    candidate = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:  # Skip Saturday (5) and Sunday (6).
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def seconds_until_next_open(now=None):
+    """
+    Returns the number of seconds from 'now' until the next regular session opens.
+    """
+    now = exchange_now(now)
+    return (next_market_open(now) - now).total_seconds()
@@ -0,0 +1,398 @@
+import sqlite3  # SQLite gives us a single-file, dependency-free on-disk store.
+import threading  # A lock keeps the shared connection safe when agents run in threads.
+import time  # For freshness checks and latency measurements.
+from datetime import date, datetime  # For the time windows accepted by NewsStore.window().
+
+import requests  # Import the requests library for its exception types.
+
+from av_scheduler import get_scheduler  # Quota-aware scheduler in front of the shared Alpha Vantage client.
+from storage import cache_path  # Resolves where locally persisted data lives.
+from tracing import cache_result  # Skipped and fetched top-ups show up in the query's spans and metrics.
+
+# How long a ticker's stored news counts as current before the next top-up request.
+DEFAULT_RECHECK_SECONDS = 5 * 60
+
+# Articles requested by a ticker's first NEWS_SENTIMENT call, which only needs its latest news.
+DEFAULT_FETCH_LIMIT = 50
+
+# The most articles one NEWS_SENTIMENT call returns. A top-up after an earlier one asks for
+# everything since the newest stored article, which can be days of news, so it asks for this many
+# and pages further back while the pages come back full.
+MAX_FETCH_LIMIT = 1000
+
+# Articles requested by the market-wide call of top_up_many(), which serves many tickers at once.
+DEFAULT_BATCH_LIMIT = 1000
+
+# Alpha Vantage timestamps look like '20240131T153000' (time_published) and '20240131T1530' (time_from).
+_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def _to_float(value):
+    # Sentiment and relevance scores arrive as strings (or numbers); missing values stay None.
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamp(value):
+    # Normalize a datetime, date or Alpha Vantage timestamp string to 'YYYYMMDDTHHMMSS'.
+    if isinstance(value, datetime):
+        return value.strftime(_TIMESTAMP_FORMAT)
+    if isinstance(value, date):
+        return value.strftime("%Y%m%dT000000")
+    return value.ljust(15, "0")
+
+
+def _feed(data, subject):
+    # The article list of a NEWS_SENTIMENT response; raises ValueError for error payloads.
+    if "feed" in data:
+        return data["feed"]
+    if "Error Message" in data:
+        raise ValueError(f"Alpha Vantage API Error for {subject}: {data['Error Message']}")
+    # E.g. {"Information": "No articles found..."}: nothing new since time_from.
+    return []
+
+
+class NewsStore:
+    """
+    A local, persistent store of NEWS_SENTIMENT articles, backed by SQLite.
+
+    Articles are keyed by URL, so an article seen in several feeds (or several top-ups) is stored
+    once. Each top-up only asks Alpha Vantage for articles published since the newest stored one
+    ('time_from'), and a ticker checked within the last 'recheck_seconds' isn't requested at all.
+    latest() and window() read from the store without touching the network.
+
+    Args:
+        db_path (str, optional): Path of the SQLite file. Defaults to 'news.sqlite3' in the local
+            data directory.
+        recheck_seconds (float, optional): Minimum time between top-ups for a ticker.
+        fetch_limit (int, optional): Articles requested by a ticker's first top-up.
+        batch_limit (int, optional): Maximum number of articles requested by top_up_many().
+    """
+
+    def __init__(self, db_path=None, recheck_seconds=DEFAULT_RECHECK_SECONDS, fetch_limit=DEFAULT_FETCH_LIMIT,
+                 batch_limit=DEFAULT_BATCH_LIMIT):
+        self.db_path = db_path or cache_path("news.sqlite3")
+        self.recheck_seconds = recheck_seconds
+        self.fetch_limit = fetch_limit
+        self.batch_limit = batch_limit
+        self._lock = threading.Lock()
+        # check_same_thread=False because the connection is shared and guarded by self._lock.
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                title TEXT,
+                source TEXT,
+                summary TEXT,
+                time_published TEXT,
+                sentiment_score REAL,
+                sentiment_label TEXT,
+                fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS article_tickers (
+                ticker TEXT NOT NULL,
+                url TEXT NOT NULL,
+                time_published TEXT,
+                relevance_score REAL,
+                ticker_sentiment_score REAL,
+                ticker_sentiment_label TEXT,
+                PRIMARY KEY (ticker, url)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS article_tickers_by_time ON article_tickers (ticker, time_published);
+            CREATE TABLE IF NOT EXISTS news_meta (
+                ticker TEXT PRIMARY KEY,
+                last_checked REAL NOT NULL,
+                latest_published TEXT
+            );
+            """
+        )
+        self._conn.commit()
+        # Counters exposed through stats().
+        self.api_calls = 0
+        self.batch_calls = 0
+        self.fallback_calls = 0
+        self.skipped_top_ups = 0
+        self.new_articles = 0
+        self.duplicate_articles = 0
+
+    def top_up(self, ticker):
+        """
+        Fetches the ticker's articles published since the newest stored one (its latest
+        'fetch_limit' articles the first time). If that is more than one response holds, earlier
+        pages are requested with 'time_to' until the newest stored article is reached. The ticker
+        is only marked as checked once every page is stored, so a failed page is fetched again by
+        the next top-up.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+
+        Returns:
+            int: The number of new articles stored.
+
+        Raises:
+            ValueError: If Alpha Vantage returns an error instead of a feed.
+            requests.exceptions.RequestException: If the request fails and nothing is stored yet.
+        """
+        ticker = ticker.upper()
+        last_checked, latest_published = self._meta(ticker)
+        if self._is_current(last_checked):
+            self.skipped_top_ups += 1
+            cache_result("news", "hit")
+            return 0
+        cache_result("news", "miss")
+
+        params = {"function": "NEWS_SENTIMENT", "tickers": ticker, "sort": "LATEST", "limit": self.fetch_limit}
+        if latest_published:
+            # time_from has minute resolution and is inclusive, so the newest stored article comes
+            # back again; the URL key drops it.
+            params["time_from"] = latest_published[:13]
+            params["limit"] = MAX_FETCH_LIMIT
+        added = 0
+        while True:
+            self.api_calls += 1
+            try:
+                data = get_scheduler().query(params)
+            except requests.exceptions.RequestException as e:
+                # Serve what we already have rather than failing the whole query.
+                if latest_published is None:
+                    raise
+                print(f"Could not top up news for {ticker}, using stored articles: {e}")
+                return added
+            feed = _feed(data, ticker)
+            added += self._write(feed, ticker)
+            if not latest_published or len(feed) < params["limit"]:
+                break
+            # A full page may not reach back to the newest stored article: ask for the page before
+            # its oldest article (time_to is inclusive too, so that article comes back again).
+            oldest = min(item.get("time_published") or "" for item in feed)[:13]
+            if oldest <= params["time_from"] or oldest == params.get("time_to"):
+                break
+            params["time_to"] = oldest
+
+        self._mark_checked([ticker])
+        return added
+
+    def top_up_many(self, tickers, min_articles=5):
+        """
+        Brings the news of several tickers up to date, with one request for all of them where possible.
+
+        NEWS_SENTIMENT with several 'tickers' only returns articles that mention all of them, so
+        instead one request fetches the latest market-wide feed (up to 'batch_limit' articles)
+        and files each article under every ticker in its 'ticker_sentiment' entries. The feed
+        covers a ticker if it reaches back to the ticker's newest stored article, or, for a ticker
+        with nothing stored yet, holds at least 'min_articles' articles about it. Any other ticker
+        gets its own top_up(), which pages back to its newest stored article, so the stored news
+        has no gap between that article and the feed unless a request fails (the ticker then
+        stays due and the next top-up asks again from the same article).
+
+        Args:
+            tickers (list of str): The stock ticker symbols.
+            min_articles (int, optional): Articles a ticker needs from the shared feed to skip its
+                own request.
+
+        Returns:
+            int: The number of upstream API calls made.
+        """
+        calls_before = self.api_calls
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        meta = {ticker: self._meta(ticker) for ticker in tickers}
+        due = [ticker for ticker in tickers if not self._is_current(meta[ticker][0])]
+        self.skipped_top_ups += len(tickers) - len(due)
+
+        if len(due) > 1:
+            params = {"function": "NEWS_SENTIMENT", "sort": "LATEST", "limit": self.batch_limit}
+            known = [meta[ticker][1] for ticker in due]
+            if all(known):
+                # Everything the tickers are missing was published after the oldest of their newest articles.
+                params["time_from"] = min(known)[:13]
+            self.api_calls += 1
+            self.batch_calls += 1
+            try:
+                feed = _feed(get_scheduler().query(params), "the market-wide feed")
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Batched news request failed, fetching per ticker: {e}")
+                feed = None
+            if feed is not None:
+                self._write(feed)
+                # The feed is complete from its oldest article onwards.
+                oldest = min((item.get("time_published") or "" for item in feed), default=None)
+                covered = []
+                for ticker in due:
+                    previous = meta[ticker][1]
+                    if previous:
+                        # Articles between 'previous' and the feed's oldest one would be missed.
+                        if oldest is None or oldest[:13] <= previous[:13]:
+                            covered.append(ticker)
+                    elif oldest and self._count_since(ticker, oldest) >= min_articles:
+                        covered.append(ticker)
+                self._mark_checked(covered)
+                due = [ticker for ticker in due if ticker not in covered]
+
+        # Tickers the shared feed didn't cover (e.g. rarely mentioned ones) get their own request.
+        for ticker in due:
+            self.fallback_calls += 1
+            try:
+                self.top_up(ticker)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Could not fetch news for {ticker}: {e}")
+        return self.api_calls - calls_before
+
+    def latest(self, ticker, n=5):
+        """
+        Returns the ticker's n most recent stored articles, newest first (no network access).
+
+        Returns:
+            list of dict: Articles with title, url, source, summary, time_published,
+            relevance_score, and sentiment_label and sentiment_score for this ticker (the
+            article's overall sentiment if the feed had no entry for the ticker).
+        """
+        return self._query(
+            "WHERE t.ticker = ? ORDER BY t.time_published DESC LIMIT ?", (ticker.upper(), n))
+
+    def window(self, ticker, start, end=None):
+        """
+        Returns the ticker's stored articles published between start and end, newest first
+        (no network access).
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            start (datetime, date or str): Start of the window, inclusive; strings use Alpha
+                Vantage's 'YYYYMMDDTHHMM[SS]' format.
+            end (datetime, date or str, optional): End of the window, exclusive. Defaults to no end.
+        """
+        end = _timestamp(end) if end is not None else "99999999T999999"
+        return self._query(
+            "WHERE t.ticker = ? AND t.time_published >= ? AND t.time_published < ? ORDER BY t.time_published DESC",
+            (ticker.upper(), _timestamp(start), end))
+
+    def stats(self):
+        """
+        Returns the store's counters: API calls, top-ups skipped because the news was current,
+        new and duplicate articles, and the number of stored articles.
+        """
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        return {
+            "api_calls": self.api_calls,
+            "batch_calls": self.batch_calls,
+            "fallback_calls": self.fallback_calls,
+            "skipped_top_ups": self.skipped_top_ups,
+            "new_articles": self.new_articles,
+            "duplicate_articles": self.duplicate_articles,
+            "stored_articles": stored,
+        }
+
+    def _meta(self, ticker):
+        # (last_checked, latest_published) for the ticker, or (None, None) if it was never fetched.
+        with self._lock:
+            meta = self._conn.execute(
+                "SELECT last_checked, latest_published FROM news_meta WHERE ticker = ?", (ticker,)).fetchone()
+        return meta if meta else (None, None)
+
+    def _is_current(self, last_checked):
+        return bool(last_checked) and time.time() - last_checked < self.recheck_seconds
+
+    def _count_since(self, ticker, published):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM article_tickers WHERE ticker = ? AND time_published >= ?",
+                (ticker, published)).fetchone()[0]
+
+    def _mark_checked(self, tickers):
+        # Record the check time and the newest stored article of each ticker.
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """INSERT INTO news_meta VALUES (?, ?, (SELECT MAX(time_published) FROM article_tickers WHERE ticker = ?))
+                   ON CONFLICT (ticker) DO UPDATE SET last_checked = excluded.last_checked,
+                                                      latest_published = excluded.latest_published""",
+                [(ticker, now, ticker) for ticker in tickers])
+            self._conn.commit()
+
+    def _write(self, feed, ticker=None):
+        # Store the feed's articles (new URLs only) and their per-ticker relevance and sentiment.
+        # 'ticker' is the ticker the feed was requested for, if any.
+        now = time.time()
+        articles, tickers = [], []
+        for item in feed:
+            url = item.get("url")
+            if not url:
+                continue
+            published = item.get("time_published")
+            articles.append((url, item.get("title"), item.get("source"), item.get("summary"), published,
+                             _to_float(item.get("overall_sentiment_score")), item.get("overall_sentiment_label"), now))
+            mentioned = False
+            for entry in item.get("ticker_sentiment") or []:
+                symbol = (entry.get("ticker") or "").upper()
+                mentioned = mentioned or symbol == ticker
+                tickers.append((symbol, url, published, _to_float(entry.get("relevance_score")),
+                                _to_float(entry.get("ticker_sentiment_score")), entry.get("ticker_sentiment_label")))
+            if ticker and not mentioned:
+                # Returned for this ticker's query, so keep it even without a sentiment entry.
+                tickers.append((ticker, url, published, None, None, None))
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", articles)
+            added = self._conn.total_changes - before
+            self._conn.executemany("INSERT OR REPLACE INTO article_tickers VALUES (?, ?, ?, ?, ?, ?)", tickers)
+            self._conn.commit()
+        self.new_articles += added
+        self.duplicate_articles += len(articles) - added
+        return added
+
+    def _query(self, where, args):
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT a.title, a.url, a.source, a.summary, a.time_published, t.relevance_score,
+                           COALESCE(t.ticker_sentiment_label, a.sentiment_label),
+                           COALESCE(t.ticker_sentiment_score, a.sentiment_score)
+                    FROM article_tickers t JOIN articles a ON a.url = t.url {where}""", args).fetchall()
+        return [
+            {"title": title, "url": url, "source": source, "summary": summary, "time_published": published,
+             "relevance_score": relevance, "sentiment_label": label, "sentiment_score": score}
+            for title, url, source, summary, published, relevance, label, score in rows
+        ]
+
+
+# The shared store used by the agents, created on first use.
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_news_store():
+    """
+    Returns the process-wide NewsStore, creating it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = NewsStore()
+        return _store
+
+
+if __name__ == "__main__":
+    # Report the API calls and articles transferred for repeated news requests: the first top-up
+    # fetches the feed, a top-up after the recheck interval only asks for newer articles, and
+    # reads in between are served from the store.
+    import os
+    import sys
+    import tempfile
+
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "IBM"
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NewsStore(db_path=os.path.join(tmp, "news.sqlite3"))
+        for label in ("cold", "warm", "after recheck"):
+            if label == "after recheck":
+                store.recheck_seconds = 0
+            calls_before, new_before = store.api_calls, store.new_articles
+            started = time.perf_counter()
+            store.top_up(ticker)
+            articles = store.latest(ticker, n=5)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>13}: {len(articles)} articles | {elapsed * 1000:7.1f} ms | "
+                  f"{store.api_calls - calls_before} API call(s) | {store.new_articles - new_before} new article(s)")
+        print(store.stats())
+        store._conn.close()
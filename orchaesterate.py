@@ -1,24 +1,139 @@
-import google.generativeai as genai # Import the Google Generative AI library.
-import os # Import the os module for environment variables.
+import asyncio # Import asyncio for the concurrent (async and batch) query APIs.
+import contextvars # Import contextvars to run streamed queries in their own context.
+import logging # Import logging to record which path parsed each query's intent.
+import time # Import time to measure intent parsing latency.
+from concurrent.futures import ThreadPoolExecutor # Import the thread pool that bounds batch concurrency.
 from identify_ticker import ticker_identify # Import the function to identify stock tickers from text.
 from ticker_news import ticker_news_agent # Import the function to fetch news about a stock.
 from tickeranalysis import tickeranalysis # Import the function to analyze stock price movements based on news.
+from tickeranalysis import tickeranalysis_stream # Import the streaming version of the analysis.
+from async_agents import run_blocking, stream_in_thread # Import the bounded agent pool and the helper that turns a blocking generator into an async iterator.
 from tickerprice import tickerprice # Import the function to get the current price of a stock.
 from tickerchange import tickerpricechange # Import the function to get the price change of a stock over a period.
+from tickerchange import tickerpricechanges # Import the function to get the price change over several periods at once.
+from price_series import is_supported_window # Import the check for window specifications like "3M" or "YTD".
+from av_scheduler import INTERACTIVE, request_priority # Import the Alpha Vantage request priority controls.
+from query_context import QueryContext # Import the per-query context that memoizes and parallelizes sub-agent calls.
+from providers import get_model # Import the shared Gemini model; the SDK is only loaded when the first query needs it.
+from intent_rules import get_intent_classifier # Import the local classifier that answers common intents without the LLM.
+from intent_rules import split_tickers # Import the separator rules shared with the local classifier to split a comparison's tickers.
+import tracing # Import the per-stage spans and metrics (see tracing.recent_traces and tracing.get_metrics).
+from profiling import QueryProfiler # Import the on-demand CPU/memory profiler for individual queries.
+from indicators import technical_summary # Import the technical indicators computed from the stored daily bars.
+from intraday import intraday_summary # Import the summary of today's intraday bars.
+from compare import DEFAULT_WINDOW, comparison_summary # Import the side-by-side comparison of several tickers.
 
-# Configure the Generative AI library with the API key from the environment variable 'GOOGLE_API_KEY'.
-genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
-
-# Initialize the Gemini Flash model for orchestrating the agents.
-orchestrator_model = genai.GenerativeModel("models/gemini-1.5-flash-latest")
+logger = logging.getLogger(__name__)
 
 # Define the StockAnalysisOrchestrator class to manage and route user queries to the appropriate sub-agents.
 class StockAnalysisOrchestrator:
-    def __init__(self):
-        pass # Currently no initialization logic needed for the orchestrator.
+    # profile_sample_rate: share of queries (0 to 1) profiled with cProfile and tracemalloc, with a
+    # report written to profile_dir (see profiling.QueryProfiler for the defaults). Single queries
+    # can also be profiled with process_query(..., profile=True).
+    def __init__(self, profile_sample_rate=None, profile_dir=None):
+        self.profiler = QueryProfiler(sample_rate=profile_sample_rate, directory=profile_dir)
 
     # Method to process a user's natural language query and coordinate with sub-agents.
-    def process_query(self, user_query):
+    # With stream=True it returns a generator of response chunks instead (see process_query_stream).
+    # profile=True profiles this query, profile=False never does; by default queries are sampled.
+    def process_query(self, user_query, stream=False, profile=None):
+        if stream:
+            return self.process_query_stream(user_query, profile=profile)
+        # A user is waiting for this answer, so its Alpha Vantage requests go ahead of background work.
+        # The query context memoizes sub-agent results so no data is fetched twice for one query.
+        # Each query is traced: intent parsing and every sub-agent become stages of its span.
+        with request_priority(INTERACTIVE), QueryContext() as ctx, tracing.span("process_query", query=user_query), \
+                self.profiler.profile(user_query, force=profile):
+            return self._process_query(user_query, ctx)
+
+    # Streaming version of process_query: a generator that yields the response in chunks.
+    # Analyses start with the price change and headlines, followed by Gemini's text as it is
+    # generated; every other answer is short and comes as a single chunk.
+    # The stream runs in its own copy of the caller's context: the query's span and request
+    # priority are set there, not in the context of the consumer, which keeps running between
+    # chunks (a span the consumer opens meanwhile must not become part of the query's trace).
+    def process_query_stream(self, user_query, profile=None):
+        context = contextvars.copy_context()
+        chunks = self._stream_chunks(user_query, profile)
+        try:
+            while True:
+                try:
+                    chunk = context.run(next, chunks)
+                except StopIteration:
+                    return
+                yield chunk
+        finally:
+            # Close an abandoned stream in its own context too, so its spans are reset where they were set.
+            context.run(chunks.close)
+
+    def _stream_chunks(self, user_query, profile):
+        with request_priority(INTERACTIVE), QueryContext() as ctx, tracing.span("process_query", query=user_query, stream=True), \
+                self.profiler.profile(user_query, force=profile):
+            response = self._process_query(user_query, ctx, stream=True)
+            if isinstance(response, str):
+                yield response
+            elif response is not None:
+                try:
+                    yield from response
+                except Exception as e:
+                    tracing.record_error(e)
+                    yield f"An error occurred: {e}"
+
+    # Async iterator version of process_query_stream, e.g.
+    #     async for chunk in orchestrator.process_query_stream_async(query): ...
+    async def process_query_stream_async(self, user_query, profile=None):
+        async for chunk in stream_in_thread(self.process_query_stream, user_query, profile=profile):
+            yield chunk
+
+    # Async version of process_query, so many queries can be in flight on one event loop.
+    async def process_query_async(self, user_query, profile=None):
+        # The sub-agents are blocking, so the query runs on the shared agent pool while the event
+        # loop stays free to start and finish other queries.
+        return await run_blocking(self.process_query, user_query, profile=profile)
+
+    # Process a batch of queries concurrently, with at most 'concurrency' queries in flight.
+    # Returns the responses in the same order as the queries.
+    async def process_queries_async(self, user_queries, concurrency=8):
+        loop = asyncio.get_running_loop()
+        # A dedicated pool sized to the concurrency limit, rather than asyncio's default pool
+        # (which is capped by the CPU count).
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="query-batch") as executor:
+            return await asyncio.gather(*(loop.run_in_executor(executor, self.process_query, query)
+                                          for query in user_queries))
+
+    # Synchronous entry point for batch processing (starts its own event loop). Code already
+    # running on an event loop must await process_queries_async instead.
+    def process_queries(self, user_queries, concurrency=8):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.process_queries_async(user_queries, concurrency=concurrency))
+        raise RuntimeError("process_queries() can't be called from a running event loop; "
+                           "use 'await orchestrator.process_queries_async(queries)' instead.")
+
+    # Work out the query's intent, ticker and timeframe. Common question shapes are classified
+    # locally by the rule-based classifier; the rest (or anything it isn't confident about) goes
+    # to the language model. Logs which path was taken and how long it took.
+    @tracing.traced("intent")
+    def _parse_intent(self, user_query):
+        classifier = get_intent_classifier()
+        started = time.perf_counter()
+        intent_parts = classifier.classify(user_query)
+        if intent_parts is not None:
+            logger.info("Intent for %r via rules in %.2f ms (confidence %.2f)", user_query,
+                        (time.perf_counter() - started) * 1000, intent_parts["Confidence"])
+            tracing.annotate(path="rules")
+            return intent_parts
+        started = time.perf_counter()
+        intent_parts = self._llm_intent(user_query)
+        elapsed = time.perf_counter() - started
+        classifier.record_llm(elapsed)
+        logger.info("Intent for %r via LLM in %.1f ms", user_query, elapsed * 1000)
+        tracing.annotate(path="llm")
+        return intent_parts
+
+    # Ask the language model for the query's intent, ticker and timeframe.
+    def _llm_intent(self, user_query):
         # Define a prompt for the language model to understand the user's intent and extract entities.
         intent_prompt = f"""You are an expert at understanding user queries related to stock analysis.
         Identify the main intent of the query and any relevant entities like stock tickers and timeframes.
@@ -39,6 +154,11 @@ class StockAnalysisOrchestrator:
         Ticker: NVDA
         Timeframe: last week
 
+        User: How has Microsoft done across every horizon?
+        Intent: Get price change
+        Ticker: MSFT
+        Timeframe: all
+
         User: What is the current price of Apple?
         Intent: Get current price
         Ticker: AAPL
@@ -52,23 +172,35 @@ class StockAnalysisOrchestrator:
         Ticker: AMZN
         Timeframe: last month
 
+        User: Compare Nvidia, AMD and Intel over the last year.
+        Intent: Compare tickers
+        Ticker: NVDA, AMD, INTC
+        Timeframe: last year
+
         User Query: {user_query}
         Intent:
         Ticker:
         Timeframe:"""
 
+        # Send the intent recognition prompt to the language model.
+        with tracing.span("gemini", purpose="intent"):
+            intent_response = get_model().generate_content(intent_prompt)
+        # Extract the text response and remove leading/trailing whitespace.
+        intent_text = intent_response.text.strip()
+        # Initialize a dictionary to store the extracted intent parts.
+        intent_parts = {}
+        # Parse the response text, splitting it into lines and then key-value pairs.
+        for line in intent_text.split('\n'):
+            if ':' in line:
+                key, value = line.split(':', 1)
+                intent_parts[key.strip()] = value.strip()
+        return intent_parts
+
+    # Parse the query's intent and route it to the sub-agents. With stream=True, analyses are
+    # returned as a generator of chunks rather than a string.
+    def _process_query(self, user_query, ctx, stream=False):
         try:
-            # Send the intent recognition prompt to the language model.
-            intent_response = orchestrator_model.generate_content(intent_prompt)
-            # Extract the text response and remove leading/trailing whitespace.
-            intent_text = intent_response.text.strip()
-            # Initialize a dictionary to store the extracted intent parts.
-            intent_parts = {}
-            # Parse the response text, splitting it into lines and then key-value pairs.
-            for line in intent_text.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    intent_parts[key.strip()] = value.strip()
+            intent_parts = self._parse_intent(user_query)
 
             # Extract the identified intent, ticker text, and raw timeframe from the parsed parts.
             intent = intent_parts.get("Intent")
@@ -81,25 +213,58 @@ class StockAnalysisOrchestrator:
             if not ticker_text:
                 return "Could not identify the stock ticker in your query."
 
+            # A comparison names several tickers: resolve each one, then compare their daily series
+            # over the timeframe ("today" is the last bar; the last year if the query names none).
+            if intent and "compare tickers" in intent.lower():
+                parts = split_tickers(ticker_text)
+                tickers = list(dict.fromkeys(ticker for ticker in (ctx.call(ticker_identify, part) for part in parts) if ticker))
+                if len(tickers) < 2:
+                    return f"Could not resolve at least two tickers to compare in '{ticker_text}'."
+                note = ""
+                if "Timeframe" not in intent_parts:
+                    window = DEFAULT_WINDOW
+                elif timeframe_normalized == "today":
+                    window = "1D"
+                elif timeframe_normalized != "recently" and is_supported_window(timeframe_raw):
+                    window = timeframe_raw
+                else:
+                    # Say so rather than silently answering over a different window.
+                    window = DEFAULT_WINDOW
+                    note = f"'{timeframe_raw}' is not a fixed window, so the comparison uses {DEFAULT_WINDOW}.\n"
+                comparison_result = ctx.call(comparison_summary, tuple(tickers), window)
+                return note + comparison_result if comparison_result else f"Could not compare {', '.join(tickers)}."
+
             # Use the ticker_identify sub-agent to resolve the ticker text to a standard symbol.
-            ticker = ticker_identify(ticker_text)
+            ticker = ctx.call(ticker_identify, ticker_text)
             # If the ticker cannot be resolved, return an error message.
             if not ticker:
                 return f"Could not resolve the ticker for '{ticker_text}'."
 
             # Subagent Selection and Invocation based on the identified intent.
             if intent and "price drop reason" in intent.lower():
-                # If the intent is to investigate a price drop, call the tickerpricechange and ticker_news agents.
-                price_change_result = tickerpricechange(ticker, "today")
-                news_result = ticker_news_agent(ticker)
+                # If the intent is to investigate a price drop, fetch today's price change, the news, the
+                # technical indicators and the intraday bars concurrently (they are independent), then
+                # hand them to the tickeranalysis agent so it doesn't fetch them again.
+                price_change_future = ctx.submit(tickerpricechange, ticker, "today")
+                news_future = ctx.submit(ticker_news_agent, ticker, max_articles=5)
+                technicals_future = ctx.submit(technical_summary, ticker)
+                intraday_future = ctx.submit(intraday_summary, ticker)
+                price_change_result = price_change_future.result()
+                news_result = news_future.result()
+                technicals = technicals_future.result()
+                intraday = intraday_future.result()
                 # If both price change and news are available, call the tickeranalysis agent.
                 if price_change_result and news_result:
-                    return tickeranalysis(ticker, "today")
+                    if stream:
+                        return tickeranalysis_stream(ticker, "today", news=news_result, price_change=price_change_result,
+                                                     technicals=technicals, intraday=intraday)
+                    return tickeranalysis(ticker, "today", news=news_result, price_change=price_change_result,
+                                          technicals=technicals, intraday=intraday)
                 else:
                     return "Could not retrieve enough information for analysis."
             elif intent and "get recent news" in intent.lower():
                 # If the intent is to get recent news, call the ticker_news_agent.
-                news_result = ticker_news_agent(ticker)
+                news_result = ctx.call(ticker_news_agent, ticker, max_articles=5)
                 if news_result:
                     # Format and return the recent news headlines.
                     return f"Recent news for {ticker}:\n" + "\n".join([f"- {item['title']}" for item in news_result])
@@ -109,22 +274,31 @@ class StockAnalysisOrchestrator:
                 # If the intent is to get the price change over a specific period.
                 if timeframe_normalized in ["week", "month", "year"]:
                     full_timeframe = f"last {timeframe_normalized}"
-                    price_change_result = tickerpricechange(ticker, full_timeframe)
+                    price_change_result = ctx.call(tickerpricechange, ticker, full_timeframe)
                     if price_change_result:
                         return f"Price change for {ticker} over the {full_timeframe}: {price_change_result}"
                     else:
                         return f"Could not retrieve price change information for {ticker} for the {full_timeframe}."
                 elif timeframe_normalized == "today":
-                    price_change_result = tickerpricechange(ticker, timeframe_normalized)
+                    price_change_result = ctx.call(tickerpricechange, ticker, timeframe_normalized)
                     if price_change_result:
                         return f"Price change for {ticker} for today: {price_change_result}"
                     else:
                         return f"Could not retrieve price change information for {ticker} for today."
+                elif timeframe_normalized == "all" or is_supported_window(timeframe_raw):
+                    # Answer every horizon (or any other supported window, e.g. "ytd" or "last 10 days")
+                    # from a single load of the daily series.
+                    price_changes = tickerpricechanges(ticker) if timeframe_normalized == "all" else tickerpricechanges(ticker, [timeframe_raw])
+                    if price_changes:
+                        return f"Price change for {ticker}:\n" + "\n".join(
+                            [f"- {window}: {change if change else 'not enough history'}" for window, change in price_changes.items()])
+                    else:
+                        return f"Could not retrieve price change information for {ticker}."
                 else:
                     return "Sorry, I cannot handle that specific timeframe for price change."
             elif intent and "get current price" in intent.lower():
                 # If the intent is to get the current price, call the tickerprice agent.
-                price_result = tickerprice(ticker)
+                price_result = ctx.call(tickerprice, ticker)
                 if isinstance(price_result, float):  # Ensure the result is a float before formatting.
                     return f"The current price of {ticker} is: ${price_result:.2f}"
                 elif isinstance(price_result, str):
@@ -133,7 +307,7 @@ class StockAnalysisOrchestrator:
                     return f"Could not retrieve the current price for {ticker}."
             elif intent and "get general information" in intent.lower():
                 # If the intent is to get general information, call the ticker_news agent to get recent news.
-                news_result = ticker_news_agent(ticker)
+                news_result = ctx.call(ticker_news_agent, ticker, max_articles=5)
                 if news_result:
                     # Format and return recent news titles and summaries.
                     return f"Here's some recent information about {ticker}:\n" + "\n".join([f"- {item['title']}: {item.get('summary', 'No summary available.')}" for item in news_result])
@@ -143,7 +317,7 @@ class StockAnalysisOrchestrator:
                 # If the intent is to analyze the direction of price change over a period.
                 if timeframe_normalized in ["week", "month", "year"]:
                     full_timeframe = f"last {timeframe_normalized}"
-                    price_change_result = tickerpricechange(ticker, full_timeframe)
+                    price_change_result = ctx.call(tickerpricechange, ticker, full_timeframe)
                     if price_change_result:
                         # Basic analysis of the direction based on the presence of '+' or '-' in the result string.
                         if "+" in price_change_result:
@@ -162,6 +336,7 @@ class StockAnalysisOrchestrator:
                 return "Sorry, I'm not sure how to handle that query."
 
         except Exception as e:
+            tracing.record_error(e)
             return f"An error occurred: {e}"
 
 # Example Usage when the script is run directly.
@@ -173,10 +348,12 @@ if __name__ == "__main__":
         "What is the current price of Apple?",
         "Tell me something about Google's stock.",
         "Did Amazon's price go up last month?",
-        "How has Tesla stock changed in the last year?"
+        "How has Tesla stock changed in the last year?",
+        "Compare NVDA, AMD and INTC over the last year"
     ]
 
-    for query in queries:
-        response = orchestrator.process_query(query)
+    # Process the queries concurrently; responses come back in the same order.
+    responses = orchestrator.process_queries(queries)
+    for query, response in zip(queries, responses):
         print(f"\nQuery: {query}")
         print(f"Response: {response}")
\ No newline at end of file
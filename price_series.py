@@ -0,0 +1,206 @@
+import re  # Regular expressions for parsing window specifications like "3M" or "last 10 days".
+from datetime import date  # For explicit date ranges and year-to-date windows.
+
+import numpy as np  # NumPy arrays hold the series so windows are answered with binary search.
+
+# Windows reported when the caller asks "how has X done" without naming a horizon.
+DEFAULT_WINDOWS = ("1D", "1W", "1M", "3M", "YTD", "1Y")
+
+# Calendar-day lengths for the named and shorthand horizons. These match the day counts
+# tickerpricechange has always used for 'last week', 'last month' and 'last year'.
+_UNIT_DAYS = {"W": 7, "M": 30, "Y": 365}
+_NAMED_WINDOWS = {"last week": 7, "last month": 30, "last year": 365}
+
+# "5D", "1W", "3M", "1Y" style shorthand. "D" counts trading days (bars), the others calendar days.
+_SHORTHAND = re.compile(r"^(\d+)\s*([dwmy])$")
+# "last 10 days", "past 3 months", "2 weeks".
+_SPELLED_OUT = re.compile(r"^(?:(?:last|past)\s+)?(\d+)\s+(day|week|month|year)s?$")
+
+
+def _parse_window(window):
+    # Translate a window specification into one of:
+    #   ("bars", n)              -> start n bars before the latest bar.
+    #   ("days", n)              -> start on the last bar on or before latest date - n days.
+    #   ("ytd", None)            -> start on the last bar of the previous calendar year.
+    #   ("range", (start, end))  -> explicit dates; each end snaps to the last bar on or before it.
+    # Returns None if the window is not understood.
+    if isinstance(window, (tuple, list)) and len(window) == 2:
+        start, end = (value if isinstance(value, date) else date.fromisoformat(str(value)) for value in window)
+        return "range", (start, end)
+    if not isinstance(window, str):
+        return None
+
+    text = window.strip().lower()
+    if text in _NAMED_WINDOWS:
+        return "days", _NAMED_WINDOWS[text]
+    if text == "ytd":
+        return "ytd", None
+
+    match = _SHORTHAND.match(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2).upper()
+        if unit == "D":
+            return "bars", count
+        return "days", count * _UNIT_DAYS[unit]
+
+    match = _SPELLED_OUT.match(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        return "days", count * {"day": 1, "week": 7, "month": 30, "year": 365}[unit]
+    return None
+
+
+def is_supported_window(window):
+    """
+    Returns True if 'window' is a specification DailySeries.returns understands.
+    """
+    try:
+        return _parse_window(window) is not None
+    except ValueError:
+        return False
+
+
+def window_bounds(dates, windows):
+    """
+    Returns the first and last bar of each window over a sorted, non-empty date array, as
+    (start_idx, end_idx, valid) arrays. A window starts on the last bar on or before its target
+    date; 'valid' is False where the dates don't cover the window.
+
+    Args:
+        dates (numpy.ndarray): Bar dates (datetime64[D]) in ascending order.
+        windows (iterable): Window specifications (see DailySeries.returns).
+
+    Raises:
+        ValueError: If a window specification is not understood.
+    """
+    windows = list(windows)
+    count = len(dates)
+    latest = dates[-1]
+    start_idx = np.empty(len(windows), dtype=np.int64)
+    end_idx = np.full(len(windows), count - 1, dtype=np.int64)
+
+    # Collect every calendar target first so one searchsorted call resolves them all.
+    targets, slots = [], []
+    for i, window in enumerate(windows):
+        parsed = _parse_window(window)
+        if parsed is None:
+            raise ValueError(f"Unsupported window: {window!r}")
+        kind, value = parsed
+        if kind == "bars":
+            start_idx[i] = count - 1 - value
+        elif kind == "days":
+            targets.append(latest - np.timedelta64(value, "D"))
+            slots.append(("start", i))
+        elif kind == "ytd":
+            targets.append(np.datetime64(f"{latest.astype(object).year - 1}-12-31", "D"))
+            slots.append(("start", i))
+        else:
+            targets.append(np.datetime64(value[0], "D"))
+            slots.append(("start", i))
+            targets.append(np.datetime64(value[1], "D"))
+            slots.append(("end", i))
+
+    if targets:
+        # Index of the last bar on or before each target date (-1 if the target precedes the series).
+        found = np.searchsorted(dates, np.array(targets, dtype="datetime64[D]"), side="right") - 1
+        for (which, i), index in zip(slots, found):
+            if which == "start":
+                start_idx[i] = index
+            else:
+                end_idx[i] = index
+
+    return start_idx, end_idx, (start_idx >= 0) & (end_idx >= start_idx)
+
+
+class DailySeries:
+    """
+    A ticker's daily bars held as NumPy arrays (dates plus open, high, low, close, volume).
+
+    The series is built once per ticker and can then answer any number of return windows with
+    a single vectorized binary search over the sorted date array.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        dates (array-like): Bar dates in ascending order (anything NumPy can turn into datetime64[D]).
+        open_, high, low, close, volume (array-like): Bar values aligned with 'dates'.
+    """
+
+    def __init__(self, ticker, dates, open_, high, low, close, volume):
+        self.ticker = ticker
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.open = np.asarray(open_, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def from_rows(cls, ticker, rows):
+        """
+        Builds a series from (date, open, high, low, close, volume) rows ordered oldest to newest,
+        as returned by DailyBarStore.get_bars.
+        """
+        if not rows:
+            empty = np.empty(0)
+            return cls(ticker, np.empty(0, dtype="datetime64[D]"), empty, empty, empty, empty, empty)
+        dates, opens, highs, lows, closes, volumes = zip(*rows)
+        return cls(ticker, dates, opens, highs, lows, closes, volumes)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def returns(self, windows=DEFAULT_WINDOWS):
+        """
+        Computes the price change for several windows at once.
+
+        Supported windows:
+            - "1D", "5D": N trading days (bars) back from the latest bar.
+            - "1W", "1M", "3M", "6M", "1Y", "5Y": calendar weeks (7 days), months (30 days), years (365 days).
+            - "last week", "last month", "last year": same as "1W", "1M", "1Y".
+            - "YTD": since the last close of the previous calendar year.
+            - "last N days" / "past N weeks" / "N months": N calendar units back.
+            - (start, end): an explicit date range as date objects or ISO strings (a [start, end]
+              list is keyed by the equivalent tuple).
+
+        The start of a window is the last bar on or before the target date, matching how
+        tickerpricechange has always picked its start price.
+
+        Args:
+            windows (iterable): Window specifications (see above).
+
+        Returns:
+            dict: Maps each window, as passed in, to a dict with 'start_date', 'end_date',
+            'start_price', 'end_price', 'change' and 'percent_change' (None when the start price
+            is zero), or to None if the series does not cover the window.
+
+        Raises:
+            ValueError: If a window specification is not understood.
+        """
+        # A [start, end] list works as a date range too, but results are keyed by window, so it
+        # becomes a (start, end) tuple.
+        windows = [tuple(window) if isinstance(window, list) else window for window in windows]
+        if len(self.dates) == 0:
+            return {window: None for window in windows}
+
+        start_idx, end_idx, valid = window_bounds(self.dates, windows)
+        safe_start = np.where(valid, start_idx, 0)
+        safe_end = np.where(valid, end_idx, 0)
+        start_prices = self.close[safe_start]
+        end_prices = self.close[safe_end]
+        changes = end_prices - start_prices
+
+        results = {}
+        for i, window in enumerate(windows):
+            if not valid[i]:
+                results[window] = None
+                continue
+            start_price = float(start_prices[i])
+            results[window] = {
+                "start_date": str(self.dates[safe_start[i]]),
+                "end_date": str(self.dates[safe_end[i]]),
+                "start_price": start_price,
+                "end_price": float(end_prices[i]),
+                "change": float(changes[i]),
+                "percent_change": float(changes[i] / start_price * 100) if start_price != 0 else None,
+            }
+        return results
@@ -0,0 +1,212 @@
+import contextvars  # Worker threads of a profiled query find its session through the copied context.
+import cProfile  # CPU profile of the query.
+import io  # For rendering the profile reports as text.
+import itertools  # Unique report numbers within a second.
+import logging  # Reports where each profile was written.
+import os  # For the report directory and environment settings.
+import pstats  # For sorting and merging the CPU profiles.
+import random  # For sampling queries.
+import threading  # Only one query is profiled at a time.
+import time  # For wall and CPU times.
+import tracemalloc  # Allocation sites and peak memory of the query.
+from contextlib import nullcontext  # The (free) context used when a query isn't profiled.
+from datetime import datetime  # For report timestamps and file names.
+
+import tracing  # The query's stage timings go into the report too.
+from storage import cache_path  # Default location of the reports.
+
+logger = logging.getLogger(__name__)
+
+# Number of functions (by cumulative time) and allocation sites listed in a report.
+DEFAULT_TOP = 40
+DEFAULT_TOP_ALLOCATIONS = 20
+
+# The profiling session of the query running in this context, if it is being profiled.
+_active_session = contextvars.ContextVar("profiling_session", default=None)
+
+# The CPU profiler and tracemalloc are process-wide, so profiled queries take turns; a query
+# that would overlap one already being profiled runs unprofiled.
+_busy = threading.Lock()
+_report_numbers = itertools.count(1)
+
+# Shared by every query that isn't profiled, so the disabled path allocates nothing.
+_NOT_PROFILED = nullcontext()
+
+
+def _env_rate(name):
+    value = os.environ.get(name)
+    return float(value) if value else 0.0
+
+
+class ProfileSession:
+    """
+    The CPU and memory profile of one query. Use it as a context manager around the query; on exit
+    the report is written to 'path' (a text report, plus the raw cProfile data next to it as
+    '.prof' for tools like snakeviz).
+    """
+
+    def __init__(self, query, directory, top=DEFAULT_TOP, top_allocations=DEFAULT_TOP_ALLOCATIONS):
+        self.query = query
+        self.directory = directory
+        self.top = top
+        self.top_allocations = top_allocations
+        self.path = None
+        self._lock = threading.Lock()
+        self._worker_profiles = []
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._snapshot_before = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _active_session.set(self)
+        # Leave tracemalloc running if something else started it; its snapshots are then compared.
+        if tracemalloc.is_tracing():
+            self._snapshot_before = tracemalloc.take_snapshot()
+        else:
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.started_at = datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.process_time() - self._cpu
+        snapshot = tracemalloc.take_snapshot()
+        _, self.peak_bytes = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        try:
+            _active_session.reset(self._token)
+        except ValueError:
+            pass
+        try:
+            self.path = self._write(snapshot, exc)
+            tracing.annotate(profile=self.path)
+            logger.info("Profile of %r (%.1f ms) written to %s", self.query, self.wall_seconds * 1000, self.path)
+        except OSError as e:
+            print(f"Could not write the profile of {self.query!r}: {e}")
+        finally:
+            _busy.release()
+        return False
+
+    def add_worker_profile(self, profile):
+        with self._lock:
+            self._worker_profiles.append(profile)
+
+    def _write(self, snapshot, exc):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"profile-{self.started_at:%Y%m%d-%H%M%S}-{next(_report_numbers)}"
+        base = os.path.join(self.directory, name)
+
+        cpu = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=cpu)
+        with self._lock:
+            for profile in self._worker_profiles:
+                stats.add(profile)
+        stats.dump_stats(base + ".prof")
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        if self._snapshot_before is not None:
+            allocations = snapshot.compare_to(self._snapshot_before, "lineno")[:self.top_allocations]
+        else:
+            allocations = snapshot.statistics("lineno")[:self.top_allocations]
+
+        query_span = tracing.current_span()
+        lines = [
+            f"Query: {self.query}",
+            f"Started: {self.started_at.isoformat(timespec='seconds')}",
+            f"Wall time: {self.wall_seconds * 1000:.1f} ms | CPU time (whole process): {self.cpu_seconds * 1000:.1f} ms",
+            f"Peak traced memory: {self.peak_bytes / 1024:.1f} KiB",
+            f"Worker threads profiled: {len(self._worker_profiles)}",
+        ]
+        if exc is not None:
+            lines.append(f"Raised: {type(exc).__name__}: {exc}")
+        if query_span is not None:
+            lines += ["", "== Stages ==", query_span.format()]
+        lines += ["", f"== CPU (cProfile, top {self.top} by cumulative time) ==", cpu.getvalue().strip(),
+                  "", f"== Memory (tracemalloc, top {self.top_allocations} allocation sites) =="]
+        lines += [str(statistic) for statistic in allocations]
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return base + ".txt"
+
+
+class QueryProfiler:
+    """
+    Decides which queries are profiled and profiles them.
+
+    A query is profiled when the caller asks for it, or at random with probability
+    'sample_rate'. Queries that aren't profiled go through a shared no-op context, so profiling
+    costs nothing unless it is used.
+
+    Args:
+        sample_rate (float, optional): Share of queries profiled (0 to 1). Defaults to
+            'STOCK_PROFILE_SAMPLE_RATE' or 0.
+        directory (str, optional): Where reports are written. Defaults to 'STOCK_PROFILE_DIR' or
+            'profiles' in the local data directory.
+        top (int, optional): Functions listed in the CPU report.
+    """
+
+    def __init__(self, sample_rate=None, directory=None, top=DEFAULT_TOP):
+        self.sample_rate = sample_rate if sample_rate is not None else _env_rate("STOCK_PROFILE_SAMPLE_RATE")
+        self.directory = directory or os.environ.get("STOCK_PROFILE_DIR")
+        self.top = top
+        self.profiled = 0
+        self.skipped_busy = 0
+
+    def profile(self, query, force=None):
+        """
+        Returns the context to run a query in: a ProfileSession if the query is profiled,
+        otherwise a no-op context.
+
+        Args:
+            query (str): The query, for the report.
+            force (bool, optional): True to profile this query, False never to; None samples.
+        """
+        if force is False or (force is None and (not self.sample_rate or random.random() >= self.sample_rate)):
+            return _NOT_PROFILED
+        if not _busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            logger.info("Not profiling %r: another query is being profiled", query)
+            return _NOT_PROFILED
+        self.profiled += 1
+        return ProfileSession(query, self.directory or cache_path("profiles"), top=self.top)
+
+
+def worker_profile():
+    """
+    Returns the context for running part of a query in a worker thread: it profiles the thread
+    into the query's session if the query is being profiled, and does nothing otherwise.
+    """
+    session = _active_session.get()
+    if session is None:
+        return _NOT_PROFILED
+    return _WorkerProfile(session)
+
+
+class _WorkerProfile:
+    # Profiles one worker thread's share of a profiled query.
+
+    def __init__(self, session):
+        self.session = session
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the query's own profiler.
+            self.profile = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is not None:
+            self.profile.disable()
+            self.session.add_worker_profile(self.profile)
+        return False
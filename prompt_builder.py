@@ -0,0 +1,208 @@
+import re  # For tokenizing headlines when looking for near-duplicates.
+import threading  # Protects the counters when analyses run in threads.
+
+# Token budget for the whole analysis prompt (instructions plus news). Gemini tokens average about
+# four characters of English text; see estimate_tokens().
+DEFAULT_TOKEN_BUDGET = 1200
+
+# Summaries are cut to this many characters before they are considered for the prompt.
+DEFAULT_SUMMARY_CHARS = 280
+
+# Headlines whose word sets overlap at least this much (Jaccard similarity) count as the same story.
+DUPLICATE_SIMILARITY = 0.8
+
+# The instructions of the analysis prompt: the same five sections as before, stated compactly.
+INSTRUCTIONS = """You are a senior financial analyst. Explain the recent price movement of '{ticker}' ({timeframe}), integrating the news below, the price change and market factors.
+
+Observed price change: {price_change}
+{technicals}{intraday}
+News about '{ticker}', most relevant first (sentiment for this ticker, -1 bearish to +1 bullish; relevance 0-1; publish time):
+{news}
+
+Write your analysis in five sections:
+**1. Price and Volume Context:** state the observed change and what the technical indicators show (trend against the moving averages, RSI, volatility, drawdown, unusual volume) and, when intraday bars are given, when during the session the move happened.
+**2. Recent News Analysis:** the likely impact of each significant item, its sentiment and the source's credibility.
+**3. Correlation and Causation:** do the price move and the news line up (positive news with gains, negative with losses, news without a reaction, news published just before the largest intraday move)? Don't assume causation without strong evidence.
+**4. Broader Market Context:** whether market or sector trends may explain the move independently of company news.
+**5. Summary of Key Drivers:** the most likely reasons, most significant first. If the move seems unrelated to the news, say so and suggest other causes (market forces, technical trading, information not yet public).
+
+Your detailed analysis summary:"""
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of LLM tokens in a text (about four characters per token for English),
+    without a round-trip to the model's token counter.
+    """
+    return (len(text) + 3) // 4
+
+
+def _words(headline):
+    return frozenset(re.findall(r"[a-z0-9]+", headline.lower()))
+
+
+def _similar(a, b):
+    # Jaccard similarity of two headlines' word sets.
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _importance(article):
+    # Articles that are about this ticker and move sentiment strongly come first. Articles without
+    # a relevance score count as moderately relevant, and neutral ones still rank by relevance.
+    relevance = _to_float(article.get("relevance_score"))
+    sentiment = _to_float(article.get("sentiment_score"))
+    return (0.5 if relevance is None else relevance) * (0.1 + abs(sentiment or 0.0))
+
+
+def _truncate(text, limit):
+    # Cut at a word boundary and mark the cut.
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0].rstrip(",.;:") + "..."
+
+
+class AnalysisPromptBuilder:
+    """
+    Builds the tickeranalysis prompt within a token budget, so the prompt (and the LLM's latency
+    and cost) stops growing with the number of articles.
+
+    - Near-identical headlines (the same story from several outlets) are kept once.
+    - Articles are ranked by relevance to the ticker times the strength of their sentiment.
+    - Summaries are shortened to 'summary_chars'; articles are added in rank order while they fit
+      the budget, dropping the summary of an article that only fits as a headline.
+
+    Args:
+        token_budget (int, optional): Maximum estimated tokens of the prompt; None for no limit.
+        summary_chars (int, optional): Maximum characters of each article summary; 0 leaves
+            summaries out.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, summary_chars=DEFAULT_SUMMARY_CHARS):
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        self._lock = threading.Lock()
+        # Counters exposed through stats().
+        self.calls = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.articles_in = 0
+        self.articles_used = 0
+        self.duplicates_dropped = 0
+        self.last_tokens = None
+
+    def build(self, ticker, timeframe, news, price_change, technicals=None, intraday=None):
+        """
+        Returns the analysis prompt for a ticker.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            timeframe (str): The timeframe of the price change (e.g. "today", "last week").
+            news (list of dict): Articles as returned by ticker_news_agent.
+            price_change (str): The formatted price change.
+            technicals (str, optional): The technical indicators as one line (see
+                indicators.format_indicators), if they are available.
+            intraday (str, optional): The session's intraday bars as one line (see
+                intraday.format_intraday), if they are available.
+
+        Returns:
+            str: The prompt.
+        """
+        # Drop near-duplicate headlines, keeping the most important version of each story.
+        ranked = sorted((article for article in news if article.get("title")), key=_importance, reverse=True)
+        unique, seen = [], []
+        for article in ranked:
+            words = _words(article["title"])
+            if any(_similar(words, other) >= DUPLICATE_SIMILARITY for other in seen):
+                continue
+            seen.append(words)
+            unique.append(article)
+
+        # Add articles in rank order while the prompt stays within the budget.
+        technicals = f"Technical indicators (daily bars): {technicals}\n" if technicals else ""
+        intraday = f"Intraday {intraday}\n" if intraday else ""
+        base_tokens = estimate_tokens(INSTRUCTIONS.format(ticker=ticker, timeframe=timeframe, price_change=price_change,
+                                                          technicals=technicals, intraday=intraday, news=""))
+        used_tokens = base_tokens
+        lines = []
+        for article in unique:
+            headline = (f"- {article['title']} (sentiment {_format_score(article.get('sentiment_score'))}, "
+                        f"{article.get('sentiment_label') or 'n/a'}; relevance {_format_score(article.get('relevance_score'), signed=False)}"
+                        f"; {article.get('source') or 'unknown source'}{_format_published(article.get('time_published'))})")
+            summary = _truncate(article.get("summary") or "", self.summary_chars) if self.summary_chars else ""
+            for line in ([f"{headline}\n  {summary}"] if summary else []) + [headline]:
+                tokens = estimate_tokens(line) + 1
+                if self.token_budget is None or used_tokens + tokens <= self.token_budget:
+                    lines.append(line)
+                    used_tokens += tokens
+                    break
+            else:
+                # Not even the headline fits; the remaining articles rank lower, so stop here.
+                break
+
+        prompt = INSTRUCTIONS.format(ticker=ticker, timeframe=timeframe, price_change=price_change,
+                                     technicals=technicals, intraday=intraday, news="\n".join(lines) if lines else "No significant news found.")
+        tokens = estimate_tokens(prompt)
+        with self._lock:
+            self.calls += 1
+            self.total_tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+            self.articles_in += len(news)
+            self.articles_used += len(lines)
+            self.duplicates_dropped += len(ranked) - len(unique)
+            self.last_tokens = tokens
+        return prompt
+
+    def stats(self):
+        """
+        Returns the builder's counters: prompts built, mean/max/last estimated prompt tokens, and
+        articles received, used and dropped as duplicates.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "mean_tokens": self.total_tokens / self.calls if self.calls else 0.0,
+                "max_tokens": self.max_tokens,
+                "last_tokens": self.last_tokens,
+                "articles_in": self.articles_in,
+                "articles_used": self.articles_used,
+                "duplicates_dropped": self.duplicates_dropped,
+            }
+
+
+def _format_score(value, signed=True):
+    value = _to_float(value)
+    if value is None:
+        return "n/a"
+    return f"{value:+.2f}" if signed else f"{value:.2f}"
+
+
+def _format_published(value):
+    # Alpha Vantage's '20240131T153000' as ', 2024-01-31 15:30', so the news can be lined up
+    # with the intraday bars.
+    if not value or len(value) < 13:
+        return ""
+    return f", {value[:4]}-{value[4:6]}-{value[6:8]} {value[9:11]}:{value[11:13]}"
+
+
+# The shared builder used by tickeranalysis, created on first use.
+_builder = None
+_builder_lock = threading.Lock()
+
+
+def get_prompt_builder():
+    """
+    Returns the process-wide AnalysisPromptBuilder, creating it on first use.
+    """
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            _builder = AnalysisPromptBuilder()
+        return _builder
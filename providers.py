@@ -0,0 +1,81 @@
+import os  # For reading the API keys from environment variables.
+import threading  # Makes first-use initialization safe when agents run in threads.
+
+# The Gemini model every agent uses unless it asks for another one.
+DEFAULT_MODEL_NAME = "models/gemini-1.5-flash-latest"
+
+_lock = threading.Lock()
+_models = {}  # Model name -> model object, created on first use.
+_genai = None  # The google.generativeai module, imported and configured on first use.
+
+
+def get_gemini_api_key():
+    """
+    Returns the Gemini API key from 'GEMINI_API_KEY' (or, for older setups, 'GOOGLE_API_KEY').
+
+    Raises:
+        ValueError: If neither environment variable is set.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("Gemini API key not found in environment variables. Please set GEMINI_API_KEY.")
+    return api_key
+
+
+def get_alpha_vantage_key():
+    """
+    Returns the Alpha Vantage API key from 'ALPHA_VANTAGE_API_KEY'.
+
+    Raises:
+        ValueError: If the environment variable is not set.
+    """
+    api_key = os.environ.get("ALPHA_VANTAGE_API_KEY")
+    if not api_key:
+        raise ValueError("Alpha Vantage API key not found in environment variables. "
+                         "Please set ALPHA_VANTAGE_API_KEY.")
+    return api_key
+
+
+def get_model(name=DEFAULT_MODEL_NAME):
+    """
+    Returns the shared Gemini model with the given name.
+
+    The Gemini SDK is imported and configured, and the model object created, the first time a
+    model is needed rather than when the agents are imported, so importing the orchestrator stays
+    cheap and a missing key only matters once an LLM call is actually made.
+
+    Args:
+        name (str, optional): The Gemini model name.
+
+    Returns:
+        google.generativeai.GenerativeModel: The model (or whatever was registered under that name).
+
+    Raises:
+        ValueError: If no Gemini API key is configured.
+    """
+    global _genai
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        if name not in _models:
+            if _genai is None:
+                import google.generativeai as genai  # The SDK takes most of a second to import.
+
+                genai.configure(api_key=get_gemini_api_key())
+                _genai = genai
+            _models[name] = _genai.GenerativeModel(name)
+        return _models[name]
+
+
+def register_model(model, name=DEFAULT_MODEL_NAME):
+    """
+    Makes get_model(name) return 'model', e.g. a fake model for benchmarks.
+
+    Returns:
+        The previously registered model, or None.
+    """
+    with _lock:
+        previous = _models.get(name)
+        _models[name] = model
+        return previous
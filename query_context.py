@@ -0,0 +1,109 @@
+import contextvars  # Copies the caller's context (e.g. request priority) into worker threads.
+import threading  # Protects the memo table when several fetches run at once.
+from concurrent.futures import Future, ThreadPoolExecutor  # Runs independent fetches concurrently.
+
+from profiling import worker_profile  # Worker threads of a profiled query are profiled too.
+
+
+def _call_key(fn, args, kwargs):
+    # Identify a sub-agent call by the function and its arguments.
+    return (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+
+
+class QueryContext:
+    """
+    Execution context for a single user query.
+
+    Sub-agent results are memoized for the lifetime of the context, so asking for the same data
+    twice within one query (e.g. news fetched for display and again for the analysis) costs one
+    upstream call. Independent fetches can be started concurrently with submit() and collected
+    with Future.result().
+
+    Use it as a context manager so the worker threads are released when the query is done:
+
+        with QueryContext() as ctx:
+            news = ctx.submit(ticker_news_agent, "TSLA", 5)
+            change = ctx.submit(tickerpricechange, "TSLA", "today")
+            tickeranalysis("TSLA", "today", news=news.result(), price_change=change.result())
+
+    Args:
+        max_workers (int, optional): Maximum number of sub-agent calls running at once.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._results = {}
+        self._executor = None
+        # Counters for reporting how many sub-agent calls the memo saved.
+        self.calls = 0
+        self.hits = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Starts fn(*args, **kwargs) in the background, unless the same call was already made.
+
+        Arguments must be hashable, since they form the memo key.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the sub-agent's result.
+        """
+        future, owner = self._claim(fn, args, kwargs)
+        if owner:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="query")
+                executor = self._executor
+            # Run in a copy of the caller's context so request priority and similar settings carry over.
+            context = contextvars.copy_context()
+            executor.submit(context.run, self._run_in_worker, future, fn, args, kwargs)
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Returns fn(*args, **kwargs), reusing the result if the same call was already made (or is
+        still running) in this context.
+        """
+        future, owner = self._claim(fn, args, kwargs)
+        if owner:
+            self._run(future, fn, args, kwargs)
+        return future.result()
+
+    def close(self):
+        # Wait for running fetches and release the worker threads.
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _claim(self, fn, args, kwargs):
+        # Return (future, owner): owner is True if the caller must run the call itself.
+        key = _call_key(fn, args, kwargs)
+        with self._lock:
+            self.calls += 1
+            future = self._results.get(key)
+            if future is not None:
+                self.hits += 1
+                return future, False
+            future = Future()
+            self._results[key] = future
+            return future, True
+
+    @classmethod
+    def _run_in_worker(cls, future, fn, args, kwargs):
+        # The query's profiler only sees its own thread; a worker's share is profiled separately.
+        with worker_profile():
+            cls._run(future, fn, args, kwargs)
+
+    @staticmethod
+    def _run(future, fn, args, kwargs):
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
@@ -0,0 +1,230 @@
+import sys  # For estimating the memory used by cached quotes.
+import threading  # Locks and background refresh threads.
+import time  # For expiry times and latency measurements.
+from collections import OrderedDict  # Ordered by recency of use, for LRU eviction.
+
+import market_hours  # Regular session times, used to pick how long a quote stays fresh.
+from av_scheduler import BACKGROUND, request_priority  # Background refreshes don't delay interactive queries.
+from quotes import bulk_quotes, fetch_quote  # Upstream quote fetches.
+from tracing import cache_result  # Hits and misses show up in the query's spans and metrics.
+
+# How long a quote stays fresh while the market is open, and how long after that an expired
+# quote may still be served while a refresh runs in the background.
+DEFAULT_INTRADAY_TTL = 60.0
+DEFAULT_STALE_SECONDS = 120.0
+
+# Upper bound on the (estimated) memory held by cached quotes.
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+
+def _entry_size(ticker, quote):
+    # Rough memory estimate for one cache entry: the key, the record and its fields.
+    return sys.getsizeof(ticker) + sys.getsizeof(quote) + sum(sys.getsizeof(field) for field in quote) + 200
+
+
+class QuoteCache:
+    """
+    A shared cache of current quotes whose freshness follows the exchange session.
+
+    - While the market is open a quote is fresh for 'intraday_ttl' seconds.
+    - After the close, and on weekends, a quote cannot change until the next session, so it is
+      kept until the next open.
+    - Once expired, a quote is still served for 'stale_seconds' while a single background
+      refresh fetches a new one (stale-while-revalidate); after that, callers wait for a fetch.
+    - Least recently used quotes are evicted when the estimated memory exceeds 'max_bytes'.
+
+    Args:
+        fetch (callable, optional): Fetches one Quote for a ticker. Defaults to quotes.fetch_quote.
+        intraday_ttl (float, optional): Freshness while the market is open, in seconds.
+        stale_seconds (float, optional): How long an expired quote may be served while refreshing.
+        max_bytes (int, optional): Memory cap for cached quotes.
+    """
+
+    def __init__(self, fetch=fetch_quote, intraday_ttl=DEFAULT_INTRADAY_TTL,
+                 stale_seconds=DEFAULT_STALE_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.fetch = fetch
+        self.intraday_ttl = intraday_ttl
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # ticker -> (quote, expires_at, stale_until, size)
+        self._refreshing = set()
+        self.bytes_used = 0
+        # Counters exposed through stats().
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.fetches = 0
+        self.fetch_seconds = 0.0
+        self.latency_saved_seconds = 0.0
+
+    def get(self, ticker, force_refresh=False):
+        """
+        Returns the current Quote for a ticker, from the cache when possible.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            force_refresh (bool, optional): Always fetch (and cache) a new quote.
+
+        Returns:
+            Quote: The cached or freshly fetched quote.
+
+        Raises:
+            Whatever the fetch function raises (ValueError, requests.exceptions.RequestException)
+            when the quote is not cached.
+        """
+        ticker = ticker.upper()
+        now = time.time()
+        serve_stale = start_refresh = False
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is not None and not force_refresh:
+                quote, expires_at, stale_until, _ = entry
+                if now < stale_until:
+                    self._entries.move_to_end(ticker)
+                    self.latency_saved_seconds += self._mean_fetch_seconds()
+                    if now < expires_at:
+                        self.hits += 1
+                        cache_result("quote", "hit")
+                        return quote
+                    # Expired but within the stale window: serve it and refresh in the background
+                    # (unless a refresh for this ticker is already running).
+                    self.stale_hits += 1
+                    serve_stale = True
+                    start_refresh = ticker not in self._refreshing
+                    self._refreshing.add(ticker)
+            if not serve_stale:
+                self.misses += 1
+        if serve_stale:
+            cache_result("quote", "stale")
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(ticker,), daemon=True).start()
+            return quote
+
+        cache_result("quote", "miss")
+        started = time.perf_counter()
+        quote = self.fetch(ticker)
+        with self._lock:
+            self.fetches += 1
+            self.fetch_seconds += time.perf_counter() - started
+        self.put(quote, ticker)
+        return quote
+
+    def get_many(self, tickers):
+        """
+        Returns quotes for many tickers, fetching all uncached ones in one bulk request.
+
+        Returns:
+            dict: Maps each upper-cased ticker to its Quote, or to None if it couldn't be fetched.
+        """
+        results, missing = {}, []
+        now = time.time()
+        with self._lock:
+            for ticker in dict.fromkeys(t.upper() for t in tickers):
+                entry = self._entries.get(ticker)
+                if entry is not None and now < entry[1]:
+                    self._entries.move_to_end(ticker)
+                    self.hits += 1
+                    self.latency_saved_seconds += self._mean_fetch_seconds()
+                    results[ticker] = entry[0]
+                else:
+                    self.misses += 1
+                    results[ticker] = None
+                    missing.append(ticker)
+        if missing:
+            for ticker, quote in bulk_quotes(missing).items():
+                results[ticker] = quote
+                if quote is not None:
+                    self.put(quote, ticker)
+        return results
+
+    def put(self, quote, ticker=None):
+        """
+        Stores a quote, with an expiry that depends on whether the market is open right now.
+        """
+        ticker = (ticker or quote.symbol).upper()
+        now = time.time()
+        if market_hours.is_market_open():
+            expires_at = now + self.intraday_ttl
+        else:
+            expires_at = now + market_hours.seconds_until_next_open()
+        size = _entry_size(ticker, quote)
+        with self._lock:
+            previous = self._entries.pop(ticker, None)
+            if previous is not None:
+                self.bytes_used -= previous[3]
+            self._entries[ticker] = (quote, expires_at, expires_at + self.stale_seconds, size)
+            self.bytes_used += size
+            # Evict least recently used quotes until we're back under the memory cap.
+            while self.bytes_used > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted[3]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self):
+        """
+        Returns the cache's counters: hits, stale hits, misses, hit rate, background refreshes,
+        evictions, memory used and the estimated latency saved by serving from the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes_used": self.bytes_used,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "evictions": self.evictions,
+                "latency_saved_seconds": self.latency_saved_seconds,
+            }
+
+    def _mean_fetch_seconds(self):
+        # Average upstream fetch latency, used to estimate the time saved by each hit.
+        return self.fetch_seconds / self.fetches if self.fetches else 0.0
+
+    def _refresh(self, ticker):
+        # Background revalidation of an expired quote. Failures keep serving the stale quote
+        # until its stale window ends.
+        try:
+            with request_priority(BACKGROUND):
+                quote = self.fetch(ticker)
+            self.put(quote, ticker)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            print(f"Background quote refresh failed for {ticker}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(ticker)
+
+
+# The process-wide quote cache shared by all agents, created on first use.
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_quote_cache():
+    """
+    Returns the shared QuoteCache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QuoteCache()
+        return _cache
+
+
+def get_quote(ticker, force_refresh=False):
+    """
+    Returns the current Quote for a ticker through the shared cache (see QuoteCache.get).
+    """
+    return get_quote_cache().get(ticker, force_refresh=force_refresh)
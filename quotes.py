@@ -0,0 +1,166 @@
+import contextvars  # Copies the caller's context (e.g. request priority) into fan-out threads.
+import os  # For the option that disables the bulk endpoint.
+from collections import namedtuple  # Compact, typed quote records.
+from concurrent.futures import ThreadPoolExecutor  # Fans GLOBAL_QUOTE requests out over the pooled client.
+
+import requests  # Import the requests library for its exception types.
+
+from av_scheduler import get_scheduler  # Quota-aware scheduler in front of the shared Alpha Vantage client.
+
+# A single quote. Prices are floats, volume is an int, latest_trading_day an ISO date string
+# (or a timestamp for bulk quotes).
+Quote = namedtuple("Quote", ["symbol", "price", "previous_close", "change", "change_percent", "volume",
+                             "latest_trading_day"])
+
+# REALTIME_BULK_QUOTES accepts up to 100 symbols per request.
+BULK_BATCH_SIZE = 100
+
+# Concurrent GLOBAL_QUOTE requests when the bulk endpoint is unavailable. The scheduler still
+# enforces the API budget, so this only bounds how many requests wait in its queue at once.
+FAN_OUT_WORKERS = 8
+
+# REALTIME_BULK_QUOTES is a premium endpoint. Once the API says it isn't available on our key (its
+# premium 'Information' notice) we stop asking for the rest of the process; other errors only
+# affect the batch that got them. Set ALPHA_VANTAGE_BULK_QUOTES=0 to never try it.
+_bulk_available = os.environ.get("ALPHA_VANTAGE_BULK_QUOTES", "1") != "0"
+
+
+def _to_float(value):
+    # Alpha Vantage reports numbers as strings, percentages with a trailing '%'.
+    if value in (None, ""):
+        return None
+    return float(str(value).rstrip("%"))
+
+
+def parse_global_quote(global_quote):
+    """
+    Converts a 'Global Quote' dictionary from the GLOBAL_QUOTE endpoint into a Quote.
+
+    Returns:
+        Quote: The parsed quote, or None if the dictionary has no price.
+
+    Raises:
+        ValueError: If a numeric field cannot be converted.
+    """
+    if not global_quote or not global_quote.get("05. price"):
+        return None
+    volume = _to_float(global_quote.get("06. volume"))
+    return Quote(
+        symbol=global_quote.get("01. symbol"),
+        price=_to_float(global_quote.get("05. price")),
+        previous_close=_to_float(global_quote.get("08. previous close")),
+        change=_to_float(global_quote.get("09. change")),
+        change_percent=_to_float(global_quote.get("10. change percent")),
+        volume=int(volume) if volume is not None else None,
+        latest_trading_day=global_quote.get("07. latest trading day"),
+    )
+
+
+def _parse_bulk_quote(item):
+    # Converts one entry of the REALTIME_BULK_QUOTES 'data' list into a Quote.
+    volume = _to_float(item.get("volume"))
+    return Quote(
+        symbol=item.get("symbol"),
+        price=_to_float(item.get("close")),
+        previous_close=_to_float(item.get("previous_close")),
+        change=_to_float(item.get("change")),
+        change_percent=_to_float(item.get("change_percent")),
+        volume=int(volume) if volume is not None else None,
+        latest_trading_day=item.get("timestamp"),
+    )
+
+
+def fetch_quote(ticker):
+    """
+    Fetches a single quote with the GLOBAL_QUOTE endpoint.
+
+    Args:
+        ticker (str): The stock ticker symbol (e.g., "AAPL").
+
+    Returns:
+        Quote: The current quote.
+
+    Raises:
+        ValueError: If Alpha Vantage returns an error or no quote for the ticker.
+        requests.exceptions.RequestException: If the request fails.
+    """
+    data = get_scheduler().query({"function": "GLOBAL_QUOTE", "symbol": ticker})
+    quote = parse_global_quote(data.get("Global Quote"))
+    if quote is not None:
+        return quote
+    elif "Error Message" in data:
+        raise ValueError(f"Alpha Vantage API Error for {ticker}: {data['Error Message']}")
+    else:
+        raise ValueError(f"No 'Global Quote' data found for ticker: {ticker}. Response: {data}")
+
+
+def _fetch_bulk(tickers):
+    # One REALTIME_BULK_QUOTES request for up to BULK_BATCH_SIZE tickers.
+    # Returns {symbol: Quote}, or None if this batch got no data (the caller then fetches its
+    # tickers one by one).
+    global _bulk_available
+    data = get_scheduler().query({"function": "REALTIME_BULK_QUOTES", "symbol": ",".join(tickers)})
+    if "data" not in data:
+        if "premium" in str(data.get("Information", "")).lower():
+            # Not available on this API key: fall back for good.
+            _bulk_available = False
+        else:
+            # E.g. an 'Error Message' about one bad symbol: only this batch falls back.
+            print(f"Bulk quote request returned no data, fetching quotes individually: {data}")
+        return None
+    return {item["symbol"].upper(): _parse_bulk_quote(item) for item in data["data"] if item.get("symbol")}
+
+
+def _fetch_one_safely(ticker):
+    try:
+        return fetch_quote(ticker)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Could not retrieve quote for {ticker}: {e}")
+        return None
+
+
+def bulk_quotes(tickers):
+    """
+    Fetches quotes for a whole list of tickers (e.g. a watchlist).
+
+    Uses Alpha Vantage's REALTIME_BULK_QUOTES endpoint (100 symbols per request) when the API key
+    has access to it; otherwise falls back to concurrent GLOBAL_QUOTE requests over the pooled
+    client, within the scheduler's API budget.
+
+    Args:
+        tickers (iterable of str): Ticker symbols. Duplicates are fetched once.
+
+    Returns:
+        dict: Maps each upper-cased ticker to its Quote, or to None if no quote could be retrieved.
+    """
+    symbols = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    results = dict.fromkeys(symbols)
+
+    missing = symbols
+    if _bulk_available:
+        missing = []
+        for start in range(0, len(symbols), BULK_BATCH_SIZE):
+            batch = symbols[start:start + BULK_BATCH_SIZE]
+            try:
+                batch_quotes = _fetch_bulk(batch) if _bulk_available else None
+            except requests.exceptions.RequestException as e:
+                print(f"Bulk quote request failed, fetching quotes individually: {e}")
+                batch_quotes = None
+            if batch_quotes is None:
+                missing.extend(batch)
+                continue
+            for symbol in batch:
+                if symbol in batch_quotes:
+                    results[symbol] = batch_quotes[symbol]
+                else:
+                    missing.append(symbol)
+
+    if missing:
+        # Fan out over the pooled client; each thread runs in a copy of the caller's context so
+        # the request priority carries over.
+        with ThreadPoolExecutor(max_workers=min(FAN_OUT_WORKERS, len(missing)), thread_name_prefix="quotes") as pool:
+            futures = {symbol: pool.submit(contextvars.copy_context().run, _fetch_one_safely, symbol)
+                       for symbol in missing}
+            for symbol, future in futures.items():
+                results[symbol] = future.result()
+    return results
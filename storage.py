@@ -0,0 +1,23 @@
+import os  # Import the os module for environment variables and filesystem paths.
+
+# Default location for locally persisted data (daily bars, caches). It lives next to the agents
+# so it is easy to find and delete; everything stored there can be rebuilt from the APIs.
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stock_cache")
+
+
+def cache_path(filename):
+    """
+    Returns the full path of a file inside the local data directory, creating the directory if needed.
+
+    The directory can be moved with the 'STOCK_CACHE_DIR' environment variable (useful for
+    benchmarks and for workers that should not share state).
+
+    Args:
+        filename (str): Name of the file inside the data directory (e.g., "daily_bars.sqlite3").
+
+    Returns:
+        str: The absolute path of the file.
+    """
+    directory = os.environ.get("STOCK_CACHE_DIR") or DEFAULT_CACHE_DIR
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
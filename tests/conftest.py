@@ -0,0 +1,42 @@
+import os  # For the repository root and the data directory.
+import sys  # The agents are top-level modules next to this directory.
+
+import pytest  # Fixtures shared by the tests.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # Every test gets its own data directory, so nothing lands in the real .stock_cache.
+    directory = tmp_path / "stock_cache"
+    monkeypatch.setenv("STOCK_CACHE_DIR", str(directory))
+    return directory
+
+
+class FakeScheduler:
+    """
+    Stands in for the Alpha Vantage scheduler: answers each query with respond(params) and keeps
+    the params of every call in 'calls'.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+
+    def query(self, params, priority=None):
+        self.calls.append(dict(params))
+        return self.respond(params)
+
+
+@pytest.fixture
+def fake_scheduler(monkeypatch):
+    # Returns a function that installs a FakeScheduler answering with 'respond'.
+    import av_scheduler
+
+    def install(respond):
+        scheduler = FakeScheduler(respond)
+        monkeypatch.setattr(av_scheduler, "_scheduler", scheduler)
+        return scheduler
+
+    return install
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import requests
+
+import bar_store
+from bar_store import DailyBarStore
+from market_hours import EXCHANGE_TZ
+from price_series import DailySeries
+
+# Wednesday 2026-01-07, during the session and after the close (exchange time).
+DURING_SESSION = datetime(2026, 1, 7, 12, 0, tzinfo=EXCHANGE_TZ)
+AFTER_CLOSE = datetime(2026, 1, 7, 17, 0, tzinfo=EXCHANGE_TZ)
+
+
+def bar(close):
+    return {"1. open": str(close), "2. high": str(close), "3. low": str(close), "4. close": str(close),
+            "5. volume": "1000"}
+
+
+def compact_response(days):
+    return {"Time Series (Daily)": {day: bar(100.0 + index) for index, day in enumerate(days)}}
+
+
+@pytest.fixture
+def at(monkeypatch):
+    # Sets the time the store works out the latest closed session from.
+    latest_expected_trading_day = bar_store._latest_expected_trading_day
+
+    def set_now(now):
+        expected = latest_expected_trading_day(now)
+        monkeypatch.setattr(bar_store, "_latest_expected_trading_day", lambda now=None: expected)
+
+    return set_now
+
+
+@pytest.fixture
+def store(tmp_path):
+    # recheck_seconds=0: a store that looks behind always asks again.
+    store = DailyBarStore(db_path=str(tmp_path / "daily_bars.sqlite3"), recheck_seconds=0)
+    yield store
+    store._conn.close()
+
+
+def stored_days(store, ticker="IBM"):
+    return [row[0] for row in store._read(ticker)]
+
+
+@pytest.mark.parametrize("now, expected", [
+    (DURING_SESSION, "2026-01-06"),
+    (datetime(2026, 1, 7, 8, 0, tzinfo=EXCHANGE_TZ), "2026-01-06"),
+    (AFTER_CLOSE, "2026-01-07"),
+    # Monday before the close: Friday's bar; Sunday: Friday's bar.
+    (datetime(2026, 1, 12, 10, 0, tzinfo=EXCHANGE_TZ), "2026-01-09"),
+    (datetime(2026, 1, 11, 18, 0, tzinfo=EXCHANGE_TZ), "2026-01-09"),
+    # 22:00 UTC is 17:00 in New York, after its close, although the UTC date is the same.
+    (datetime(2026, 1, 7, 22, 0), "2026-01-07"),
+])
+def test_latest_expected_trading_day(now, expected):
+    assert bar_store._latest_expected_trading_day(now) == expected
+
+
+def test_todays_partial_bar_is_not_stored_during_the_session(store, fake_scheduler, at):
+    store._write("IBM", compact_response(["2026-01-05"])["Time Series (Daily)"])
+    scheduler = fake_scheduler(lambda params: compact_response(["2026-01-05", "2026-01-06", "2026-01-07"]))
+    at(DURING_SESSION)
+    assert store.top_up("IBM") == 1
+    assert scheduler.calls[0]["outputsize"] == "compact"
+    assert stored_days(store) == ["2026-01-05", "2026-01-06"]
+    # Yesterday's bar is the latest final one, so later calls during the session stay local.
+    assert store.top_up("IBM") == 0
+    assert len(scheduler.calls) == 1
+
+
+def test_todays_bar_is_fetched_after_the_close(store, fake_scheduler, at):
+    store._write("IBM", compact_response(["2026-01-05", "2026-01-06"])["Time Series (Daily)"])
+    scheduler = fake_scheduler(lambda params: compact_response(["2026-01-06", "2026-01-07"]))
+    at(DURING_SESSION)
+    assert store.top_up("IBM") == 0
+    at(AFTER_CLOSE)
+    assert store.top_up("IBM") == 1
+    assert stored_days(store) == ["2026-01-05", "2026-01-06", "2026-01-07"]
+    assert store.top_up("IBM") == 0
+    assert len(scheduler.calls) == 1
+
+
+def test_a_stored_in_progress_bar_is_dropped(store, fake_scheduler, at):
+    # Left behind by a store that wrote bars during the session.
+    store._write("IBM", compact_response(["2026-01-05", "2026-01-06", "2026-01-07"])["Time Series (Daily)"])
+    scheduler = fake_scheduler(lambda params: compact_response([]))
+    at(DURING_SESSION)
+    assert len(store.get_series("IBM")) == 2
+    assert stored_days(store) == ["2026-01-05", "2026-01-06"]
+    assert scheduler.calls == []
+
+
+def test_full_download_keeps_only_closed_sessions(store, monkeypatch, at):
+    dates = np.array(["2026-01-05", "2026-01-06", "2026-01-07"], dtype="datetime64[D]")
+    closes = np.array([100.0, 101.0, 102.0])
+    series = DailySeries("IBM", dates, closes, closes, closes, closes, np.ones(3))
+    monkeypatch.setattr(store, "_fetch_full", lambda ticker: series)
+    at(DURING_SESSION)
+    assert store.top_up("IBM") == 1
+    assert stored_days(store) == ["2026-01-05", "2026-01-06"]
+    assert list(store.get_series("IBM").close) == [100.0, 101.0]
+    assert store.backfill(["IBM"], force=True) == {"IBM": 2}
+
+
+def test_failed_top_up_serves_stored_bars_and_waits_before_retrying(tmp_path, fake_scheduler, at):
+    store = DailyBarStore(db_path=str(tmp_path / "daily_bars.sqlite3"))
+    store._write("IBM", compact_response(["2026-01-05"])["Time Series (Daily)"])
+    # Stored an hour ago, so the store is due for a top-up.
+    with store._lock:
+        store._conn.execute("UPDATE bar_meta SET last_checked = last_checked - 3600")
+    scheduler = fake_scheduler(lambda params: {"Error Message": "Invalid API call."})
+    at(AFTER_CLOSE)
+    assert store.top_up("IBM") == 1
+    assert stored_days(store) == ["2026-01-05"]
+    # The attempt was recorded: within the recheck interval the stored bars are used as they are.
+    assert store.top_up("IBM") == 0
+    assert len(scheduler.calls) == 1
+    store._conn.close()
+
+
+def test_failed_first_download_raises(store, monkeypatch, at):
+    def fail(ticker):
+        raise requests.exceptions.ConnectionError("connection reset")
+
+    monkeypatch.setattr(store, "_fetch_full", fail)
+    at(AFTER_CLOSE)
+    with pytest.raises(requests.exceptions.RequestException):
+        store.top_up("IBM")
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pytest
+
+from av_client import AlphaVantageThrottled
+from csv_ingest import parse_daily_csv
+
+HEADER = "timestamp,open,high,low,close,volume"
+# Newest first, as Alpha Vantage sends it.
+ROWS = [
+    "2026-01-07,12.0,12.5,11.5,12.2,3000",
+    "2026-01-06,11.0,11.5,10.5,11.2,2000",
+    "2026-01-05,10.0,10.5,9.5,10.2,1000",
+]
+
+
+def test_parses_bytes_oldest_first():
+    series = parse_daily_csv("TEST", [line.encode() for line in [HEADER] + ROWS])
+    assert series.ticker == "TEST"
+    assert [str(day) for day in series.dates] == ["2026-01-05", "2026-01-06", "2026-01-07"]
+    assert list(series.open) == [10.0, 11.0, 12.0]
+    assert list(series.high) == [10.5, 11.5, 12.5]
+    assert list(series.low) == [9.5, 10.5, 11.5]
+    assert list(series.close) == [10.2, 11.2, 12.2]
+    assert list(series.volume) == [1000.0, 2000.0, 3000.0]
+    assert series.close.dtype == np.float64
+
+
+def test_parses_text_with_reordered_columns_and_blank_lines():
+    lines = ["Volume,Close,Low,High,Open,Timestamp", "", "2000,11.2,10.5,11.5,11.0,2026-01-06",
+             "1000,10.2,9.5,10.5,10.0,2026-01-05", ""]
+    series = parse_daily_csv("TEST", lines)
+    assert [str(day) for day in series.dates] == ["2026-01-05", "2026-01-06"]
+    assert list(series.close) == [10.2, 11.2]
+    assert list(series.volume) == [1000.0, 2000.0]
+
+
+def test_unordered_and_duplicate_days_are_sorted_and_deduplicated():
+    series = parse_daily_csv("TEST", [HEADER, ROWS[1], ROWS[2], ROWS[0], ROWS[2]])
+    assert [str(day) for day in series.dates] == ["2026-01-05", "2026-01-06", "2026-01-07"]
+    assert list(series.close) == [10.2, 11.2, 12.2]
+
+
+def test_header_only_is_an_empty_series():
+    assert len(parse_daily_csv("TEST", [HEADER])) == 0
+
+
+def test_error_payload_raises_value_error():
+    body = json.dumps({"Error Message": "Invalid API call."}, indent=4).splitlines()
+    with pytest.raises(ValueError, match="Invalid API call"):
+        parse_daily_csv("TEST", body)
+
+
+def test_rate_limit_note_raises_throttled():
+    body = [json.dumps({"Note": "Our standard API call frequency is 5 calls per minute."})]
+    with pytest.raises(AlphaVantageThrottled):
+        parse_daily_csv("TEST", body)
+
+
+@pytest.mark.parametrize("lines", [[], [""], ["date,price", "2026-01-05,10"]])
+def test_empty_or_unexpected_response_raises(lines):
+    with pytest.raises(ValueError):
+        parse_daily_csv("TEST", lines)
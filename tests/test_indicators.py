@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from indicators import IndicatorEngine, indicator_arrays
+from price_series import DailySeries
+
+
+def simulated_series(count, seed=5):
+    rng = np.random.default_rng(seed)
+    dates = np.busday_offset("2020-01-01", np.arange(count), roll="forward")
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, count)))
+    volume = rng.integers(1_000, 10_000, count).astype(float)
+    return DailySeries("SIM", dates, close, close, close, close, volume)
+
+
+def prefix(series, count):
+    return DailySeries(series.ticker, series.dates[:count], series.open[:count], series.high[:count],
+                       series.low[:count], series.close[:count], series.volume[:count])
+
+
+def assert_same_snapshot(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-9), key
+        else:
+            assert actual[key] == value, key
+
+
+@pytest.mark.parametrize("start, steps", [(20, [1] * 10), (300, [1, 5, 30, 1]), (250, [400])])
+def test_incremental_updates_match_a_full_compute(start, steps):
+    series = simulated_series(start + sum(steps))
+    engine = IndicatorEngine()
+    engine.update(prefix(series, start))
+    count = start
+    for step in steps:
+        count += step
+        incremental = engine.update(prefix(series, count))
+        assert_same_snapshot(incremental, IndicatorEngine().update(prefix(series, count)))
+    stats = engine.stats()
+    assert (stats["full_computes"], stats["incremental_updates"]) == (1, len(steps))
+
+
+def test_snapshot_matches_the_last_row_of_indicator_arrays():
+    series = simulated_series(400)
+    snapshot = IndicatorEngine().update(series)
+    for name, values in indicator_arrays(series).items():
+        assert snapshot[name] == pytest.approx(float(values[-1]), rel=1e-9), name
+
+
+def test_short_history_leaves_long_indicators_empty():
+    snapshot = IndicatorEngine().update(simulated_series(30))
+    assert snapshot["sma_20"] is not None and snapshot["rsi_14"] is not None
+    assert snapshot["sma_50"] is None and snapshot["sma_200"] is None
+    arrays = indicator_arrays(simulated_series(30))
+    assert np.isnan(arrays["sma_50"]).all()
+
+
+def test_unchanged_series_is_reused_and_a_revised_bar_recomputes():
+    series = simulated_series(260)
+    engine = IndicatorEngine()
+    first = engine.update(series)
+    assert engine.update(series) is first
+    revised_close = series.close.copy()
+    revised_close[-1] *= 1.1
+    revised = DailySeries(series.ticker, series.dates, revised_close, revised_close, revised_close,
+                          revised_close, series.volume)
+    assert engine.update(revised)["close"] == pytest.approx(revised_close[-1])
+    stats = engine.stats()
+    assert (stats["reuses"], stats["full_computes"]) == (1, 2)
+
+
+def test_empty_series_has_no_snapshot():
+    assert IndicatorEngine().update(simulated_series(0)) is None
@@ -0,0 +1,89 @@
+import pytest
+
+from intent_rules import IntentClassifier, extract_timeframe, split_tickers
+from ticker_resolver import TickerResolver
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    # The curated aliases only; no listing download, no memo from earlier runs.
+    return TickerResolver(listing_path=str(tmp_path / "listing.csv"), memo_path=str(tmp_path / "memo.json"))
+
+
+@pytest.fixture
+def classifier(resolver):
+    return IntentClassifier(resolver=resolver)
+
+
+@pytest.mark.parametrize("query, timeframe", [
+    ("Why did Tesla drop today?", "today"),
+    ("How has Nvidia done over the last week?", "last week"),
+    ("How has AAPL performed over the past 10 days?", "last 10 days"),
+    ("How has AAPL performed over the last 7 days?", "last week"),
+    ("How has AAPL performed over the last 1 month?", "last month"),
+    ("Microsoft's year to date return", "ytd"),
+    ("How has Microsoft done across every horizon?", "all"),
+    ("What's happening with Palantir recently?", "recently"),
+    ("What is the price of Apple?", None),
+])
+def test_extract_timeframe(query, timeframe):
+    assert extract_timeframe(query) == timeframe
+
+
+@pytest.mark.parametrize("query, intent, ticker", [
+    ("Why did Tesla stock drop today?", "Investigate price drop reason", "TSLA"),
+    ("Did Amazon's price go up last month?", "Analyze price change direction", "AMZN"),
+    ("Has Apple risen this week?", "Analyze price change direction", "AAPL"),
+    ("Any news on AMD?", "Get recent news", "AMD"),
+    ("What is the current price of Apple?", "Get current price", "AAPL"),
+    ("Compare NVDA, AMD and INTC over the last year", "Compare tickers", "NVDA, AMD, INTC"),
+    ("How did KO do versus PEP this year?", "Compare tickers", "KO, PEP"),
+    # A drop or direction question keeps its intent when it mentions another ticker.
+    ("Why did NVDA fall vs AMD today?", "Investigate price drop reason", "NVDA"),
+    ("Did AMD go up against Intel today?", "Analyze price change direction", "AMD"),
+    # Names with "&" or "and" in them stay whole.
+    ("Johnson & Johnson vs Pfizer", "Compare tickers", "JNJ, PFE"),
+    ("AT&T compared to Verizon", "Compare tickers", "T, VZ"),
+])
+def test_classify(classifier, query, intent, ticker):
+    parts = classifier.classify(query)
+    assert parts is not None
+    assert (parts["Intent"], parts["Ticker"]) == (intent, ticker)
+
+
+@pytest.mark.parametrize("query", [
+    "Is Tesla a risky stock?",
+    "Is there any risk in holding Apple?",
+    "The weather in New York.",
+])
+def test_unclear_queries_go_to_the_llm(classifier, query):
+    assert classifier.classify(query) is None
+
+
+def test_comparison_needs_two_tickers(classifier):
+    # "against the market" names one ticker, so the next matching intent applies.
+    parts = classifier.classify("Why did TSLA fall against the market?")
+    assert parts["Intent"] == "Investigate price drop reason"
+
+
+@pytest.mark.parametrize("text, parts", [
+    ("NVDA, AMD and INTC", ["NVDA", "AMD", "INTC"]),
+    ("KO versus PEP", ["KO", "PEP"]),
+    ("KO vs. PEP", ["KO", "PEP"]),
+    ("Johnson & Johnson vs Pfizer", ["Johnson & Johnson", "Pfizer"]),
+    ("Apple and Johnson & Johnson", ["Apple", "Johnson & Johnson"]),
+    ("AT&T/Verizon", ["AT&T", "Verizon"]),
+    ("Compare Apple with Microsoft", ["Compare Apple", "Microsoft"]),
+    # Without "compare", "with" and "to" are ordinary words.
+    ("Apple with Microsoft", ["Apple with Microsoft"]),
+])
+def test_split_tickers(resolver, text, parts):
+    assert split_tickers(text, resolver) == parts
+
+
+def test_stats_count_rule_hits_and_llm_fallbacks(classifier):
+    classifier.classify("Any news on AMD?")
+    classifier.classify("Is Tesla a risky stock?")
+    classifier.record_llm(0.5)
+    stats = classifier.stats()
+    assert (stats["rule_hits"], stats["llm_fallbacks"], stats["mean_llm_seconds"]) == (1, 1, 0.5)
@@ -0,0 +1,135 @@
+import pytest
+import requests
+
+import news_store
+from news_store import NewsStore
+
+
+def article(ticker, minute):
+    published = f"20260105T{9 + minute // 60:02d}{minute % 60:02d}00"
+    return {"url": f"https://news.example/{ticker}/{minute}", "title": f"{ticker} story {minute}",
+            "time_published": published, "ticker_sentiment": [{"ticker": ticker, "relevance_score": "0.9"}]}
+
+
+class FakeFeed:
+    """
+    Answers NEWS_SENTIMENT like Alpha Vantage: newest first, 'time_from' and 'time_to' inclusive at
+    minute resolution, at most 'limit' articles. Requests listed in 'failures' raise instead.
+    """
+
+    def __init__(self, articles):
+        self.articles = sorted(articles, key=lambda item: item["time_published"], reverse=True)
+        self.failures = set()
+        self.requests = 0
+
+    def __call__(self, params):
+        self.requests += 1
+        if self.requests in self.failures:
+            raise requests.exceptions.ConnectionError("connection reset")
+        tickers = params.get("tickers")
+        feed = [item for item in self.articles
+                if (tickers is None or any(entry["ticker"] == tickers for entry in item["ticker_sentiment"]))
+                and item["time_published"][:13] >= params.get("time_from", "")
+                and item["time_published"][:13] <= params.get("time_to", "99999999T9999")]
+        return {"feed": feed[:params["limit"]]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    # recheck_seconds=0: every top-up goes to the (fake) API.
+    store = NewsStore(db_path=str(tmp_path / "news.sqlite3"), recheck_seconds=0, fetch_limit=5)
+    yield store
+    store._conn.close()
+
+
+def stored_minutes(store, ticker):
+    return sorted(int(item["url"].rsplit("/", 1)[1]) for item in store.latest(ticker, n=10_000))
+
+
+def test_first_top_up_fetches_the_latest_articles(store, fake_scheduler):
+    scheduler = fake_scheduler(FakeFeed([article("IBM", minute) for minute in range(20)]))
+    assert store.top_up("ibm") == 5
+    assert stored_minutes(store, "IBM") == list(range(15, 20))
+    assert len(scheduler.calls) == 1 and "time_from" not in scheduler.calls[0]
+
+
+def test_later_top_up_asks_for_news_since_the_newest_stored_article(store, fake_scheduler):
+    feed = FakeFeed([article("IBM", minute) for minute in range(20)])
+    scheduler = fake_scheduler(feed)
+    store.top_up("IBM")
+    feed.articles = FakeFeed([article("IBM", minute) for minute in range(25)]).articles
+    assert store.top_up("IBM") == 5
+    params = scheduler.calls[-1]
+    assert params["time_from"] == "20260105T0919"
+    assert params["limit"] == news_store.MAX_FETCH_LIMIT
+    assert store.stats()["duplicate_articles"] == 1
+
+
+def test_full_pages_are_followed_back_to_the_newest_stored_article(store, fake_scheduler, monkeypatch):
+    monkeypatch.setattr(news_store, "MAX_FETCH_LIMIT", 10)
+    feed = FakeFeed([article("IBM", minute) for minute in range(5)])
+    scheduler = fake_scheduler(feed)
+    store.top_up("IBM")
+    # 40 new articles arrive between top-ups: four full pages' worth plus the stored one.
+    feed.articles = FakeFeed([article("IBM", minute) for minute in range(45)]).articles
+    assert store.top_up("IBM") == 40
+    assert stored_minutes(store, "IBM") == list(range(45))
+    pages = scheduler.calls[1:]
+    assert len(pages) == 5
+    assert "time_to" not in pages[0]
+    assert [page["time_to"] for page in pages[1:]] == ["20260105T0935", "20260105T0926",
+                                                       "20260105T0917", "20260105T0908"]
+    assert store._meta("IBM")[1] == "20260105T094400"
+
+
+def test_a_failed_page_leaves_the_ticker_due_from_the_same_article(store, fake_scheduler, monkeypatch):
+    monkeypatch.setattr(news_store, "MAX_FETCH_LIMIT", 10)
+    feed = FakeFeed([article("IBM", minute) for minute in range(5)])
+    scheduler = fake_scheduler(feed)
+    store.top_up("IBM")
+    feed.articles = FakeFeed([article("IBM", minute) for minute in range(45)]).articles
+    feed.failures = {3}
+    # The first page is stored, the second fails: the stored articles are served, the gap remains.
+    assert store.top_up("IBM") == 10
+    assert store._meta("IBM")[1] == "20260105T090400"
+    # The next top-up asks from the same article again and fills the gap.
+    assert store.top_up("IBM") == 30
+    assert scheduler.calls[-1]["time_from"] == scheduler.calls[1]["time_from"] == "20260105T0904"
+    assert stored_minutes(store, "IBM") == list(range(45))
+
+
+def test_first_top_up_failure_raises(store, fake_scheduler):
+    feed = FakeFeed([])
+    feed.failures = {1}
+    fake_scheduler(feed)
+    with pytest.raises(requests.exceptions.RequestException):
+        store.top_up("IBM")
+
+
+def test_top_up_many_falls_back_for_tickers_the_feed_leaves_a_gap_for(tmp_path, fake_scheduler):
+    store = NewsStore(db_path=str(tmp_path / "news.sqlite3"), recheck_seconds=0, batch_limit=10)
+    feed = FakeFeed([article("IBM", 0), article("AAPL", 30)])
+    scheduler = fake_scheduler(feed)
+    store.top_up("IBM")
+    store.top_up("AAPL")
+    # Newer AAPL articles fill the market-wide page, which reaches back to AAPL's stored article
+    # but not to IBM's.
+    feed.articles = FakeFeed([article("IBM", 0), article("IBM", 10)] +
+                             [article("AAPL", minute) for minute in range(30, 40)]).articles
+    assert store.top_up_many(["IBM", "AAPL"]) == 2
+    batch, fallback = scheduler.calls[2:]
+    assert "tickers" not in batch and batch["time_from"] == "20260105T0900"
+    assert fallback["tickers"] == "IBM"
+    assert stored_minutes(store, "IBM") == [0, 10]
+    stats = store.stats()
+    assert (stats["batch_calls"], stats["fallback_calls"]) == (1, 1)
+    store._conn.close()
+
+
+def test_recently_checked_ticker_is_not_requested(tmp_path, fake_scheduler):
+    store = NewsStore(db_path=str(tmp_path / "news.sqlite3"))
+    scheduler = fake_scheduler(FakeFeed([article("IBM", 0)]))
+    store.top_up("IBM")
+    assert store.top_up("IBM") == 0
+    assert len(scheduler.calls) == 1 and store.stats()["skipped_top_ups"] == 1
+    store._conn.close()
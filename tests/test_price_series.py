@@ -0,0 +1,76 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from price_series import DailySeries, is_supported_window, window_bounds
+
+# Weekday bars from Mon 2025-12-01 to Fri 2026-01-30.
+DATES = np.busday_offset("2025-12-01", np.arange(45), roll="forward")
+
+
+def bounds(window):
+    start, end, valid = window_bounds(DATES, [window])
+    return int(start[0]), int(end[0]), bool(valid[0])
+
+
+def index_of(day):
+    return int(np.searchsorted(DATES, np.datetime64(day)))
+
+
+def test_bar_windows_count_bars_back():
+    assert bounds("1D") == (len(DATES) - 2, len(DATES) - 1, True)
+    assert bounds("5D") == (len(DATES) - 6, len(DATES) - 1, True)
+
+
+def test_calendar_windows_start_on_the_last_bar_on_or_before_the_target():
+    # 2026-01-30 minus 7 days is Fri 2026-01-23, a bar; minus 30 days is Wed 2025-12-31.
+    assert bounds("1W")[0] == index_of("2026-01-23")
+    assert bounds("last month")[0] == index_of("2025-12-31")
+    # "last 8 days" targets Thu 2026-01-22.
+    assert bounds("last 8 days")[0] == index_of("2026-01-22")
+
+
+def test_target_on_a_weekend_snaps_back_to_friday():
+    # 2026-01-30 minus 13 days is Sat 2026-01-17.
+    assert bounds("last 13 days")[0] == index_of("2026-01-16")
+
+
+def test_ytd_starts_on_the_last_bar_of_the_previous_year():
+    assert bounds("YTD")[0] == index_of("2025-12-31")
+
+
+def test_explicit_range_snaps_both_ends():
+    # Sat 2026-01-10 -> Fri 2026-01-09; Sun 2026-01-18 -> Fri 2026-01-16.
+    start, end, valid = bounds((date(2026, 1, 10), "2026-01-18"))
+    assert (start, end, valid) == (index_of("2026-01-09"), index_of("2026-01-16"), True)
+
+
+def test_windows_the_dates_dont_cover_are_invalid():
+    assert not bounds("1Y")[2]
+    assert not bounds(("2020-01-01", "2020-02-01"))[2]
+
+
+def test_many_windows_in_one_call():
+    windows = ["1D", "1W", "YTD", ("2025-12-01", "2025-12-31")]
+    start, end, valid = window_bounds(DATES, windows)
+    assert list(start) == [bounds(window)[0] for window in windows]
+    assert list(end) == [bounds(window)[1] for window in windows]
+    assert valid.all()
+
+
+def test_unsupported_window_raises():
+    with pytest.raises(ValueError):
+        window_bounds(DATES, ["fortnight"])
+    assert not is_supported_window("fortnight")
+    assert is_supported_window("3M")
+
+
+def test_returns_accept_a_list_range():
+    closes = np.arange(1.0, len(DATES) + 1)
+    series = DailySeries("TEST", DATES, closes, closes, closes, closes, np.ones(len(DATES)))
+    results = series.returns([["2025-12-01", "2025-12-31"], "1D"])
+    assert set(results) == {("2025-12-01", "2025-12-31"), "1D"}
+    result = results[("2025-12-01", "2025-12-31")]
+    assert (result["start_price"], result["end_price"]) == (1.0, closes[index_of("2025-12-31")])
+    assert results["1D"]["change"] == 1.0
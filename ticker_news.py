@@ -1,5 +1,6 @@
-import requests  # Import the requests library for making HTTP requests to web APIs.
-import os  # Import the os module to interact with the operating system, specifically for environment variables.
+import requests  # Import the requests library for its exception types.
+from news_store import get_news_store  # Import the local, incrementally topped-up news store.
+from tracing import record_error, traced  # Import the per-stage spans and metrics.
 
 # Import the 'identify_ticker' module and the 'ticker_identify' function from it.
 # This import is present in your provided code, but for the 'ticker_news_agent'
@@ -8,13 +9,6 @@ import os  # Import the os module to interact with the operating system, specifi
 import identify_ticker
 from identify_ticker import ticker_identify
 
-# Retrieve the Alpha Vantage API key from environment variables.
-# It's crucial for authenticating requests to the Alpha Vantage API.
-ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY")
-# If the API key is not found, raise a ValueError to stop execution and inform the user.
-if not ALPHA_VANTAGE_API_KEY:
-    raise ValueError("Alpha Vantage API key not found in environment variables.")
-
 
 # Define the ticker_news_agent function.
 # Objective: Retrieves recent news articles related to a given stock ticker.
@@ -24,64 +18,59 @@ if not ALPHA_VANTAGE_API_KEY:
 # Returns:
 #   list of dict: A list of dictionaries, each representing a news article with details like title, URL, source, summary, and sentiment.
 #   None: If an error occurs during the API call, no news is found, or the response is invalid.
+@traced()
 def ticker_news_agent(ticker, max_articles=5):
-    # Define the base URL for the Alpha Vantage API.
-    base_url = "https://www.alphavantage.co/query"
-
-    # Define the parameters for the API request.
-    # "function": "NEWS_SENTIMENT" specifies the desired API endpoint for news and sentiment data.
-    # "tickers": ticker passes the stock symbol for which news is requested.
-    # "apikey": ALPHA_VANTAGE_API_KEY includes the authentication key.
-    # "limit": max_articles controls the number of news items returned.
-    params = {
-        "function": "NEWS_SENTIMENT",
-        "tickers": ticker,
-        "apikey": ALPHA_VANTAGE_API_KEY,
-        "limit": max_articles  # Limit the number of results to keep output concise.
-    }
-
     try:
-        # Send an HTTP GET request to the Alpha Vantage API with the defined parameters.
-        response = requests.get(base_url, params=params)
-
-        # Raise an HTTPError for bad responses (4xx or 5xx status codes).
-        # This helps in immediately identifying issues like rate limits, invalid keys, etc.
-        response.raise_for_status()
-
-        # Parse the JSON response from the API into a Python dictionary.
-        data = response.json()
+        # Bring the local news store up to date. It only requests "NEWS_SENTIMENT" articles
+        # published since the newest stored one (and nothing at all if the ticker was checked a
+        # few minutes ago), through the scheduler and the shared Alpha Vantage client.
+        # The client retries transient failures and raises for bad responses (4xx or 5xx status
+        # codes) and for rate-limit notes, so those are no longer mistaken for "no news".
+        store = get_news_store()
+        store.top_up(ticker)
 
-        # Check if the "feed" key exists in the response.
-        # The "feed" key contains the list of news articles.
-        if "feed" in data:
-            news_articles = []  # Initialize an empty list to store processed news articles.
-            # Iterate through each news item in the "feed".
-            for item in data["feed"]:
-                # Append a dictionary for each article, extracting relevant fields.
-                # .get() is used for safe access, returning None if a key doesn't exist,
-                # preventing KeyError. For sentiment, it handles nested dictionaries.
-                news_articles.append({
-                    "title": item.get("title"),
-                    "url": item.get("url"),
-                    "source": item.get("source"),
-                    "summary": item.get("summary"),
-                    "sentiment_label": item.get("sentiment", {}).get("label"),  # Access nested sentiment label
-                    "sentiment_score": item.get("sentiment", {}).get("score")  # Access nested sentiment score
-                })
-            return news_articles  # Return the list of extracted news articles.
+        # Read the most recent articles from the store. Each article is a dictionary with the
+        # title, url, source, summary, time_published, the article's relevance to the ticker and
+        # the ticker-specific sentiment label and score (from the feed's 'ticker_sentiment').
+        news_articles = store.latest(ticker, n=max_articles)
+        if news_articles:
+            return news_articles  # Return the list of stored news articles.
         else:
-            # If "feed" key is not found, it means no news was returned for the ticker.
+            # Nothing stored for this ticker: no news was returned for it.
             print(f"No news found for ticker: {ticker}")
             return None  # Return None to indicate no news was found.
 
     except requests.exceptions.RequestException as e:
         # Catch any request-related errors (e.g., network issues, invalid URL, HTTP errors).
         print(f"Error fetching news for {ticker}: {e}")
+        record_error(e)
         return None  # Return None on request failure.
     except ValueError as e:
-        # Catch errors that occur if the API response is not valid JSON.
-        print(f"Error decoding JSON response for {ticker}: {e}")
-        return None  # Return None on JSON decoding failure.
+        # Catch API error payloads and responses that are not valid JSON.
+        print(f"Error reading news response for {ticker}: {e}")
+        record_error(e)
+        return None  # Return None on an invalid response.
+
+# Define the ticker_news_batch function.
+# Objective: Retrieves recent news for several tickers (e.g. a watchlist) with as few API calls as possible.
+# One market-wide "NEWS_SENTIMENT" request is split per ticker using each article's 'ticker_sentiment'
+# entries; only tickers that feed doesn't cover get a request of their own (see NewsStore.top_up_many).
+# Args:
+#   tickers (list of str): The stock ticker symbols.
+#   max_articles (int, optional): The maximum number of news articles per ticker. Defaults to 5.
+# Returns:
+#   dict: Maps each upper-cased ticker to its list of articles (as returned by ticker_news_agent),
+#   or to None if no news was found for it.
+@traced()
+def ticker_news_batch(tickers, max_articles=5):
+    store = get_news_store()
+    # Per-ticker failures are reported by the store; the batch still returns what it has.
+    store.top_up_many(tickers, min_articles=max_articles)
+    results = {}
+    for ticker in dict.fromkeys(t.upper() for t in tickers):
+        results[ticker] = store.latest(ticker, n=max_articles) or None
+    return results
+
 
 # if __name__ == "__main__":
 #     # stock_ticker = "AAPL"
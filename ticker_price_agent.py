@@ -1,11 +1,8 @@
 import requests
-import os
+from quote_cache import get_quote
 import identify_ticker
 from identify_ticker import ticker_identify
 
-ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY")
-if not ALPHA_VANTAGE_API_KEY:
-    raise ValueError("Alpha Vantage API key not found in environment variables.")
 def ticker_price_agent(ticker):
     """
     Fetches the current price of a given stock ticker using the Alpha Vantage API.
@@ -17,48 +14,18 @@ def ticker_price_agent(ticker):
         float: The current stock price, or None if the price cannot be retrieved
                due to an API error, invalid ticker, or missing data.
     """
-    base_url = "https://www.alphavantage.co/query"
-    params = {
-        "function": "GLOBAL_QUOTE",
-        "symbol": ticker,
-        "apikey": ALPHA_VANTAGE_API_KEY
-    }
-
     try:
-        # Make the API request
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
-
-        # Parse the JSON response
-        data = response.json()
-
-        # Alpha Vantage returns an empty "Global Quote" if the symbol is invalid or no data
-        if "Global Quote" in data and data["Global Quote"]:
-            global_quote = data["Global Quote"]
-            # The current price is typically under the key "05. price"
-            if "05. price" in global_quote:
-                price_str = global_quote["05. price"]
-                try:
-                    current_price = float(price_str)
-                    return current_price
-                except ValueError:
-                    print(f"Error: Could not convert price '{price_str}' to float for {ticker}.")
-                    return None
-            else:
-                print(f"Warning: '05. price' not found in Global Quote for {ticker}.")
-                return None
-        elif "Error Message" in data:
-            print(f"Alpha Vantage API Error for {ticker}: {data['Error Message']}")
-            return None
-        else:
-            print(f"No 'Global Quote' data found for ticker: {ticker}. Response: {data}")
-            return None
+        # Get the quote through the shared quote cache (a fresh 'GLOBAL_QUOTE' request only when
+        # the cached quote has expired). Raises for network/HTTP errors and for responses without
+        # a usable quote, e.g. {"Error Message": ...} for an invalid symbol.
+        quote = get_quote(ticker)
+        return quote.price
 
     except requests.exceptions.RequestException as e:
         print(f"Network or API request error for {ticker}: {e}")
         return None
-    except ValueError as e: # For JSON decoding errors
-        print(f"Error decoding JSON response for {ticker}: {e}")
+    except ValueError as e: # For JSON decoding errors and missing or invalid quote data
+        print(f"Error retrieving quote for {ticker}: {e}")
         return None
     except Exception as e: # Catch any other unexpected errors
         print(f"An unexpected error occurred for {ticker}: {e}")
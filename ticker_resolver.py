@@ -0,0 +1,311 @@
+import csv  # For reading the symbol listing and alias files.
+import difflib  # For fuzzy company-name matching.
+import io  # For parsing the downloaded listing in memory.
+import json  # For the on-disk memo of LLM resolutions.
+import os  # For file paths.
+import re  # For tokenizing queries and recognising ticker symbols.
+import threading  # Protects the memo tables when agents run in threads.
+import time  # For latency measurements.
+from collections import OrderedDict  # LRU memo of recent resolutions.
+
+from storage import cache_path  # Resolves where locally persisted data lives.
+
+# Curated aliases (common names, brands, former names) shipped with the repository.
+ALIASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ticker_aliases.csv")
+# Alpha Vantage LISTING_STATUS export (symbol, name, exchange, assetType, ...). Download it with
+# refresh_listing(); without it the resolver works from the aliases alone.
+LISTING_FILENAME = "listing_status.csv"
+MEMO_FILENAME = "ticker_memo.json"
+
+# Words dropped from the end of company names so "Apple Inc" and "Apple" match.
+_NAME_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "llc", "lp",
+    "sa", "ag", "nv", "se", "holdings", "holding", "group", "class", "a", "b", "c", "common", "stock",
+    "shares", "ordinary", "adr", "the", "new",
+}
+# Upper-case words in queries that look like symbols but almost never mean one.
+_NOT_TICKERS = {"CEO", "CFO", "USA", "US", "ETF", "IPO", "EPS", "AI", "API", "GDP", "FED", "SEC", "NYSE",
+                "EST", "PM", "AM", "OK", "YTD", "TV", "EV", "UK", "EU"}
+# A whole query that is just a symbol, e.g. "AAPL", "$TSLA", "BRK.A".
+_SYMBOL = re.compile(r"^\$?([A-Za-z]{1,5}(?:\.[A-Za-z])?)$")
+# Symbols written in upper case inside a longer query, e.g. "What's the latest on AAPL?".
+_UPPER_SYMBOL = re.compile(r"(?<![\w.])\$?([A-Z]{2,5}(?:\.[A-Z])?)(?![\w.])")
+_MAX_NGRAM = 5
+
+
+def _tokens(text):
+    # Lower-case word tokens, with possessives removed and "&" spelled out.
+    text = text.lower().replace("’", "'").replace("'s", "")
+    return ["and" if token == "&" else token for token in re.findall(r"[a-z0-9]+(?:&[a-z0-9]+)*|&", text)]
+
+
+def normalize_name(name):
+    """
+    Normalizes a company name or alias for lookup, e.g. "Alphabet Inc - Class A" -> "alphabet".
+    """
+    tokens = _tokens(name)
+    while len(tokens) > 1 and tokens[-1] in _NAME_SUFFIXES:
+        tokens.pop()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens.pop(0)
+    return " ".join(tokens)
+
+
+class TickerResolver:
+    """
+    Resolves company names and symbols to tickers locally, so most lookups never reach the LLM.
+
+    Resolution order:
+        1. The memo of earlier resolutions (in-memory LRU, plus LLM answers persisted on disk).
+        2. An exact symbol ("AAPL", "$TSLA", or an upper-case symbol inside a longer query).
+        3. A company name or alias, for the whole query or any phrase in it.
+        4. A fuzzy match of a short query against the company names and aliases.
+
+    Args:
+        listing_path (str, optional): Symbol listing CSV (Alpha Vantage LISTING_STATUS format).
+            Defaults to 'listing_status.csv' in the local data directory; optional.
+        aliases_path (str, optional): Alias CSV with 'alias' and 'symbol' columns.
+        memo_path (str, optional): JSON file for memoized LLM resolutions.
+        memo_size (int, optional): Number of recent resolutions kept in memory.
+        fuzzy_cutoff (float, optional): Minimum similarity (0-1) for a fuzzy name match.
+    """
+
+    def __init__(self, listing_path=None, aliases_path=ALIASES_FILE, memo_path=None, memo_size=1024,
+                 fuzzy_cutoff=0.88):
+        self.listing_path = listing_path or cache_path(LISTING_FILENAME)
+        self.aliases_path = aliases_path
+        self.memo_path = memo_path or cache_path(MEMO_FILENAME)
+        self.memo_size = memo_size
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self._llm_memo = {}
+        self._symbols = set()
+        self._aliases = {}  # Normalized alias -> symbol (curated; always trusted).
+        self._names = {}  # Normalized listing name -> symbol.
+        self._fuzzy_candidates = []
+        self._load()
+        # Counters exposed through stats().
+        self.lookups = 0
+        self.sources = {"memo": 0, "symbol": 0, "alias": 0, "name": 0, "fuzzy": 0}
+        self.local_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def resolve(self, query):
+        """
+        Returns the ticker for a query or company name, or None if it can't be resolved locally.
+        """
+        return self.lookup(query)[0]
+
+    def lookup(self, query):
+        """
+        Resolves a query locally.
+
+        Returns:
+            tuple: (ticker, source), where source is "memo", "symbol", "alias", "name" or "fuzzy";
+            (None, None) if the query could not be resolved without the LLM.
+        """
+        started = time.perf_counter()
+        key = query.strip()
+        with self._lock:
+            self.lookups += 1
+            ticker = self._recent.get(key) or self._llm_memo.get(normalize_name(key))
+            if ticker:
+                self._remember_recent(key, ticker)
+        source = "memo" if ticker else None
+        if not ticker:
+            ticker, source = self._resolve_uncached(key)
+        with self._lock:
+            if ticker:
+                self.sources[source] += 1
+                self._remember_recent(key, ticker)
+            self.local_seconds += time.perf_counter() - started
+        return ticker, source
+
+    def remember(self, query, ticker, llm_seconds=None):
+        """
+        Records an LLM resolution so the same query is answered locally next time (also after a restart).
+
+        Args:
+            query (str): The query the LLM resolved.
+            ticker (str): The ticker the LLM returned.
+            llm_seconds (float, optional): How long the LLM call took, for stats().
+        """
+        with self._lock:
+            self._remember_recent(query.strip(), ticker)
+            self._llm_memo[normalize_name(query)] = ticker
+            memo = dict(self._llm_memo)
+        self.record_llm_call(llm_seconds)
+        # Write the whole memo atomically so a crash never leaves a truncated file.
+        temporary = self.memo_path + ".tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(memo, f)
+            os.replace(temporary, self.memo_path)
+        except OSError as e:
+            print(f"Could not save ticker memo to {self.memo_path}: {e}")
+
+    def record_llm_call(self, llm_seconds=None):
+        # Count an LLM fallback (remember() does this for successful ones).
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += llm_seconds or 0.0
+
+    def stats(self):
+        """
+        Returns the resolver's counters: lookups, local resolutions by source, LLM fallbacks and
+        the mean latency of local lookups and LLM calls.
+        """
+        with self._lock:
+            local = sum(self.sources.values())
+            return {
+                "lookups": self.lookups,
+                "resolved_locally": local,
+                "by_source": dict(self.sources),
+                "llm_calls": self.llm_calls,
+                "llm_call_rate": self.llm_calls / self.lookups if self.lookups else 0.0,
+                "mean_local_seconds": self.local_seconds / self.lookups if self.lookups else 0.0,
+                "mean_llm_seconds": self.llm_seconds / self.llm_calls if self.llm_calls else 0.0,
+            }
+
+    def reload(self):
+        """
+        Re-reads the listing, alias and memo files (e.g. after refresh_listing()).
+        """
+        self._load()
+
+    def _resolve_uncached(self, query):
+        # 2. An exact symbol. A lower-case query like "ford" is tried as a name first (FORD is a
+        # different company than Ford, F).
+        match = _SYMBOL.match(query)
+        symbol = match.group(1).upper() if match else None
+        if symbol in self._symbols and (query.isupper() or query.startswith("$")):
+            return symbol, "symbol"
+        for candidate in _UPPER_SYMBOL.findall(query):
+            if candidate in self._symbols and candidate not in _NOT_TICKERS:
+                return candidate, "symbol"
+
+        # 3. A company name or alias: the whole query first, then phrases, longest first.
+        tokens = _tokens(query)
+        normalized = normalize_name(query)
+        if normalized in self._aliases:
+            return self._aliases[normalized], "alias"
+        if normalized in self._names:
+            return self._names[normalized], "name"
+        for size in range(min(_MAX_NGRAM, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                phrase = " ".join(tokens[start:start + size])
+                if phrase in self._aliases:
+                    return self._aliases[phrase], "alias"
+                # One-word listing names ("News", "Target") are too easily confused with ordinary
+                # words inside a sentence, so only multi-word names are matched inside a query.
+                if size > 1 and phrase in self._names:
+                    return self._names[phrase], "name"
+        if symbol in self._symbols:
+            return symbol, "symbol"
+
+        # 4. A fuzzy match, only for short queries that look like a bare company name.
+        if 0 < len(tokens) <= 4:
+            close = difflib.get_close_matches(normalized, self._fuzzy_candidates, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                return self._aliases.get(close[0]) or self._names[close[0]], "fuzzy"
+        return None, None
+
+    def _remember_recent(self, key, ticker):
+        # Caller holds self._lock.
+        self._recent[key] = ticker
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.memo_size:
+            self._recent.popitem(last=False)
+
+    def _load(self):
+        symbols, aliases, names = set(), {}, {}
+        if self.aliases_path and os.path.exists(self.aliases_path):
+            with open(self.aliases_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    aliases[normalize_name(row["alias"])] = row["symbol"].upper()
+                    symbols.add(row["symbol"].upper())
+        if os.path.exists(self.listing_path):
+            with open(self.listing_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if row.get("status", "Active") != "Active":
+                        continue
+                    symbol = row["symbol"].upper()
+                    symbols.add(symbol)
+                    # Keep the first listing for a name (e.g. GOOG and GOOGL both normalize to
+                    # "alphabet"); aliases decide between share classes.
+                    names.setdefault(normalize_name(row.get("name") or ""), symbol)
+        names.pop("", None)
+        memo = {}
+        if os.path.exists(self.memo_path):
+            try:
+                with open(self.memo_path, encoding="utf-8") as f:
+                    memo = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable ticker memo {self.memo_path}: {e}")
+        with self._lock:
+            self._symbols, self._aliases, self._names, self._llm_memo = symbols, aliases, names, memo
+            self._fuzzy_candidates = list(aliases) + [name for name in names if name not in aliases]
+            self._recent.clear()
+
+
+def refresh_listing(path=None):
+    """
+    Downloads the current Alpha Vantage LISTING_STATUS (active US stocks and ETFs) to the listing
+    file and reloads the shared resolver.
+
+    Returns:
+        int: The number of listings downloaded.
+    """
+    from av_scheduler import get_scheduler  # Imported here so the resolver itself needs no HTTP stack.
+
+    path = path or cache_path(LISTING_FILENAME)
+    response = get_scheduler().get({"function": "LISTING_STATUS"})
+    text = response.text
+    rows = list(csv.DictReader(io.StringIO(text)))
+    if not rows or "symbol" not in rows[0]:
+        raise ValueError(f"Unexpected LISTING_STATUS response: {text[:200]}")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    if _resolver is not None:
+        _resolver.reload()
+    return len(rows)
+
+
+# The process-wide resolver, created on first use.
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """
+    Returns the shared TickerResolver, creating it on first use.
+    """
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = TickerResolver()
+        return _resolver
+
+
+if __name__ == "__main__":
+    # Report local resolution rate and latency for a set of typical queries. Before the resolver,
+    # every one of them was a Gemini round-trip.
+    queries = [
+        "AAPL", "TSLA", "$NVDA", "Apple", "Tesla", "Google", "Microsoft", "Nvidia", "Amazon",
+        "What's the latest on Microsoft?", "Tell me about Tesla stock.", "What about Google?",
+        "How has Apple performed this week?", "Something about General Electric.",
+        "Talk about Berkshire Hathaway class B shares.", "Any news on AMD today?",
+        "Why did Palantir drop?", "Price of Coca-Cola?", "Nvidea", "The weather in New York.",
+    ]
+    import tempfile
+
+    resolver = TickerResolver(memo_path=os.path.join(tempfile.mkdtemp(), MEMO_FILENAME))
+    for query in queries:
+        ticker, source = resolver.lookup(query)
+        print(f"{query!r:55} -> {ticker or '(LLM fallback)':8} {source or ''}")
+    stats = resolver.stats()
+    print(f"\nResolved locally: {stats['resolved_locally']}/{stats['lookups']} | "
+          f"mean local latency {stats['mean_local_seconds'] * 1e6:.0f} us | "
+          f"LLM calls per query: before 1.00, after {1 - stats['resolved_locally'] / stats['lookups']:.2f}")
@@ -1,80 +1,137 @@
-import google.generativeai as genai # Import the Google Generative AI library for interacting with language models.
-import os # Import the os module for accessing environment variables (like API keys).
 from datetime import datetime # Import the datetime class for working with dates and times (though not directly used in this function).
 from ticker_news import ticker_news_agent # Import the function to fetch news articles for a given ticker.
 from tickerchange import tickerpricechange # Import the function to fetch the price change for a given ticker over a timeframe.
+from providers import get_model # Import the shared Gemini model, created on first use.
+from analysis_cache import fingerprint, get_analysis_cache # Import the persistent cache of generated analyses.
+from prompt_builder import get_prompt_builder # Import the builder that keeps the prompt within a token budget.
+from indicators import technical_summary # Import the technical indicators computed from the stored daily bars.
+from intraday import intraday_summary # Import the summary of today's intraday bars (VWAP, range, largest moves).
+from tracing import record_error, span, traced # Import the per-stage spans and metrics.
 
-# Configure the Generative AI library with the API key stored in the 'GEMINI_API_KEY' environment variable.
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-
-# Specify the name of the Gemini model to be used for analysis.
-model_name = "models/gemini-1.5-flash-latest"
-# Initialize the GenerativeModel with the specified model name.
-model = genai.GenerativeModel(model_name)
+# Version of the analysis prompt. It is part of every cache key, so bump it whenever the prompt
+# changes and analyses generated from the old prompt are no longer reused.
+PROMPT_VERSION = 4
 
 # Define the 'tickeranalysis' function, which takes a stock ticker and an optional timeframe as input.
 # It aims to analyze the reasons behind recent stock price movements.
-def tickeranalysis(ticker, timeframe="today"):
-    # Fetch recent news articles for the given ticker, limiting the number of articles to 5.
-    news = ticker_news_agent(ticker, max_articles=5)
-    # Fetch the price change for the given ticker over the specified timeframe.
-    price_change = tickerpricechange(ticker, timeframe=timeframe)
-
+# Callers that already fetched the news (from ticker_news_agent), the price change (from
+# tickerpricechange), the technical indicators (from indicators.technical_summary) or the intraday
+# summary (from intraday.intraday_summary, used for "today") can pass them in through 'news',
+# 'price_change', 'technicals' and 'intraday' to avoid fetching them again.
+@traced()
+def tickeranalysis(ticker, timeframe="today", news=None, price_change=None, technicals=None, intraday=None):
+    # Fetch whatever news and price change data the caller didn't supply.
+    news, price_change = _analysis_inputs(ticker, timeframe, news, price_change)
     # Check if either news data or price change data could not be retrieved.
     if news is None or price_change is None:
         print(f"Insufficient data to analyze {ticker} for {timeframe}.")
         return None # Return None if there's not enough data for analysis.
 
-    # Extract the titles of the news articles into a list.
-    newshead = [article.get("title") for article in news if article.get("title")]
-    # Create a list of strings containing the news title along with its sentiment label and score (if available).
-    news_sentiment = [
-        f"{article.get('title')} (Sentiment: {article.get('sentiment_label')}, Score: {article.get('sentiment_score')})"
-        for article in news if article.get('title')]
-
-    # Define a detailed prompt for the language model to perform the stock analysis.
-    prompt = f"""You are a senior financial analyst tasked with providing a detailed explanation of the recent price movements
-  of the stock with ticker '{ticker}' over the last {timeframe}. Your analysis should integrate recent news,
-  price changes, and potential market factors.
-
-  **1. Price and Volume Context:**
-  Briefly state the observed price change: '{price_change}'. If available in the `ticker_price_change_agent` output (consider adding volume data if the API provides it), also mention any significant changes in trading volume during this period.
-
-  **2. Recent News Analysis:**
-  Review the following recent news items related to '{ticker}':
-  News:
-  {chr(10).join(news_sentiment) if news_sentiment else 'No significant news found.'}
+    # Technical indicators from the locally stored daily bars (None if they can't be loaded).
+    if technicals is None:
+        technicals = technical_summary(ticker)
+    # For "today", when during the session the price moved, so the news can be lined up with it.
+    intraday = _session_intraday(ticker, timeframe, intraday)
 
-  For each significant news item, consider its potential impact on the stock price. Note the sentiment (positive, negative, neutral) and the source's credibility if possible.
+    # Reuse the analysis generated earlier from exactly these inputs (same ticker, timeframe,
+    # price change, articles, indicators, intraday bars and prompt version), if it hasn't expired.
+    cache = get_analysis_cache()
+    key = fingerprint(ticker, timeframe, price_change, news, PROMPT_VERSION, technicals, intraday)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
 
-  **3. Correlation and Causation:**
-  Analyze the relationship between the observed price change and the recent news. Are there any apparent correlations? Discuss potential causal links, being careful not to assume direct causation without strong evidence. Consider:
-  - Did positive news coincide with price increases?
-  - Did negative news coincide with price decreases?
-  - Were there any major news events without a corresponding price reaction, and why might that be?
-
-  **4. Broader Market Context (If Applicable):**
-  If you have access to information about broader market trends or sector-specific news during this period (you might need to fetch this with another agent in a more advanced system), briefly consider if these factors might have influenced the stock's movement independently of company-specific news.
-
-  **5. Summary of Key Drivers:**
-  Based on your analysis, provide a detailed summary of the most likely reasons behind the observed price movement. Prioritize the most significant factors and explain your reasoning. If the price movement seems uncorrelated with the available news, state this and suggest potential reasons (e.g., broader market forces, technical trading, information not yet publicly available).
-
-  **Example of a more detailed analysis point:**
-  "The stock experienced a significant increase of X% over the last {timeframe}. This coincided with the release of a highly positive earnings report on [Date], which highlighted strong revenue growth and increased profitability. Analyst upgrades following this report further fueled positive sentiment. However, a negative article from [Source] regarding potential regulatory challenges emerged mid-week, which may have tempered some of the gains."
-
-  Your detailed analysis summary:"""
+    # Build the detailed analysis prompt from the price change, the indicators and the news.
+    prompt = _analysis_prompt(ticker, timeframe, news, price_change, technicals, intraday)
 
     try:
         # Send the detailed prompt to the language model to generate the analysis.
-        response = model.generate_content(prompt)
+        with span("gemini", purpose="analysis"):
+            response = get_model().generate_content(prompt)
         # Return the generated text analysis, removing any leading or trailing whitespace.
-        return response.text.strip()
+        analysis = response.text.strip()
+        cache.put(key, analysis, ticker, timeframe)
+        return analysis
     except Exception as e:
         # If any error occurs during the analysis process with the language model,
         # print the error message for debugging and return None.
         print(f"Error during analysis for {ticker} ({timeframe}): {e}")
+        record_error(e)
         return None
 
+
+# Streaming version of 'tickeranalysis': a generator that yields the answer piece by piece.
+# The price change and headlines are yielded first, as soon as they are available, so the user has
+# the facts while Gemini is still writing; the analysis then follows chunk by chunk as Gemini
+# generates it. Yields nothing (after printing why) if there isn't enough data to analyze.
+@traced()
+def tickeranalysis_stream(ticker, timeframe="today", news=None, price_change=None, technicals=None, intraday=None):
+    news, price_change = _analysis_inputs(ticker, timeframe, news, price_change)
+    if news is None or price_change is None:
+        print(f"Insufficient data to analyze {ticker} for {timeframe}.")
+        return
+
+    # The facts don't depend on the LLM, so they go out before the request is even sent.
+    headlines = [f"- {article['title']}" for article in news if article.get("title")]
+    yield f"Price change for {ticker} ({timeframe}): {price_change}\n"
+    if headlines:
+        yield "Recent headlines:\n" + "\n".join(headlines) + "\n"
+    yield "\n"
+
+    # A cached analysis of the same inputs is sent in one piece.
+    if technicals is None:
+        technicals = technical_summary(ticker)
+    intraday = _session_intraday(ticker, timeframe, intraday)
+    cache = get_analysis_cache()
+    key = fingerprint(ticker, timeframe, price_change, news, PROMPT_VERSION, technicals, intraday)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    prompt = _analysis_prompt(ticker, timeframe, news, price_change, technicals, intraday)
+    try:
+        # With stream=True Gemini returns the response in chunks as they are generated.
+        chunks = []
+        for chunk in get_model().generate_content(prompt, stream=True):
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        # Only a complete analysis is cached.
+        cache.put(key, "".join(chunks).strip(), ticker, timeframe)
+    except Exception as e:
+        # Same handling as tickeranalysis: report the error and end the stream.
+        print(f"Error during analysis for {ticker} ({timeframe}): {e}")
+        record_error(e)
+
+
+# Fetch the inputs of the analysis that the caller didn't pass in. Returns (news, price_change);
+# either may be None if it couldn't be retrieved.
+def _analysis_inputs(ticker, timeframe, news, price_change):
+    # Fetch recent news articles for the given ticker, limiting the number of articles to 5.
+    if news is None:
+        news = ticker_news_agent(ticker, max_articles=5)
+    # Fetch the price change for the given ticker over the specified timeframe.
+    if price_change is None:
+        price_change = tickerpricechange(ticker, timeframe=timeframe)
+    return news, price_change
+
+
+# The intraday summary is only about the current session, so it is fetched (unless the caller
+# passed it in) for "today" only.
+def _session_intraday(ticker, timeframe, intraday):
+    if intraday is None and timeframe.lower() == "today":
+        intraday = intraday_summary(ticker)
+    return intraday
+
+
+# Build the analysis prompt for Gemini from the news articles, the price change, the technical
+# indicators and the intraday summary. The prompt builder keeps it within a token budget: duplicate headlines are dropped,
+# the most relevant and strongly-moving articles go first, and summaries are shortened to fit.
+def _analysis_prompt(ticker, timeframe, news, price_change, technicals=None, intraday=None):
+    return get_prompt_builder().build(ticker, timeframe, news, price_change, technicals, intraday)
+
+
 # if __name__ == "__main__":
 #     ticker = "TSLA"
 #     timeframe_today = "today"
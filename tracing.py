@@ -0,0 +1,317 @@
+import contextvars  # The current span follows each query, including into QueryContext worker threads.
+import functools  # For the traced() decorator.
+import inspect  # To tell generator functions (streamed answers) apart in traced().
+import json  # For the JSON export.
+import logging  # Finished query traces are logged at DEBUG level.
+import threading  # Protects spans and metrics shared between threads.
+import time  # For span timings.
+from collections import deque  # Keeps the most recent query traces.
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported metric name.
+METRIC_PREFIX = "stock_analysis_"
+
+# Upper bounds (in seconds) of the stage duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Number of finished query traces kept for recent_traces().
+RECENT_TRACES = 100
+
+# The span of the stage currently running in this context (None outside any span).
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# One lock for span trees: spans are tiny and contention is low.
+_span_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed stage of a query: its name, attributes (upstream function, cache results, bytes,
+    retries, ...), duration, error and child stages.
+    """
+
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = dict(attrs)
+        self.children = []
+        self.error = None
+        self.started = time.perf_counter()
+        self.start_time = time.time()
+        self.duration = None
+
+    def to_dict(self):
+        """
+        Returns the span and its children as plain data, e.g. for JSON.
+        """
+        with _span_lock:
+            children = list(self.children)
+            attrs = dict(self.attrs)
+        span = {"name": self.name, "start": self.start_time,
+                "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None}
+        if attrs:
+            span["attrs"] = attrs
+        if self.error:
+            span["error"] = self.error
+        if children:
+            span["children"] = [child.to_dict() for child in children]
+        return span
+
+    def format(self, indent=0):
+        """
+        Returns the span tree as indented text, one stage per line.
+        """
+        duration = f"{self.duration * 1000:.1f} ms" if self.duration is not None else "running"
+        attrs = " ".join(f"{key}={value:.3g}" if isinstance(value, float) else f"{key}={value}"
+                         for key, value in self.attrs.items())
+        line = f"{'  ' * indent}{self.name} {duration}" + (f" [{attrs}]" if attrs else "") + \
+            (f" ERROR: {self.error}" if self.error else "")
+        return "\n".join([line] + [child.format(indent + 1) for child in list(self.children)])
+
+
+class Metrics:
+    """
+    Aggregate counters and histograms across all queries, exportable as JSON or in the Prometheus
+    text format. Metrics are identified by a name plus labels, e.g.
+    inc("cache_requests_total", cache="quote", result="hit").
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """
+        Returns all metrics as plain data: counters as {name: [{labels, value}]} and histograms
+        as {name: [{labels, count, sum, buckets: {le: cumulative count}}]}.
+        """
+        with self._lock:
+            counters, histograms = dict(self._counters), {key: list(value) for key, value in self._histograms.items()}
+        snapshot = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            snapshot["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in sorted(histograms.items()):
+            snapshot["histograms"].setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": histogram[-1],
+                "sum": histogram[-2],
+                "buckets": {str(bound): count for bound, count in zip(self.buckets, histogram)},
+            })
+        return snapshot
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in snapshot["counters"].items():
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+            for item in series:
+                lines.append(f"{METRIC_PREFIX}{name}{_labels(item['labels'])} {item['value']}")
+        for name, series in snapshot["histograms"].items():
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+            for item in series:
+                for bound, count in item["buckets"].items():
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_labels(item['labels'], le=bound)} {count}")
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_labels(item['labels'], le='+Inf')} {item['count']}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{_labels(item['labels'])} {item['sum']}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{_labels(item['labels'])} {item['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+# The process-wide metrics and the most recent query traces.
+_metrics = Metrics()
+_recent = deque(maxlen=RECENT_TRACES)
+
+
+def get_metrics():
+    """
+    Returns the process-wide Metrics.
+    """
+    return _metrics
+
+
+def current_span():
+    """
+    Returns the span of the stage currently running, or None.
+    """
+    return _current_span.get()
+
+
+def span(name, current=True, **attrs):
+    """
+    Returns a context manager that times a stage as a child of the current span (or as the root
+    of a new trace). Its duration goes into the 'stage_duration_seconds' histogram; an exception
+    leaving the block is recorded as the span's error and counted in 'stage_errors_total'.
+
+        with span("news", ticker="TSLA"):
+            ...
+
+    Args:
+        name (str): The stage name, used as the 'stage' label of the metrics.
+        current (bool, optional): Make the span the current one for the block, so nested stages
+            become its children. Generators leave this off, as they yield to their caller with
+            the block still open.
+    """
+    return _SpanScope(name, current, attrs)
+
+
+class _SpanScope:
+    # The context manager returned by span().
+
+    def __init__(self, name, current, attrs):
+        self.name = name
+        self.current = current
+        self.attrs = attrs
+        self.span = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.span = Span(self.name, parent, **self.attrs)
+        if parent is not None:
+            with _span_lock:
+                parent.children.append(self.span)
+        if self.current:
+            self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        finished = self.span
+        finished.duration = time.perf_counter() - finished.started
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Closed from another context (e.g. an abandoned generator); nothing to restore.
+                pass
+        if exc is not None and exc_type is not GeneratorExit:
+            finished.error = f"{exc_type.__name__}: {exc}"
+            _metrics.inc("stage_errors_total", stage=self.name)
+        _metrics.inc("stage_calls_total", stage=self.name)
+        _metrics.observe("stage_duration_seconds", finished.duration, stage=self.name)
+        if finished.parent is None:
+            _recent.append(finished)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Trace:\n%s", finished.format())
+        return False
+
+
+def traced(name=None):
+    """
+    Decorator that runs every call of a function inside a span named after it (or 'name').
+    Generator functions are timed until the caller has consumed them.
+    """
+
+    def decorate(fn):
+        stage = name or fn.__name__
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                with span(stage, current=False):
+                    yield from fn(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def annotate(**attrs):
+    """
+    Sets attributes on the current span (no-op outside a span).
+    """
+    current = _current_span.get()
+    if current is not None:
+        with _span_lock:
+            current.attrs.update(attrs)
+
+
+def add(key, amount=1):
+    """
+    Adds to a numeric attribute of the current span and of every span above it, so each stage
+    carries its own totals (upstream calls, bytes, retries) and the query carries the sum.
+    """
+    node = _current_span.get()
+    with _span_lock:
+        while node is not None:
+            node.attrs[key] = node.attrs.get(key, 0) + amount
+            node = node.parent
+
+
+def count(name, amount=1, **labels):
+    """
+    Increments an aggregate counter, e.g. count("upstream_requests_total", function="GLOBAL_QUOTE").
+    """
+    _metrics.inc(name, amount, **labels)
+
+
+def cache_result(cache, result):
+    """
+    Records a cache lookup ("hit", "miss", "stale", ...) in the metrics and on the current span.
+    """
+    _metrics.inc("cache_requests_total", cache=cache, result=result)
+    add(f"{cache}_cache_{result}")
+
+
+def record_error(error):
+    """
+    Records an error that was handled (printed or turned into a message) rather than raised, on
+    the current span and in 'stage_errors_total'.
+    """
+    current = _current_span.get()
+    if current is None:
+        _metrics.inc("stage_errors_total", stage="unknown")
+        return
+    with _span_lock:
+        current.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+    _metrics.inc("stage_errors_total", stage=current.name)
+
+
+def recent_traces(n=None):
+    """
+    Returns the most recent finished query traces (newest last) as plain data.
+    """
+    traces = list(_recent)
+    return [trace.to_dict() for trace in (traces[-n:] if n else traces)]
@@ -0,0 +1,405 @@
+import math  # Volatility scales with the square root of time.
+import os  # For the default hourly budget.
+import threading  # The monitor runs in a background thread; locks guard the watchlist.
+import time  # For poll times and sleeping between polls.
+from collections import namedtuple  # Compact event records.
+from datetime import datetime, timezone  # For market hours and article timestamps.
+
+import requests  # Import the requests library for its exception types.
+
+import market_hours  # No quotes are polled outside the regular session.
+import tracing  # Events and polls show up in the aggregate metrics.
+from av_scheduler import BACKGROUND, TokenBucket, request_priority  # Hourly budget; polls yield to interactive queries.
+from news_store import get_news_store  # New articles for the watchlist, one shared request where possible.
+from quote_cache import get_quote_cache  # Polled quotes also answer the agents' price questions.
+from quotes import fetch_quote  # Upstream GLOBAL_QUOTE fetches.
+
+# Upstream calls per hour the monitor may make, quotes and news together. The free Alpha Vantage
+# tier's 500 calls a day come to about 20 an hour.
+DEFAULT_CALLS_PER_HOUR = 20
+
+# A move of this many percent from the last reported price is an event.
+DEFAULT_MOVE_THRESHOLD = 1.0
+
+# Bounds on the time between two quotes of the same ticker. The upper bound is a target for quiet
+# names; the hourly budget always wins.
+DEFAULT_MIN_INTERVAL = 60.0
+DEFAULT_MAX_INTERVAL = 60 * 60.0
+
+# Time between two news checks of the whole watchlist (0 disables news).
+DEFAULT_NEWS_INTERVAL = 15 * 60.0
+
+# Volatility assumed for a ticker before it has been polled twice, and the floor that keeps quiet
+# names polled at all, in percent per square root of a minute (about 2% a day for a typical stock).
+DEFAULT_VOLATILITY = 0.1
+MIN_VOLATILITY = 0.02
+
+# Weight of the newest observation in a ticker's volatility estimate.
+VOLATILITY_SMOOTHING = 0.3
+
+# Longest the monitor sleeps at a time, so stop() and watchlist changes take effect promptly.
+MAX_SLEEP = 60.0
+
+# One event. 'kind' is "move" or "news"; 'detected_at' is a Unix time; 'latency_seconds' is an
+# upper bound on how long after it happened the event was detected (for moves the time since the
+# ticker's previous poll, for news the time since the article was published).
+MonitorEvent = namedtuple("MonitorEvent", ["kind", "ticker", "detected_at", "latency_seconds", "data"])
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _is_market_open(now):
+    return market_hours.is_market_open(datetime.fromtimestamp(now, timezone.utc))
+
+
+def _published_at(published):
+    # Alpha Vantage article times ('YYYYMMDDTHHMMSS') are exchange local time.
+    try:
+        return datetime.strptime(published[:15], "%Y%m%dT%H%M%S").replace(tzinfo=market_hours.EXCHANGE_TZ).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class _TickerState:
+    # What the monitor knows about one ticker on the watchlist.
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.volatility = DEFAULT_VOLATILITY
+        self.reference = None  # Price of the last move event (or the first quote).
+        self.last_price = None
+        self.last_poll = None
+        self.interval = None
+        self.next_due = 0.0
+        self.latest_news = None  # Newest article time seen; None until the first news check.
+        self.polls = 0
+
+
+class WatchlistMonitor:
+    """
+    Watches a list of tickers and reports price moves and new articles as they happen, within an
+    hourly API budget.
+
+    Quotes are polled adaptively. Each ticker gets a share of the hourly budget proportional to
+    its volatility (estimated from its own recent polls) divided by how far its price still is
+    from the next event, so volatile names and names that have already moved most of the way to
+    the threshold are polled more often and quiet ones less. Outside the regular session no
+    quotes are polled at all. Every poll takes a token from an hourly token bucket, so bursts
+    (a new watchlist, a news check that needed extra requests) delay the following polls instead
+    of exceeding the budget. Polls run at BACKGROUND priority, so interactive queries go first,
+    and every polled quote goes into the shared quote cache.
+
+    News for the whole watchlist is checked every 'news_interval' seconds with
+    NewsStore.top_up_many(), usually one request for all tickers.
+
+    Events (MonitorEvent) are passed to 'on_event' and/or put on 'events' (anything with a put()
+    method, e.g. queue.Queue). Without either, they go to a queue.Queue at monitor.events.
+
+    Args:
+        tickers (iterable of str): The watchlist.
+        on_event (callable, optional): Called with each MonitorEvent, in the monitor's thread.
+        events (queue.Queue, optional): Queue that receives each MonitorEvent.
+        calls_per_hour (int, optional): Upstream call budget. Defaults to
+            'STOCK_MONITOR_CALLS_PER_HOUR' or 20.
+        move_threshold (float, optional): Move (in percent) since the last reported price that
+            is reported as an event.
+        news_interval (float, optional): Seconds between news checks; 0 disables news events.
+        min_interval (float, optional): Shortest time between two quotes of one ticker.
+        max_interval (float, optional): Longest time between two quotes of one ticker, budget permitting.
+        adaptive (bool, optional): False polls every ticker equally often (round robin).
+        market_hours_only (bool, optional): False polls around the clock.
+        fetch (callable, optional): Fetches one Quote for a ticker. Defaults to quotes.fetch_quote.
+        clock (callable, optional): Returns the current Unix time. Defaults to time.time.
+    """
+
+    def __init__(self, tickers, on_event=None, events=None, calls_per_hour=None,
+                 move_threshold=DEFAULT_MOVE_THRESHOLD, news_interval=DEFAULT_NEWS_INTERVAL,
+                 min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL, adaptive=True,
+                 market_hours_only=True, fetch=fetch_quote, clock=time.time):
+        if on_event is None and events is None:
+            import queue
+            events = queue.Queue()
+        self.on_event = on_event
+        self.events = events
+        self.calls_per_hour = calls_per_hour or _env_int("STOCK_MONITOR_CALLS_PER_HOUR", DEFAULT_CALLS_PER_HOUR)
+        self.move_threshold = move_threshold
+        self.news_interval = news_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.adaptive = adaptive
+        self.market_hours_only = market_hours_only
+        self.fetch = fetch
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tickers = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # Bursts of up to five minutes' worth of calls; the bucket starts full.
+        self._budget = TokenBucket(max(1, self.calls_per_hour / 12), 5 * 60.0)
+        # TokenBucket counts time with time.monotonic(); the monitor uses its own clock.
+        self._budget.updated = self.clock()
+        self._next_news = 0.0
+        self._last_step = None
+        # Counters exposed through stats().
+        self.quote_calls = 0
+        self.news_calls = 0
+        self.errors = 0
+        self.budget_waits = 0
+        self.active_seconds = 0.0
+        self.event_counts = {}
+        self.latency_sums = {}
+        self.max_latency = {}
+        for ticker in tickers:
+            self.add(ticker)
+
+    def add(self, ticker):
+        """
+        Adds a ticker to the watchlist; it is polled as soon as the budget allows.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            if ticker not in self._tickers:
+                self._tickers[ticker] = _TickerState(ticker)
+                self._reschedule()
+
+    def remove(self, ticker):
+        """
+        Removes a ticker from the watchlist.
+        """
+        with self._lock:
+            if self._tickers.pop(ticker.upper(), None) is not None:
+                self._reschedule()
+
+    def tickers(self):
+        with self._lock:
+            return list(self._tickers)
+
+    def start(self):
+        """
+        Starts monitoring in a background (daemon) thread.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="watchlist-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread (after the poll in progress, if any).
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self, duration=None):
+        """
+        Monitors in the calling thread until stop() is called or 'duration' seconds have passed.
+        """
+        deadline = time.monotonic() + duration if duration is not None else None
+        while not self._stop.is_set():
+            delay = self.poll_once()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                delay = min(delay, remaining)
+            self._stop.wait(min(delay, MAX_SLEEP))
+
+    def poll_once(self, now=None):
+        """
+        Does the next piece of due work, if any: a news check, or one ticker's quote.
+
+        Args:
+            now (float, optional): The current Unix time. Defaults to the monitor's clock.
+
+        Returns:
+            float: Seconds until more work is due.
+        """
+        now = self.clock() if now is None else now
+        if self.market_hours_only and not _is_market_open(now):
+            self._last_step = None
+            return market_hours.seconds_until_next_open(datetime.fromtimestamp(now, timezone.utc))
+        if self._last_step is not None:
+            self.active_seconds += now - self._last_step
+        self._last_step = now
+
+        with self._lock:
+            if not self._tickers:
+                return MAX_SLEEP
+            state = min(self._tickers.values(), key=lambda s: s.next_due)
+            news_due = self.news_interval and now >= self._next_news
+            due_at = now if news_due else state.next_due
+        if due_at > now:
+            return due_at - now
+        wait = self._budget.wait_time(now)
+        if wait > 0:
+            self.budget_waits += 1
+            return wait
+
+        if news_due:
+            self._check_news(now)
+        else:
+            self._poll(state, now)
+        with self._lock:
+            upcoming = min((s.next_due for s in self._tickers.values()), default=now + MAX_SLEEP)
+        if self.news_interval:
+            upcoming = min(upcoming, self._next_news)
+        return max(0.0, upcoming - now)
+
+    def stats(self):
+        """
+        Returns the monitor's counters: upstream calls and calls per hour of market time,
+        events and their mean and maximum detection latency by kind, and each ticker's current
+        polling interval and volatility estimate.
+        """
+        with self._lock:
+            calls = self.quote_calls + self.news_calls
+            hours = self.active_seconds / 3600
+            return {
+                "tickers": len(self._tickers),
+                "quote_calls": self.quote_calls,
+                "news_calls": self.news_calls,
+                "calls_per_hour": calls / hours if hours else 0.0,
+                "calls_per_hour_budget": self.calls_per_hour,
+                "budget_waits": self.budget_waits,
+                "errors": self.errors,
+                "events": dict(self.event_counts),
+                "mean_latency_seconds": {kind: self.latency_sums[kind] / count
+                                         for kind, count in self.event_counts.items() if count},
+                "max_latency_seconds": dict(self.max_latency),
+                "intervals": {ticker: state.interval for ticker, state in self._tickers.items()},
+                "volatility": {ticker: state.volatility for ticker, state in self._tickers.items()},
+            }
+
+    def _poll(self, state, now):
+        # Fetch one ticker's quote, update its volatility estimate and report a threshold move.
+        self._budget.take(now)
+        try:
+            with request_priority(BACKGROUND):
+                quote = self.fetch(state.ticker)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Could not refresh the quote for {state.ticker}: {e}")
+            with self._lock:
+                self.quote_calls += 1
+                self.errors += 1
+                state.next_due = now + (state.interval or self.min_interval)
+            return
+        get_quote_cache().put(quote, state.ticker)
+        tracing.count("monitor_polls_total", kind="quote")
+
+        event = None
+        with self._lock:
+            self.quote_calls += 1
+            state.polls += 1
+            price = quote.price
+            if state.reference is None:
+                state.reference = price
+            elif state.last_price:
+                minutes = max((now - state.last_poll) / 60, 1 / 60)
+                move = abs(price / state.last_price - 1) * 100
+                state.volatility += VOLATILITY_SMOOTHING * (move / math.sqrt(minutes) - state.volatility)
+                change = (price / state.reference - 1) * 100 if state.reference else 0.0
+                if abs(change) >= self.move_threshold:
+                    event = MonitorEvent("move", state.ticker, now, now - state.last_poll, {
+                        "price": price, "reference": state.reference, "change_percent": change, "quote": quote})
+                    state.reference = price
+            state.last_price = price
+            state.last_poll = now
+            self._reschedule()
+        if event is not None:
+            self._emit(event)
+
+    def _check_news(self, now):
+        # One news check for the whole watchlist; articles newer than the last check are events.
+        self._next_news = now + self.news_interval
+        tickers = self.tickers()
+        store = get_news_store()
+        with request_priority(BACKGROUND):
+            calls = store.top_up_many(tickers)
+        # The first call took the token that let the check run; any extra calls delay later polls.
+        for _ in range(max(calls, 1)):
+            self._budget.take(now)
+        tracing.count("monitor_polls_total", kind="news")
+
+        events = []
+        with self._lock:
+            self.news_calls += calls
+            for ticker in tickers:
+                state = self._tickers.get(ticker)
+                if state is None:
+                    continue
+                articles = store.latest(ticker, n=10)
+                newest = max((article["time_published"] or "" for article in articles), default="")
+                if state.latest_news is not None:
+                    for article in reversed(articles):
+                        if (article["time_published"] or "") > state.latest_news:
+                            published = _published_at(article["time_published"])
+                            events.append(MonitorEvent("news", ticker, now,
+                                                       now - published if published else None, article))
+                # The first check only records what is already known.
+                state.latest_news = max(state.latest_news or "", newest)
+            self._reschedule()
+        for event in events:
+            self._emit(event)
+
+    def _reschedule(self):
+        # Split the hourly quote budget between the tickers by weight; called with the lock held.
+        states = list(self._tickers.values())
+        if not states:
+            return
+        news_calls = 3600 / self.news_interval if self.news_interval else 0
+        quote_budget = max(self.calls_per_hour - news_calls, 1)
+        weights = [self._weight(state) for state in states]
+        total = sum(weights)
+        for state, weight in zip(states, weights):
+            interval = 3600 * total / (quote_budget * weight)
+            state.interval = min(max(interval, self.min_interval), self.max_interval)
+            state.next_due = state.last_poll + state.interval if state.last_poll is not None else 0.0
+
+    def _weight(self, state):
+        # A ticker's share of the budget: how likely it is to cross the threshold soon.
+        if not self.adaptive:
+            return 1.0
+        moved = abs(state.last_price / state.reference - 1) * 100 if state.reference and state.last_price else 0.0
+        remaining = max(self.move_threshold - moved, self.move_threshold / 10)
+        return max(state.volatility, MIN_VOLATILITY) / remaining
+
+    def _emit(self, event):
+        with self._lock:
+            self.event_counts[event.kind] = self.event_counts.get(event.kind, 0) + 1
+            if event.latency_seconds is not None:
+                self.latency_sums[event.kind] = self.latency_sums.get(event.kind, 0.0) + event.latency_seconds
+                self.max_latency[event.kind] = max(self.max_latency.get(event.kind, 0.0), event.latency_seconds)
+        tracing.count("monitor_events_total", kind=event.kind)
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Watchlist event handler failed for {event.kind} event on {event.ticker}: {e}")
+        if self.events is not None:
+            self.events.put(event)
+
+
+if __name__ == "__main__":
+    # Print the events for a watchlist until interrupted, e.g. python watchlist_monitor.py AAPL MSFT NVDA
+    import sys
+
+    def show(event):
+        stamp = datetime.fromtimestamp(event.detected_at).strftime("%H:%M:%S")
+        if event.kind == "move":
+            print(f"{stamp} {event.ticker} moved {event.data['change_percent']:+.2f}% to ${event.data['price']:.2f}")
+        else:
+            print(f"{stamp} {event.ticker} news: {event.data['title']}")
+
+    monitor = WatchlistMonitor(sys.argv[1:] or ["AAPL", "MSFT", "NVDA"], on_event=show)
+    if not _is_market_open(time.time()):
+        print("The market is closed; polling starts at the next open.")
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        pass
+    print(monitor.stats())